@@ -0,0 +1,384 @@
+﻿# benchmarks.py
+"""
+数学与抽样热点的性能基准（无界面：不创建 Qt 窗口，3D 绘图器用离屏 pv.Plotter）：
+    python benchmarks.py run [-o results.json] [--quick] [-k 关键字] [--repeat 5]
+    python benchmarks.py compare baseline.json results.json [--threshold 0.25]
+
+- run：逐项计时，结果连同机器信息写成 JSON
+- compare：按用例名对齐两份结果，中位数变慢超过阈值（且绝对差超过噪声下限）的记为回退，
+  有回退时退出码为 1，可以直接放进 CI
+- 每次计时前执行用例自己的 setup（不计时），“冷”用例在 setup 里清掉相关缓存
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# 离屏渲染：必须在导入任何绘图器之前设置
+import pyvista as pv
+pv.OFF_SCREEN = True
+
+import math_radial
+from math_radial import (
+    assoc_laguerre,
+    radial_wavefunction,
+    build_radial_splines,
+    apply_laguerre_table,
+    load_laguerre_table,
+    available_n_values,
+    available_l_values,
+)
+from math_spherical import spherical_harmonic_real, spherical_harmonic_imag, spherical_mesh_axes
+from math_wave import psi_real, psi_imag, psi_prob
+from math_wave_sample import HydrogenSampler
+from cache_manager import cache_manager
+from config import MAX_N, SAMPLING_SEED
+
+# 函数级用例的点数、各用例默认的重复次数
+POINTS = 200_000
+DEFAULT_REPEAT = 5
+HEAVY_REPEAT = 3
+
+# 完整 / 快速两档：代表性的 (n, l, m) 与抽样点数（上限与采样滑块在 n = MAX_N 时一致）
+STATES = [(1, 0, 0), (3, 2, 1), (6, 3, -2), (9, 4, 4), (MAX_N, MAX_N - 1, MAX_N - 1)]
+QUICK_STATES = [(1, 0, 0), (6, 3, -2)]
+SAMPLE_SIZES = [10_000, 200_000, 2_600_000]
+QUICK_SAMPLE_SIZES = [10_000, 200_000]
+SPHERICAL_LM = [(1, 0), (4, 2), (8, 5), (MAX_N - 1, MAX_N - 1)]
+
+# compare 的默认阈值：中位数慢 25% 以上，且多出 0.2 ms 以上才算回退
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 2e-4
+
+# -------------------------------------------------------------------
+# 用例
+# -------------------------------------------------------------------
+def _case(group, params, run, setup=None, repeat=DEFAULT_REPEAT):
+    label = ",".join(f"{k}={v}" for k, v in params.items())
+    return {
+        "name": f"{group}[{label}]",
+        "group": group,
+        "params": params,
+        "run": run,
+        "setup": setup,
+        "repeat": repeat,
+    }
+
+def _points(n, size=POINTS, seed=0):
+    """(r, θ, φ)：r 在 [0, 3n²] 上均匀，方向在球面上均匀"""
+    rng = np.random.default_rng(seed)
+    r = rng.uniform(0.0, 3.0 * n * n, size)
+    theta = np.arccos(rng.uniform(-1.0, 1.0, size))
+    phi = rng.uniform(0.0, 2.0 * np.pi, size)
+    return r, theta, phi
+
+def _set_laguerre_ready(ready):
+    """切换 radial_wavefunction 是否走插值表（“冷” = 直接递推）"""
+    math_radial._LAGUERRE_READY = ready
+
+def _clear_sampler_caches():
+    HydrogenSampler._radial_cache.clear()
+    HydrogenSampler._angular_cache.clear()
+    cache_manager.cache("radial_structure").clear()
+
+def _math_cases(states):
+    cases = []
+    for n, l, m in states:
+        r, theta, phi = _points(n)
+        rho = 2.0 * r / n
+        params = {"n": n, "l": l, "m": m, "points": POINTS}
+
+        cases.append(_case(
+            "assoc_laguerre", {"k": n - l - 1, "alpha": 2 * l + 1, "points": POINTS},
+            lambda k=n - l - 1, a=2 * l + 1, x=rho: assoc_laguerre(k, a, x),
+        ))
+        for table in (False, True):
+            cases.append(_case(
+                "radial_wavefunction",
+                {"n": n, "l": l, "table": table, "points": POINTS},
+                lambda n=n, l=l, r=r: radial_wavefunction(n, l, r),
+                setup=lambda table=table: _set_laguerre_ready(table),
+            ))
+        for func in (spherical_harmonic_real, spherical_harmonic_imag):
+            cases.append(_case(
+                func.__name__, {"l": l, "m": m, "points": POINTS},
+                lambda f=func, l=l, m=m, t=theta, p=phi: f(l, m, t, p),
+            ))
+        for func in (psi_real, psi_imag, psi_prob):
+            cases.append(_case(
+                func.__name__, params,
+                lambda f=func, n=n, l=l, m=m, r=r, t=theta, p=phi: f(n, l, m, r, t, p),
+                setup=lambda: _set_laguerre_ready(True),
+            ))
+    return cases
+
+def _sampler_cases(states, sizes):
+    cases = []
+    for n, l, m in states:
+        params = {"n": n, "l": l, "m": m}
+        cases.append(_case(
+            "HydrogenSampler.__init__", dict(params, cache="cold"),
+            lambda n=n, l=l, m=m: HydrogenSampler(n, l, m, seed=SAMPLING_SEED),
+            setup=_clear_sampler_caches,
+        ))
+        cases.append(_case(
+            "HydrogenSampler.__init__", dict(params, cache="warm"),
+            lambda n=n, l=l, m=m: HydrogenSampler(n, l, m, seed=SAMPLING_SEED),
+        ))
+        sampler = {}
+        for N in sizes:
+            def setup(n=n, l=l, m=m):
+                _set_laguerre_ready(True)
+                if "s" not in sampler:
+                    sampler["s"] = HydrogenSampler(n, l, m, seed=SAMPLING_SEED)
+            cases.append(_case(
+                "HydrogenSampler.sample", dict(params, N=N),
+                lambda N=N: sampler["s"].sample(N),
+                setup=setup,
+                repeat=HEAVY_REPEAT if N >= 1_000_000 else DEFAULT_REPEAT,
+            ))
+    return cases
+
+def _plot_cases(states, sizes):
+    from plot_wave3d import Wave3DPlotter
+    from plot_spherical import SphericalDualPlotter
+
+    plotters = {}
+
+    def wave3d():
+        if "wave3d" not in plotters:
+            plotters["wave3d"] = Wave3DPlotter(pv.Plotter(off_screen=True, window_size=(800, 600)))
+        return plotters["wave3d"]
+
+    def spherical():
+        if "spherical" not in plotters:
+            left = pv.Plotter(off_screen=True, window_size=(600, 600))
+            right = pv.Plotter(off_screen=True, window_size=(600, 600))
+            plotters["spherical"] = SphericalDualPlotter(left, right)
+        return plotters["spherical"]
+
+    def clear_wave3d():
+        wave3d()._sample_cache.clear()
+        _clear_sampler_caches()
+
+    def clear_spherical():
+        spherical()
+        cache_manager.cache("sphere_ylm").clear()
+        cache_manager.cache("sphere_mesh").clear()
+        spherical_mesh_axes.cache_clear()
+
+    cases = []
+    # 点云：冷 = 抽样 + 求值 + 着色 + 上传；热 = 全部命中缓存，只剩换标量与渲染
+    for n, l, m in states[-2:]:
+        for N in sizes[1:]:
+            repeat = HEAVY_REPEAT if N >= 1_000_000 else DEFAULT_REPEAT
+            for cache, setup in (("cold", clear_wave3d), ("warm", wave3d)):
+                cases.append(_case(
+                    "Wave3DPlotter.plot",
+                    {"n": n, "l": l, "m": m, "N": N, "mode": "psi_real", "cache": cache},
+                    lambda n=n, l=l, m=m, N=N: wave3d().plot(n, l, m, mode="psi_real", N=N),
+                    setup=setup,
+                    repeat=repeat,
+                ))
+
+    for l, m in SPHERICAL_LM:
+        for cache, setup in (("cold", clear_spherical), ("warm", spherical)):
+            cases.append(_case(
+                "SphericalDualPlotter.plot", {"l": l, "m": m, "cache": cache},
+                lambda l=l, m=m: spherical().plot(l, m, component="real"),
+                setup=setup,
+            ))
+    return cases
+
+def build_cases(quick=False):
+    states = QUICK_STATES if quick else STATES
+    sizes = QUICK_SAMPLE_SIZES if quick else SAMPLE_SIZES
+    return _math_cases(states) + _sampler_cases(states, sizes) + _plot_cases(states, sizes)
+
+# -------------------------------------------------------------------
+# 计时
+# -------------------------------------------------------------------
+def time_case(case, repeat=None):
+    """先预热一次（同样先执行 setup），再计时 repeat 次；只计 run 本身"""
+    repeat = repeat or case["repeat"]
+    times = []
+    for i in range(repeat + 1):
+        if case["setup"] is not None:
+            case["setup"]()
+        t0 = time.perf_counter()
+        case["run"]()
+        t1 = time.perf_counter()
+        if i > 0:
+            times.append(t1 - t0)
+    return {
+        "group": case["group"],
+        "params": case["params"],
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "times": times,
+    }
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def machine_info():
+    import scipy
+    return {
+        "timestamp": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "pyvista": pv.__version__,
+        "git_commit": _git_commit(),
+    }
+
+def _prepare_laguerre_table():
+    """插值表：优先用磁盘缓存；没有就现场建一份（建表耗时也记下来）"""
+    if load_laguerre_table():
+        return {"source": "disk"}
+    states = [(n, l) for n in available_n_values() for l in available_l_values(n)]
+    t0 = time.perf_counter()
+    apply_laguerre_table(build_radial_splines(states))
+    return {"source": "built", "build_seconds": time.perf_counter() - t0}
+
+def run(args):
+    cases = build_cases(quick=args.quick)
+    if args.keyword:
+        cases = [c for c in cases if any(k in c["name"] for k in args.keyword)]
+
+    report = {
+        "machine": machine_info(),
+        "config": {"quick": args.quick, "points": POINTS, "max_n": MAX_N},
+        "laguerre_table": _prepare_laguerre_table(),
+        "results": {},
+    }
+
+    try:
+        for i, case in enumerate(cases, 1):
+            result = time_case(case, args.repeat)
+            report["results"][case["name"]] = result
+            print(f"[{i:3d}/{len(cases)}] {case['name']:<72} "
+                  f"median {result['median'] * 1e3:10.3f} ms  min {result['min'] * 1e3:10.3f} ms",
+                  flush=True)
+    finally:
+        _set_laguerre_ready(True)
+        from sampling_pool import shutdown_sampling_pool
+        shutdown_sampling_pool()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"wrote {len(report['results'])} results to {args.output}")
+    return 0
+
+# -------------------------------------------------------------------
+# 对比
+# -------------------------------------------------------------------
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD,
+                    min_delta=DEFAULT_MIN_DELTA, stat="median"):
+    """
+    返回 (rows, regressions)：rows 为 (用例名, 基线秒数, 当前秒数, 比值, 状态)，
+    状态是 "regression" / "improvement" / "ok"；只对两边都有的用例比较。
+    """
+    rows = []
+    base, cur = baseline["results"], current["results"]
+    for name in sorted(set(base) & set(cur)):
+        b, c = base[name][stat], cur[name][stat]
+        ratio = c / b if b > 0 else float("inf")
+        if ratio > 1.0 + threshold and c - b > min_delta:
+            status = "regression"
+        elif ratio < 1.0 / (1.0 + threshold) and b - c > min_delta:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, b, c, ratio, status))
+    regressions = [row for row in rows if row[4] == "regression"]
+    return rows, regressions
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    # 不同机器上的数字只能参考
+    for key in ("machine", "processor", "cpu_count", "python", "numpy", "scipy"):
+        b, c = baseline["machine"].get(key), current["machine"].get(key)
+        if b != c:
+            print(f"warning: {key} differs (baseline {b!r}, current {c!r})")
+
+    rows, regressions = compare_reports(baseline, current, args.threshold, args.min_delta, args.stat)
+    marks = {"regression": "SLOWER", "improvement": "faster", "ok": ""}
+    for name, b, c, ratio, status in rows:
+        if args.all or status != "ok":
+            print(f"{name:<72} {b * 1e3:10.3f} -> {c * 1e3:10.3f} ms  x{ratio:5.2f}  {marks[status]}")
+
+    only_base = sorted(set(baseline["results"]) - set(current["results"]))
+    only_cur = sorted(set(current["results"]) - set(baseline["results"]))
+    if only_base:
+        print(f"{len(only_base)} cases only in baseline (skipped)")
+    if only_cur:
+        print(f"{len(only_cur)} new cases (no baseline)")
+
+    print(f"{len(rows)} compared, {len(regressions)} regressions "
+          f"(threshold {args.threshold:.0%} on {args.stat}, min delta {args.min_delta * 1e3:.2f} ms)")
+    return 1 if regressions else 0
+
+# -------------------------------------------------------------------
+# 命令行
+# -------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="wavefunction micro-benchmarks (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run benchmarks and write JSON")
+    p_run.add_argument("-o", "--output", default="benchmark_results.json")
+    p_run.add_argument("--quick", action="store_true", help="fewer states, N <= 200k")
+    p_run.add_argument("-k", "--keyword", action="append",
+                       help="only cases whose name contains this (repeatable)")
+    p_run.add_argument("--repeat", type=int, default=None,
+                       help="timed repetitions per case (default: per case)")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="compare results against a baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="relative slowdown that counts as a regression")
+    p_cmp.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                       help="ignore absolute differences below this many seconds")
+    p_cmp.add_argument("--stat", choices=("median", "min", "mean"), default="median")
+    p_cmp.add_argument("--all", action="store_true", help="print unchanged cases too")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    # 大 N 的点云会用到 spawn 进程池（与 main.py 一致）
+    import multiprocessing
+    multiprocessing.freeze_support()
+    multiprocessing.set_start_method("spawn", force=True)
+    sys.exit(main())
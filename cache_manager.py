@@ -0,0 +1,227 @@
+﻿# cache_manager.py
+"""
+统一的内存缓存层：
+- 所有具名缓存共用一个字节预算（config.CACHE_BUDGET_MB）
+- 超出预算时按全局 LRU 淘汰（所有缓存的条目排在同一条使用顺序上）；
+  pinned 的缓存只计数、不淘汰
+- 每个缓存分别统计命中 / 未命中 / 淘汰次数与占用字节，
+  cache_manager.stats() / format_stats() 供 UI 或日志查询
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import CACHE_BUDGET_MB
+
+
+def nbytes_of(value, _seen=None):
+    """
+    估算一个缓存值占用的内存：
+    numpy 数组按 nbytes（磁盘 memmap 不计），容器和普通对象递归累加，
+    同一个对象只算一次（例如字典里多个视图指向同一块数组）。
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(nbytes_of(v, _seen) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes_of(v, _seen) for v in value)
+    if hasattr(value, "__dict__"):
+        return sum(nbytes_of(v, _seen) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class BudgetCache:
+    """
+    受 CacheManager 管理的字典式缓存。
+    get / [] 计入命中统计；`in` 不计入。
+    值放进去之后若被原地修改（例如补充字段），重新 put 一次以更新字节数。
+    """
+
+    def __init__(self, manager, name, pinned=False):
+        self._manager = manager
+        self.name = name
+        self.pinned = pinned
+        self._data = {}
+        self._sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def get(self, key, default=None):
+        with self._manager._lock:
+            if key in self._data:
+                self.hits += 1
+                self._manager._touch(self, key)
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def put(self, key, value, nbytes=None):
+        """放入缓存并返回 value；nbytes 为 None 时自动估算"""
+        if nbytes is None:
+            nbytes = nbytes_of(value)
+        with self._manager._lock:
+            self._discard(key)
+            self._data[key] = value
+            self._sizes[key] = nbytes
+            self.bytes += nbytes
+            self._manager._added(self, key, nbytes)
+        return value
+
+    __setitem__ = put
+
+    def pop(self, key, default=None):
+        with self._manager._lock:
+            value = self._data.get(key, default)
+            self._discard(key)
+            return value
+
+    def clear(self):
+        with self._manager._lock:
+            for key in list(self._data):
+                self._discard(key)
+
+    def _discard(self, key):
+        if key not in self._data:
+            return
+        nbytes = self._sizes.pop(key)
+        del self._data[key]
+        self.bytes -= nbytes
+        self._manager._removed(self, key, nbytes)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "pinned": self.pinned,
+        }
+
+
+_MISSING = object()
+
+
+class CacheManager:
+    """
+    全局缓存管理器：所有 BudgetCache 的可淘汰条目按最近使用排成一条 LRU 队列，
+    总字节数超过预算时从最久未用的一端淘汰。
+    """
+
+    def __init__(self, budget_bytes=CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.RLock()
+        self._caches = {}
+        self._lru = OrderedDict()  # (cache, key) -> nbytes，只含可淘汰条目，最近使用的在末尾
+        self.bytes = 0
+
+    def cache(self, name, pinned=False):
+        """取（或创建）名为 name 的缓存"""
+        with self._lock:
+            c = self._caches.get(name)
+            if c is None:
+                c = BudgetCache(self, name, pinned=pinned)
+                self._caches[name] = c
+            return c
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    # ---------------------------------------------------------
+    # BudgetCache 回调（调用方已持有锁）
+    # ---------------------------------------------------------
+    def _touch(self, cache, key):
+        entry = (cache.name, key)
+        if entry in self._lru:
+            self._lru.move_to_end(entry)
+
+    def _added(self, cache, key, nbytes):
+        self.bytes += nbytes
+        if cache.pinned:
+            # 固定条目本身不淘汰，但占用的预算要由可淘汰条目让出来
+            self._evict()
+        else:
+            self._lru[(cache.name, key)] = nbytes
+            self._evict(keep=(cache.name, key))
+
+    def _removed(self, cache, key, nbytes):
+        self.bytes -= nbytes
+        self._lru.pop((cache.name, key), None)
+
+    def _evict(self, keep=None):
+        # 刚放进来的那一条即使单独超预算也保留
+        while self.bytes > self.budget_bytes:
+            victim = next((entry for entry in self._lru if entry != keep), None)
+            if victim is None:
+                break
+            name, key = victim
+            cache = self._caches[name]
+            cache._discard(key)
+            cache.evictions += 1
+
+    # ---------------------------------------------------------
+    # 统计
+    # ---------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            per_cache = {name: c.stats() for name, c in self._caches.items()}
+            return {
+                "budget_bytes": self.budget_bytes,
+                "bytes": self.bytes,
+                "caches": per_cache,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        lines = [
+            f"cache total {s['bytes'] / 2**20:.1f} MB / {s['budget_bytes'] / 2**20:.0f} MB"
+        ]
+        for name, c in sorted(s["caches"].items()):
+            lines.append(
+                f"  {name:<18} {c['entries']:>5} entries {c['bytes'] / 2**20:>8.1f} MB"
+                f"  hit {c['hits']:>6} miss {c['misses']:>6} ({c['hit_rate']:.0%})"
+                f"  evicted {c['evictions']}" + ("  [pinned]" if c["pinned"] else "")
+            )
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            for c in self._caches.values():
+                c.clear()
+
+
+# 单例
+cache_manager = CacheManager()
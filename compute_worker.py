@@ -0,0 +1,116 @@
+﻿# compute_worker.py
+"""
+后台计算线程：
+- 每次请求带一个递增的代号（generation），新请求直接顶替还没开始的旧请求
+- 正在跑的旧请求在两帧之间检查代号，发现过期就关闭生成器（协作式取消）
+- 结果通过 Qt 信号送回主线程，主线程只接受最新代号的帧
+- 空闲时执行低优先级的预取任务；每一步之间检查有没有新请求，有就立即让出
+"""
+
+import threading
+import traceback
+
+from PyQt5 import QtCore
+
+
+class ComputeWorker(QtCore.QThread):
+    """
+    请求是一个无参可调用对象，返回生成器；生成器产出的每一项
+    都通过 frame_ready(generation, item) 发回主线程。
+    """
+
+    frame_ready = QtCore.pyqtSignal(int, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._request = None
+        self._idle_tasks = []
+        self._generation = 0
+        self._stopping = False
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def is_current(self, generation):
+        return generation == self._generation
+
+    def submit(self, make_iter):
+        """提交新请求，返回它的代号；之前的请求全部作废"""
+        with self._cond:
+            self._generation += 1
+            self._request = (self._generation, make_iter)
+            self._cond.notify()
+            return self._generation
+
+    def set_idle_tasks(self, tasks):
+        """
+        替换空闲任务列表：每项是无参可调用对象，返回生成器。
+        只在没有前台请求时一步一步地执行，结果不发信号（由任务自己写缓存）。
+        """
+        with self._cond:
+            self._idle_tasks = list(tasks)
+            self._cond.notify()
+
+    def cancel(self):
+        """作废当前和排队中的请求"""
+        with self._cond:
+            self._generation += 1
+            self._request = None
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._generation += 1
+            self._request = None
+            self._idle_tasks = []
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._request is None and not self._idle_tasks and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                if self._request is None:
+                    idle = self._idle_tasks.pop(0)
+                else:
+                    idle = None
+                    generation, make_iter = self._request
+                    self._request = None
+
+            if idle is not None:
+                self._run_idle(idle)
+                continue
+
+            it = None
+            try:
+                it = make_iter()
+                for item in it:
+                    if not self.is_current(generation):
+                        break
+                    self.frame_ready.emit(generation, item)
+            except Exception:
+                self.failed.emit(generation, traceback.format_exc())
+            finally:
+                if it is not None:
+                    # 关闭生成器：进程池里未完成的块也随之取消
+                    it.close()
+
+    def _run_idle(self, make_iter):
+        it = None
+        try:
+            it = make_iter()
+            for _ in it:
+                # 前台请求优先：一来就放弃当前预取
+                if self._request is not None or self._stopping:
+                    break
+        except Exception:
+            traceback.print_exc()
+        finally:
+            if it is not None:
+                it.close()
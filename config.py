@@ -2,6 +2,7 @@
 """
 全局配置参数
 """
+import os
 
 # 主量子数最大值
 MAX_N = 12
@@ -10,10 +11,89 @@ MAX_N = 12
 R_MAX = 40.0
 R_POINTS = 600
 
+# Laguerre 预计算表（磁盘缓存，按 MAX_N / 误差目标 / 格式版本区分）
+# 每个 (n, l) 的插值误差保证 <= LAGUERRE_TABLE_RTOL × 该态 |ρ^l e^{-ρ/2} L| 的峰值
+LAGUERRE_TABLE_RTOL = 1e-8
+LAGUERRE_TABLE_VERSION = 2
+# 只有 Laguerre 次数 k = n-l-1 >= LAGUERRE_TABLE_MIN_DEGREE 的态才查表：
+# 次数低时三项递推只有几步，比查表 + 三次 Hermite 求值还快
+# （50 万点实测：k <= 3 时查表慢 1.2–2 倍，k = 4–5 大致持平，k >= 6 起查表快 5–35%）
+LAGUERRE_TABLE_MIN_DEGREE = 6
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".wavefunction", "cache")
+
+# 点云显示时只保留最后一层壳附近（r <= 1.4 × 最后一个壳峰）的点；
+# 抽样本身始终是完整、精确的 r²R² 分布，这里只是显示过滤
+SHELL_DISPLAY_FILTER = True
+
+# 点云抽样的随机种子（None 表示每次都不同）与线程数（None 表示按 CPU 核数）
+SAMPLING_SEED = 0
+SAMPLING_WORKERS = None
+
+# 大 N 时改用常驻进程池 + 共享内存抽样（进程数 None 表示按 CPU 核数）；
+# 低于阈值时进程间调度的开销不划算，仍在本进程里用线程池
+SAMPLING_PROCESSES = None
+SAMPLING_POOL_MIN_N = 400_000
+
+# 渐进式 3D 绘制：两次刷新点云之间最少累积的时间（秒）
+PROGRESSIVE_FRAME_BUDGET = 0.1
+
+# 内存缓存（点云、壳峰、角向 CDF、径向包络、Laguerre 表等）共用的字节预算（MB），
+# 超出后按 LRU 淘汰
+CACHE_BUDGET_MB = 1024
+
+# 空闲预取：当前图画完后，在后台预先抽样相邻的 (n, l, m)；
+# 预取数据总量不超过该上限（MB），且不会挤掉缓存里已有的条目
+PREFETCH_ENABLED = True
+PREFETCH_MEMORY_MB = 256
+
+# 交互 LOD：点数不少于 LOD_MIN_POINTS 时，拖动相机期间只画按体素分层抽取的子集
+# （平面点精灵、关闭深度剥离），松手后恢复；子集比例从 LOD_INITIAL_FRACTION 起步，
+# 按实际帧耗时向 LOD_TARGET_FRAME_TIME（秒）自动调节
+LOD_ENABLED = True
+LOD_GRID = 32
+LOD_INITIAL_FRACTION = 0.1
+LOD_MIN_FRACTION = 0.01
+LOD_MIN_POINTS = 200_000
+LOD_TARGET_FRAME_TIME = 1.0 / 30
+
+# 分阶段计时（tracing.py）：环境变量 WAVEFUNCTION_TRACE=1 启动即打开，运行中按 F10 开关；
+# WAVEFUNCTION_TRACE_MEMORY=1 同时用 tracemalloc 记录各阶段峰值内存（会明显变慢）。
+# 事件按行写进 TRACE_DIR 下的 JSONL（Chrome trace 事件格式）；TRACE_OVERLAY 在窗口里显示汇总
+TRACE_ENABLED = os.environ.get("WAVEFUNCTION_TRACE", "") not in ("", "0")
+TRACE_MEMORY = os.environ.get("WAVEFUNCTION_TRACE_MEMORY", "") not in ("", "0")
+TRACE_DIR = os.path.join(os.path.expanduser("~"), ".wavefunction", "traces")
+TRACE_OVERLAY = True
+
+# 体渲染：每个轴上的网格点数；网格半宽取径向概率累积到该分位数的半径
+VOLUME_GRID_RES = 128
+VOLUME_EXTENT_QUANTILE = 0.995
+
+# 等概率面：阈值由多少个抽样点的 |ψ|² 分位数估计；滑块默认包含的概率
+ISOSURFACE_SAMPLES = 200_000
+ISOSURFACE_DEFAULT_FRACTION = 0.9
+
+# 叠加态动画：刷新帧率、一个最快拍频周期播放的秒数（1× 速度时）、最多几项
+SUPERPOSITION_FPS = 30
+SUPERPOSITION_BEAT_SECONDS = 4.0
+SUPERPOSITION_MAX_TERMS = 3
+
+# 径向曲线：每个屏幕像素的采样点数、平移 / 缩放后重画的合并间隔（约一帧）
+RADIAL_SAMPLES_PER_PIXEL = 2
+RADIAL_REDRAW_INTERVAL_MS = 16
+
+# 径向对比视图：所有曲线共用一条 r 网格（按 √r 等距，核附近更密），点数与上限
+RADIAL_OVERLAY_POINTS = 8192
+RADIAL_OVERLAY_R_MAX = 8.0 * MAX_N * MAX_N
+
 # 球坐标网格
 THETA_POINTS = 80
 PHI_POINTS = 160
 
+# 球谐双视图的网格：点数随 l、m 自适应，使分段线性插值误差 <= SPHERICAL_MESH_RTOL × max|Y|
+# （单位球几何本身的弦高误差也按同一目标控制）；可选在节点线（Y 变号处）附近加密
+SPHERICAL_MESH_RTOL = 2e-3
+SPHERICAL_NODE_REFINE = True
+
 # 球谐函数绘图的尺度
 SPHERICAL_RADIUS_SCALE = 1.0  # 形状缩放
 SPHERICAL_EPS = 1e-6          # 防止全 0 导致数值问题
@@ -0,0 +1,62 @@
+﻿# enclosure_controls.py
+from PyQt5 import QtWidgets, QtCore
+
+from sampling_controls import JumpSlider
+from config import ISOSURFACE_DEFAULT_FRACTION
+
+
+class EnclosureControls(QtWidgets.QGroupBox):
+    """等概率面包含的概率比例控件"""
+
+    fraction_changed = QtCore.pyqtSignal(float)
+
+    # 滑块步长（百分点）；空闲预取也按这个步长取相邻比例
+    STEP = 5
+
+    def __init__(self, parent=None):
+        super().__init__("等概率面包含概率", parent)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.slider = JumpSlider(QtCore.Qt.Horizontal)
+        self.slider.setRange(10, 95)
+        self.slider.setSingleStep(self.STEP)
+        self.slider.setPageStep(self.STEP)
+        self.slider.setValue(int(round(ISOSURFACE_DEFAULT_FRACTION * 100)))
+
+        self.label = QtWidgets.QLabel()
+
+        layout.addWidget(self.slider)
+        layout.addWidget(self.label)
+
+        # 曲面按比例缓存、计算在后台线程，拖动过程中也实时更新
+        self._value = None
+        self.slider.valueChanged.connect(self._apply_value)
+        self._apply_value(self.slider.value(), emit_signal=False)
+
+    def fraction(self):
+        return self._snap(self.slider.value()) / 100.0
+
+    def neighbour_fractions(self):
+        """当前比例两侧各一档，供空闲预取"""
+        v = self._snap(self.slider.value())
+        return [
+            f / 100.0
+            for f in (v + self.STEP, v - self.STEP)
+            if self.slider.minimum() <= f <= self.slider.maximum()
+        ]
+
+    def _snap(self, v):
+        return int(round(v / self.STEP) * self.STEP)
+
+    def _apply_value(self, v, emit_signal=True):
+        snapped = self._snap(v)
+        if snapped != v:
+            self.slider.blockSignals(True)
+            self.slider.setValue(snapped)
+            self.slider.blockSignals(False)
+        self.label.setText(f"P = {snapped}%")
+        changed = snapped != self._value
+        self._value = snapped
+        if emit_signal and changed:
+            self.fraction_changed.emit(snapped / 100.0)
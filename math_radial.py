@@ -3,13 +3,26 @@
 氢原子径向波函数 R_{n l}(r)
 """
 import numpy as np
+import functools
 import math
-from config import MAX_N, R_MAX, R_POINTS
+import os
+from config import (
+    MAX_N,
+    R_MAX,
+    R_POINTS,
+    LAGUERRE_TABLE_RTOL,
+    LAGUERRE_TABLE_VERSION,
+    LAGUERRE_TABLE_MIN_DEGREE,
+    CACHE_DIR,
+    RADIAL_OVERLAY_POINTS,
+    RADIAL_OVERLAY_R_MAX,
+)
+from cache_manager import cache_manager
 
 # 预计算 Laguerre 用的全局表
-_LAGUERRE_RHO_GRID = None
-_LAGUERRE_CACHE = {}      # key: (n, l) -> L_{n-l-1}^{2l+1}(rho_grid)
+_LAGUERRE_CACHE = cache_manager.cache("laguerre_splines", pinned=True)  # (n, l) -> RadialSpline
 _LAGUERRE_READY = False
+_LAGUERRE_PATH = None   # 当前所用表的磁盘文件；整张表经队列直接传来时为 None
 
 def available_n_values(max_n: int = MAX_N):
     return list(range(1, max_n + 1))
@@ -47,32 +60,298 @@ def assoc_laguerre(k, alpha, x):
         L_prev, L_curr = L_curr, L_next
 
     return L_curr
-# ==========================
-# 惰性加载 Laguerre 缓存系统
-# ==========================
-class LaguerreTable:
-    """
-    惰性加载 + 缓存：
-    需要某个 (k, alpha) 的 Laguerre 时才计算一次并缓存。
-    后续所有 radial_wavefunction 不再重新算。
-    """
-    def __init__(self, rho_max=80.0, rho_points=2000):
-        self.rho_grid = np.linspace(0.0, rho_max, rho_points)
-        self.cache = {}  # (k, alpha) -> array of shape (rho_points,)
-
-    def get(self, k, alpha):
-        """
-        返回 L_k^alpha(rho_grid)
-        如果第一次访问，自动计算并缓存。
-        """
-        key = (k, alpha)
-        if key not in self.cache:
-            # 只计算一次
-            L = assoc_laguerre(k, alpha, self.rho_grid)
-            self.cache[key] = L.astype(float)
-        return self.cache[key]
-# 单例
-laguerre_table = LaguerreTable()
+
+# -------------------------------------------------------------------
+# 批量径向引擎：一次性计算多个 (n, l) 的 R_{n l}(r)
+# -------------------------------------------------------------------
+# 单次批量调用中每个数组最多的元素数，超过就按 r 分块，控制内存峰值
+_BATCH_ELEMENTS = 1 << 22
+
+@functools.lru_cache(maxsize=None)
+def radial_norm(n: int, l: int, Z: float = 1.0):
+    """归一化因子（解析式），按 (n, l, Z) 缓存，不再每次调用都算阶乘"""
+    num = math.factorial(n - l - 1)
+    den = 2*n*math.factorial(n + l)
+    return (2*Z/n) * math.sqrt(num / den)
+
+def radial_states(states):
+    """
+    规范化态列表：
+    - 整数 n_max → 所有 n <= n_max 的 (n, l)
+    - 否则视为 (n, l) 序列
+    """
+    if isinstance(states, (int, np.integer)):
+        return [(n, l) for n in range(1, int(states) + 1) for l in range(0, n)]
+
+    out = []
+    for n, l in states:
+        n, l = int(n), int(l)
+        if n < 1:
+            raise ValueError("n 必须 >= 1")
+        if not (0 <= l <= n - 1):
+            raise ValueError("l 必须满足 0 <= l <= n-1")
+        out.append((n, l))
+    return out
+
+def _laguerre_rows(ks, alphas, X):
+    """
+    对矩阵 X 的每一行 i 计算 L_{ks[i]}^{alphas[i]}(X[i])。
+    要求 ks 按降序排列：递推到第 j 步时仍然活跃的行总是前缀 [:count(ks >= j)]，
+    所以所有 k 共用同一轮三项递推，只对前缀切片做运算。
+    """
+    out = np.ones_like(X)
+    if len(ks) == 0 or ks[0] < 1:
+        return out
+
+    ks = np.asarray(ks)
+    alpha = np.asarray(alphas, dtype=float)[:, None]
+
+    active = int(np.count_nonzero(ks >= 1))
+    L_prev = np.ones_like(X[:active])                # L_0
+    L_curr = -X[:active] + alpha[:active] + 1        # L_1
+    done = int(np.count_nonzero(ks > 1))
+    out[done:active] = L_curr[done:]
+
+    for j in range(2, int(ks[0]) + 1):
+        active = done
+        done = int(np.count_nonzero(ks > j))
+        a = alpha[:active]
+        L_next = ((2*j - 1 + a - X[:active]) * L_curr[:active]
+                  - (j - 1 + a) * L_prev[:active]) / j
+        L_prev, L_curr = L_curr[:active], L_next
+        out[done:active] = L_curr[done:]
+
+    return out
+
+def _reduced_rows(states, rhos, src, derivative=False):
+    """
+    约化径向函数 f(rho) = rho^l · e^{-rho/2} · L_{n-l-1}^{2l+1}(rho)（及 f'）。
+    rhos 是若干条互不相同的 rho 数组，第 i 个态使用 rhos[src[i]]；
+    e^{-rho/2} 与 rho^l 对同一条 rho 只算一次（rho^l 逐次累乘）。
+    """
+    S = len(states)
+    ks = np.array([n - l - 1 for n, l in states])
+    alphas = np.array([2*l + 1 for n, l in states])
+    order = np.argsort(-ks, kind="stable")
+
+    stacked = np.stack(rhos)
+    X = stacked[np.asarray(src)[order]]
+
+    L = np.empty_like(X)
+    L[order] = _laguerre_rows(ks[order], alphas[order], X)
+
+    dL = None
+    if derivative:
+        # d/dx L_k^α = -L_{k-1}^{α+1}；k = 0 的行导数为 0
+        has = ks[order] >= 1
+        dL = np.zeros_like(X)
+        idx = order[has]
+        dL[idx] = -_laguerre_rows(ks[idx] - 1, alphas[idx] + 1, X[has])
+
+    f = np.empty_like(X)
+    df = np.empty_like(X) if derivative else None
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        exps = [np.exp(-rho / 2) for rho in rhos]
+        powers = {}
+
+        def rho_pow(j, l):
+            # rho^l，按 (rho 来源, l) 共享，逐次累乘
+            if l == 0:
+                return np.ones_like(rhos[j])
+            key = (j, l)
+            if key not in powers:
+                powers[key] = rho_pow(j, l - 1) * rhos[j]
+            return powers[key]
+
+        for i, (n, l) in enumerate(states):
+            j = src[i]
+            e = exps[j]
+            rho_l = rho_pow(j, l)
+            f[i] = e * rho_l * L[i]
+            if derivative:
+                d = e * (rho_l * (dL[i] - 0.5 * L[i]))
+                if l > 0:
+                    d += e * (l * rho_pow(j, l - 1)) * L[i]
+                df[i] = d
+
+    return f, df
+
+def reduced_radial_batch(states, rho, derivative=False):
+    """
+    所有态共用同一个 rho 数组时的批量约化径向函数，
+    返回形状 (len(states), len(rho)) 的 f（derivative=True 时再返回 f'）。
+    """
+    states = radial_states(states)
+    rho = np.asarray(rho, dtype=float).ravel()
+    f = np.empty((len(states), rho.size))
+    df = np.empty_like(f) if derivative else None
+
+    chunk = max(1, _BATCH_ELEMENTS // max(1, len(states)))
+    for start in range(0, rho.size, chunk):
+        part = rho[start:start + chunk]
+        fc, dfc = _reduced_rows(states, [part], [0] * len(states), derivative)
+        f[:, start:start + chunk] = fc
+        if derivative:
+            df[:, start:start + chunk] = dfc
+
+    if derivative:
+        return f, df
+    return f
+
+def _reduced_radial(n: int, l: int, rho: np.ndarray):
+    """单个态的 f(rho) 与 f'(rho)，直接由三项递推计算"""
+    rho = np.asarray(rho, dtype=float)
+    f, df = reduced_radial_batch([(n, l)], rho, derivative=True)
+    return f[0].reshape(rho.shape), df[0].reshape(rho.shape)
+
+def radial_wavefunctions(states, r, Z: float = 1.0):
+    """
+    批量计算 R_{n l}(r)。
+    states: (n, l) 列表，或整数 n_max（表示所有 n <= n_max 的态）。
+    返回形状 (len(states),) + r.shape 的数组，行顺序与 states 一致。
+    同一个 n 的各个 l 共享 rho、e^{-rho/2} 和 rho^l，
+    所有态的 Laguerre 三项递推在同一轮循环里完成。
+    """
+    states = radial_states(states)
+    r = np.asarray(r, dtype=float)
+    r_flat = np.clip(r.ravel(), 0.0, None)
+
+    ns = sorted({n for n, l in states})
+    src = [ns.index(n) for n, l in states]
+    norms = np.array([radial_norm(n, l, Z) for n, l in states])[:, None]
+
+    out = np.empty((len(states), r_flat.size))
+    chunk = max(1, _BATCH_ELEMENTS // max(1, len(states)))
+    for start in range(0, r_flat.size, chunk):
+        part = r_flat[start:start + chunk]
+        rhos = [2.0 * Z * part / n for n in ns]
+        f, _ = _reduced_rows(states, rhos, src)
+        with np.errstate(over="ignore", invalid="ignore"):
+            out[:, start:start + chunk] = norms * f
+
+    # 把 inf / nan 清掉，防止弄坏坐标轴范围
+    out = np.where(np.isfinite(out), out, 0.0)
+    return out.reshape((len(states),) + r.shape)
+
+# -------------------------------------------------------------------
+# 误差受控的插值表
+# -------------------------------------------------------------------
+# 插值对象不是 L 本身（L 在节点附近没有“相对误差”可言），而是约化径向函数
+#     f(rho) = rho^l · e^{-rho/2} · L_{n-l-1}^{2l+1}(rho)，  R = norm · f
+# 每个 (n, l) 单独建表：定义域一直延伸到 |f| < rtol·max|f| 为止，
+# 网格逐次加密到三次 Hermite 插值的最大误差 <= rtol·max|f|。
+# 定义域之外不再截断到最后一个表值，而是直接用递推精确计算。
+class RadialSpline:
+    """
+    单个 (n, l) 的均匀网格三次 Hermite 表：
+    rho ∈ [0, rho_max]，步长 h，values/derivs 为节点上的 f 与 f'。
+    """
+    def __init__(self, n, l, h, values, derivs):
+        self.n = n
+        self.l = l
+        self.h = float(h)
+        self.values = values
+        self.derivs = derivs
+        self.rho_max = self.h * (len(values) - 1)
+
+    def __call__(self, rho):
+        rho = np.asarray(rho, dtype=float)
+        out = np.empty_like(rho)
+
+        inside = rho <= self.rho_max
+        if not np.all(inside):
+            # 表外（远尾部）直接精确计算，避免 np.interp 式的截断
+            out[~inside] = _reduced_radial(self.n, self.l, rho[~inside])[0]
+            x = rho[inside] / self.h
+        else:
+            x = rho / self.h
+
+        i = np.minimum(x.astype(np.intp), len(self.values) - 2)
+        t = x - i
+        t2 = t * t
+        s = 1.0 - t
+        s2 = s * s
+
+        y0 = self.values[i]
+        y1 = self.values[i + 1]
+        d0 = self.derivs[i] * self.h
+        d1 = self.derivs[i + 1] * self.h
+
+        val = (y0 * (1.0 + 2.0 * t) + d0 * t) * s2 + (y1 * (3.0 - 2.0 * t) - d1 * s) * t2
+
+        if out.shape == val.shape:
+            return val
+        out[inside] = val
+        return out
+
+def build_radial_splines(states, rtol: float = LAGUERRE_TABLE_RTOL,
+                         max_points: int = 1 << 16):
+    """
+    为一批 (n, l) 建立满足 max|f_table - f| <= rtol·max|f| 的插值表。
+    每一轮加密中所有未达标的态共用同一个步长 h，
+    于是它们的网格都是同一条 rho 网格的前缀，可以交给批量引擎一次算完。
+    """
+    states = radial_states(states)
+    max_n = max(n for n, l in states)
+
+    # 1) 定义域：找到 |f| 衰减到 rtol·max|f| 以下的位置
+    rho_hi = 8.0 * max_n + 80.0
+    while True:
+        rho_scan = np.linspace(0.0, rho_hi, 4096)
+        f_scan = np.abs(reduced_radial_batch(states, rho_scan))
+        peaks = f_scan.max(axis=1)
+        last = np.array([np.nonzero(row >= rtol * p)[0][-1]
+                         for row, p in zip(f_scan, peaks)])
+        if np.all(last < len(rho_scan) - 1):
+            break
+        rho_hi *= 2.0
+    rho_max = rho_scan[last + 1]
+
+    # 2) 分辨率：逐次加密，用区间中点处的精确值检验插值误差
+    splines = {}
+    pending = list(range(len(states)))
+    h = float(rho_max.max()) / 64
+    while pending:
+        counts = [max(2, int(math.ceil(rho_max[i] / h)) + 1) for i in pending]
+        grid = np.arange(max(counts)) * h
+        mid = grid[:-1] + 0.5 * h
+
+        sub = [states[i] for i in pending]
+        values, derivs = reduced_radial_batch(sub, grid, derivative=True)
+        f_mid = reduced_radial_batch(sub, mid)
+
+        still = []
+        for row, (i, count) in enumerate(zip(pending, counts)):
+            n, l = states[i]
+            spline = RadialSpline(n, l, h,
+                                  values[row, :count].copy(),
+                                  derivs[row, :count].copy())
+            err = np.max(np.abs(spline(mid[:count - 1]) - f_mid[row, :count - 1]))
+            if err <= rtol * peaks[i] or 2 * count - 1 > max_points:
+                splines[(n, l)] = spline
+            else:
+                still.append(i)
+        pending = still
+        h *= 0.5
+
+    return splines
+
+def build_radial_spline(n: int, l: int, rtol: float = LAGUERRE_TABLE_RTOL,
+                        max_points: int = 1 << 16):
+    """为单个 (n, l) 建立插值表"""
+    return build_radial_splines([(n, l)], rtol, max_points)[(n, l)]
+
+def laguerre_table_max_error(n: int, l: int, spline=None, samples: int = 200_000):
+    """
+    在整个支撑区间（并延伸到采样器用到的 r = 8n²）上，
+    对比插值表与直接 assoc_laguerre 递推，返回相对峰值的最大误差。
+    """
+    if spline is None:
+        spline = _LAGUERRE_CACHE.get((n, l)) or build_radial_spline(n, l)
+    rho = np.linspace(0.0, max(spline.rho_max, 16.0 * n) * 1.1, samples)
+    exact = assoc_laguerre(n - l - 1, 2*l + 1, rho) * np.exp(-rho / 2) * rho**l
+    return float(np.max(np.abs(spline(rho) - exact)) / np.max(np.abs(exact)))
 
 # -------------------------------------------------------------------
 # 数值稳定的完整 R_{n l}(r)
@@ -83,6 +362,14 @@ def radial_wavefunction(n: int, l: int, r: np.ndarray, Z: float = 1.0):
     if not (0 <= l <= n - 1):
         raise ValueError("l 必须满足 0 <= l <= n-1")
 
+    # 低次态直接递推反而更快（交叉点见 config.LAGUERRE_TABLE_MIN_DEGREE）；
+    # 预计算表还没就绪时也用批量引擎临时算一遍
+    spline = None
+    if _LAGUERRE_READY and n - l - 1 >= LAGUERRE_TABLE_MIN_DEGREE:
+        spline = _LAGUERRE_CACHE.get((n, l))
+    if spline is None:
+        return radial_wavefunctions([(n, l)], r, Z)[0]
+
     # 转成数组
     r = np.asarray(r, dtype=float)
 
@@ -93,28 +380,12 @@ def radial_wavefunction(n: int, l: int, r: np.ndarray, Z: float = 1.0):
     a0 = 1.0
     rho = 2.0 * Z * r_phys / n
 
-    # 关联 Laguerre：L_{n-l-1}^{2l+1}(rho)
-    k = n - l - 1
-    alpha = 2*l + 1
-
-    global _LAGUERRE_RHO_GRID, _LAGUERRE_CACHE, _LAGUERRE_READY
-
-    # 如果预计算表已经就绪，优先用插值
-    if _LAGUERRE_READY and (n, l) in _LAGUERRE_CACHE:
-        L_full = _LAGUERRE_CACHE[(n, l)]
-        L = np.interp(rho, _LAGUERRE_RHO_GRID, L_full)
-    else:
-        # 还没准备好，就临时算一遍（只会在启动早期用到）
-        L = assoc_laguerre(k, alpha, rho)
-
-    # 归一化因子（解析式）
-    num = math.factorial(n - l - 1)
-    den = 2*n*math.factorial(n + l)
-    norm = (2*Z/n) * math.sqrt(num / den)
+    # 预计算表已经就绪，用插值：f = rho^l e^{-rho/2} L
+    f = spline(rho)
 
-    # 数值安全区：关掉 exp / 乘法的溢出告警，把非有限值置 0
+    # 数值安全区：关掉乘法的溢出告警，把非有限值置 0
     with np.errstate(over="ignore", invalid="ignore"):
-        R = norm * np.exp(-rho/2) * (rho**l) * L
+        R = radial_norm(n, l, Z) * f
 
     # 把 inf / nan 清掉，防止弄坏坐标轴范围
     R = np.where(np.isfinite(R), R, 0.0)
@@ -122,37 +393,277 @@ def radial_wavefunction(n: int, l: int, r: np.ndarray, Z: float = 1.0):
 
 def radial_with_grid(n: int, l: int):
     r = radial_grid()
-    return r, radial_wavefunction(n, l, r)
+    return r, radial_wavefunctions([(n, l)], r)[0]
+
+# -------------------------------------------------------------------
+# 解析的径向节点与壳峰（按 (n, l) 缓存）
+# -------------------------------------------------------------------
+# 以 rho = 2r/n 为变量：
+#   节点 = L_k^α 的根（k = n-l-1，α = 2l+1），用 Golub–Welsch：
+#          Laguerre 三项递推的 Jacobi 矩阵（对称三对角）的特征值就是全部根；
+#   壳峰 = r²R² ∝ g(rho) = rho^{2l+2} e^{-rho} L² 的极大值。
+#          d/drho log g = q / (rho·L)，q(rho) = (2l+2-rho)·L + 2·rho·L'，
+#          q 在每个节点区间（含 [0, x_1] 与 [x_k, ∞)）内恰好变号一次，
+#          所有区间一起做向量化二分即可，不依赖任何 r 网格，也没有 R_MAX 截断。
+_RADIAL_STRUCTURE_CACHE = cache_manager.cache("radial_structure", pinned=True)
+
+# 二分次数：区间长度缩小 2^-60，远低于 float64 的相对精度
+_PEAK_BISECT_STEPS = 60
+
+def laguerre_roots(k: int, alpha: float):
+    """L_k^α 的全部根（升序），Golub–Welsch 特征值法"""
+    if k <= 0:
+        return np.array([])
+    from scipy.linalg import eigvalsh_tridiagonal
+
+    i = np.arange(k, dtype=float)
+    diag = 2.0 * i + alpha + 1.0
+    off = np.sqrt(i[1:] * (i[1:] + alpha))
+    return np.sort(eigvalsh_tridiagonal(diag, off))
+
+def _shell_peak_rho(n: int, l: int, nodes):
+    """各节点区间内 g(rho) 的极大值位置（rho），向量化二分 q(rho) = 0"""
+    k = n - l - 1
+    alpha = 2*l + 1
+
+    def q(x):
+        L = assoc_laguerre(k, alpha, x)
+        dL = -assoc_laguerre(k - 1, alpha + 1, x) if k > 0 else np.zeros_like(x)
+        return (2*l + 2 - x) * L + 2.0 * x * dL
+
+    lo = np.concatenate([[0.0], nodes])
+    # 最外区间的上端：q 的首项是 -rho·L，足够远处与 q(x_k) 异号
+    hi_outer = max(float(lo[-1]), 2.0 * l + 2.0) + 1.0
+    while np.sign(q(np.array([hi_outer]))[0]) == np.sign(q(lo[-1:])[0]):
+        hi_outer *= 2.0
+    hi = np.concatenate([nodes, [hi_outer]])
+
+    q_lo = np.sign(q(lo))
+    for _ in range(_PEAK_BISECT_STEPS):
+        mid = 0.5 * (lo + hi)
+        same = np.sign(q(mid)) == q_lo
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    return 0.5 * (lo + hi)
+
+def radial_structure(n: int, l: int):
+    """
+    返回 dict（数组都按 r 升序）：
+    - nodes：径向节点 r（n-l-1 个），也是壳与壳的分界
+    - peaks：每个壳内 r²R² 最大值所在的 r（n-l 个）
+    - nodes_rho / peaks_rho：同上，以 rho = 2r/n 为单位
+    """
+    key = (n, l)
+    cached = _RADIAL_STRUCTURE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    if n < 1:
+        raise ValueError("n 必须 >= 1")
+    if not (0 <= l <= n - 1):
+        raise ValueError("l 必须满足 0 <= l <= n-1")
+
+    nodes_rho = laguerre_roots(n - l - 1, 2*l + 1)
+    peaks_rho = _shell_peak_rho(n, l, nodes_rho)
+    structure = {
+        "nodes_rho": nodes_rho,
+        "peaks_rho": peaks_rho,
+        "nodes": 0.5 * n * nodes_rho,
+        "peaks": 0.5 * n * peaks_rho,
+    }
+    _RADIAL_STRUCTURE_CACHE.put(key, structure)
+    return structure
+
+def radial_shell_index(n: int, l: int, r):
+    """每个 r 所在的壳（0 = 最内壳），按节点半径二分查找"""
+    return np.searchsorted(radial_structure(n, l)["nodes"], r)
+
+# -------------------------------------------------------------------
+# 多态对比用的径向曲线：R、径向概率密度、累积概率（按 (n, l) 缓存）
+# -------------------------------------------------------------------
+_PROFILE_CACHE = cache_manager.cache("radial_profiles")
+
+@functools.lru_cache(maxsize=None)
+def radial_profile_grid(points: int = RADIAL_OVERLAY_POINTS,
+                        r_max: float = RADIAL_OVERLAY_R_MAX):
+    """所有对比曲线共用的 r 网格：√r 等距，r 小处步长小（1s 的峰在 r = 1，n = 12 的外壳在几百）"""
+    r = np.linspace(0.0, math.sqrt(r_max), points) ** 2
+    r.flags.writeable = False
+    return r
+
+def radial_profiles(states):
+    """
+    返回 {(n, l): {"R", "P", "cdf"}}，都定义在 radial_profile_grid() 上：
+    - R   ：R_{nl}(r)
+    - P   ：径向概率密度 r²R²，数值归一化到 ∫P dr = 1
+    - cdf ：累积概率 ∫_0^r P dr'（梯形积分）
+    缓存里没有的态一起交给批量引擎，在同一条 r 网格上一次算完。
+    """
+    states = radial_states(states)
+    r = radial_profile_grid()
+
+    out = {}
+    missing = []
+    for key in states:
+        profile = _PROFILE_CACHE.get(key)
+        if profile is None:
+            missing.append(key)
+        else:
+            out[key] = profile
+
+    if missing:
+        Rs = radial_wavefunctions(missing, r)
+        P = (r * r) * Rs * Rs
+        # 累积梯形积分；radial_norm 下 ∫r²R² 并不正好是 1，这里按数值总量归一化
+        cdf = np.zeros_like(P)
+        cdf[:, 1:] = np.cumsum(0.5 * (P[:, 1:] + P[:, :-1]) * np.diff(r), axis=1)
+        total = cdf[:, -1:]
+        P /= total
+        cdf /= total
+
+        for i, key in enumerate(missing):
+            profile = {"R": Rs[i], "P": P[i], "cdf": cdf[i]}
+            _PROFILE_CACHE.put(key, profile)
+            out[key] = profile
+
+    return out
+
+# ==========================
+# Laguerre 表的磁盘缓存（.npy + np.memmap）
+# ==========================
+# 两个文件：
+#   *.npy        形状 (2, total) 的 float64，第 0 行是各表节点值 f，第 1 行是 f'，
+#                按 n = 1..max_n、l = 0..n-1 的顺序首尾相接；
+#   *.index.npy  形状 (states, 4) 的 float64，每行 (n, l, offset, h)。
+def _laguerre_table_states(max_n: int):
+    return [(n, l) for n in range(1, max_n + 1) for l in range(0, n)]
+
+def laguerre_table_path(max_n: int = MAX_N,
+                        rtol: float = LAGUERRE_TABLE_RTOL,
+                        cache_dir: str = CACHE_DIR):
+    """
+    表文件路径：文件名里带上格式版本、MAX_N 和误差目标，
+    任一配置变化都会落到新文件上，旧文件自然失效。
+    （定义域和网格点数由误差目标自适应决定，不再单独出现在文件名里。）
+    """
+    name = f"laguerre_v{LAGUERRE_TABLE_VERSION}_n{max_n}_rtol{rtol:g}.npy"
+    return os.path.join(cache_dir, name)
+
+def _index_path(path):
+    return path[:-len(".npy")] + ".index.npy"
+
+def _atomic_save(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
 
-def laguerre_precompute_worker(queue, max_n: int = MAX_N, rho_points: int = 2000):
+def save_laguerre_table(path, splines, max_n: int = MAX_N):
     """
-    在子进程中预计算所有 (n,l) 的 Laguerre 多项式表，
-    计算完后通过 queue 把 (rho_grid, cache) 传回主进程。
+    把 {(n, l): RadialSpline} 写到磁盘。
+    先写临时文件再 os.replace，避免其它实例读到写了一半的表；
+    索引最后写，读取时以索引与数据长度是否吻合作为完整性校验。
     """
-    import numpy as _np
+    states = _laguerre_table_states(max_n)
+    total = sum(len(splines[key].values) for key in states)
 
-    Z = 1.0
-    rho_max = 2.0 * Z * R_MAX  # r ∈ [0, R_MAX] 时，n>=1 对应的 rho 最大值
+    table = np.empty((2, total), dtype=np.float64)
+    index = np.empty((len(states), 4), dtype=np.float64)
+    offset = 0
+    for i, key in enumerate(states):
+        sp = splines[key]
+        size = len(sp.values)
+        table[0, offset:offset + size] = sp.values
+        table[1, offset:offset + size] = sp.derivs
+        index[i] = (key[0], key[1], offset, sp.h)
+        offset += size
 
-    rho_grid = _np.linspace(0.0, rho_max, rho_points)
-    cache = {}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic_save(path, table)
+    _atomic_save(_index_path(path), index)
+
+def load_laguerre_table(path=None, max_n: int = MAX_N):
+    """
+    以 np.memmap 方式打开磁盘上的表并填充全局缓存。
+    文件不存在或内容不符时返回 False（调用方再去后台重建）。
+    """
+    global _LAGUERRE_PATH
+
+    if path is None:
+        path = laguerre_table_path(max_n)
+    if not (os.path.exists(path) and os.path.exists(_index_path(path))):
+        return False
+
+    states = _laguerre_table_states(max_n)
+    try:
+        table = np.load(path, mmap_mode="r")
+        index = np.load(_index_path(path))
+    except (OSError, ValueError):
+        return False
+    if (table.ndim != 2 or table.shape[0] != 2 or table.dtype != np.float64
+            or index.shape != (len(states), 4)):
+        return False
+
+    offsets = list(index[:, 2].astype(np.intp)) + [table.shape[1]]
+    splines = {}
+    for i, key in enumerate(states):
+        if tuple(index[i, :2].astype(int)) != key:
+            return False
+        lo, hi = offsets[i], offsets[i + 1]
+        if hi - lo < 2:
+            return False
+        # 每一段都是 memmap 视图，不会把整张表读进内存
+        splines[key] = RadialSpline(key[0], key[1], index[i, 3],
+                                    table[0, lo:hi], table[1, lo:hi])
+
+    apply_laguerre_table(splines)
+    _LAGUERRE_PATH = path
+    return True
+
+def laguerre_table_source():
+    """
+    本进程 radial_wavefunction 所用的表文件；还在直接递推、或表不在磁盘上时为 None。
+    进程池每个任务都带上它，子进程据此与主进程保持一致（见 use_laguerre_table）。
+    """
+    return _LAGUERRE_PATH if _LAGUERRE_READY else None
+
+def use_laguerre_table(path):
+    """
+    子进程侧：切换到与主进程相同的表状态。path 为 None 时改用直接递推；
+    表文件打不开时同样退回递推。
+    """
+    global _LAGUERRE_READY
+    if path == laguerre_table_source():
+        return
+    if path is None or not load_laguerre_table(path):
+        _LAGUERRE_READY = False
+
+def laguerre_precompute_worker(queue, max_n: int = MAX_N, rtol: float = LAGUERRE_TABLE_RTOL):
+    """
+    在子进程中为所有 (n,l) 建立误差受控的插值表，写入磁盘缓存，
+    然后只通过 queue 把文件路径传回主进程（不再 pickle 整个表）。
+    磁盘不可写时退回旧做法，直接传回整张表。
+    """
+    splines = build_radial_splines(max_n, rtol)
 
-    for n in range(1, max_n + 1):
-        for l in range(0, n):
-            k = n - l - 1
-            alpha = 2*l + 1
-            L = assoc_laguerre(k, alpha, rho_grid)
-            cache[(n, l)] = L.astype(float)
+    path = laguerre_table_path(max_n, rtol)
+    try:
+        save_laguerre_table(path, splines, max_n)
+    except OSError:
+        queue.put(splines)
+        return
 
     # 通过队列返回
-    queue.put((rho_grid, cache))
+    queue.put(path)
 
-def apply_laguerre_table(rho_grid, cache):
+def apply_laguerre_table(splines):
     """
-    在主进程中调用：接收子进程算好的 Laguerre 表，填充到全局缓存。
+    在主进程中调用：接收算好的插值表，填充到全局缓存。
     """
-    global _LAGUERRE_RHO_GRID, _LAGUERRE_CACHE, _LAGUERRE_READY
+    global _LAGUERRE_READY, _LAGUERRE_PATH
 
-    _LAGUERRE_RHO_GRID = np.asarray(rho_grid, dtype=float)
-    _LAGUERRE_CACHE = {tuple(k): np.asarray(v, dtype=float) for k, v in cache.items()}
+    _LAGUERRE_PATH = None
+    _LAGUERRE_CACHE.clear()
+    for k, v in splines.items():
+        _LAGUERRE_CACHE.put(tuple(k), v)
     _LAGUERRE_READY = True
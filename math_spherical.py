@@ -1,14 +1,17 @@
 ﻿# math_spherical.py
 """
 球谐函数 Y_{l}^{m}(theta, phi)
-使用 scipy.special.sph_harm，约定：
+使用归一化关联 Legendre 函数的稳定递推自行计算（不再逐次调用 scipy.special.sph_harm），
+相位约定与 scipy 相同（含 Condon–Shortley 相位）：
 theta: 极角 [0, pi] （colatitude）
 phi: 方位角 [0, 2*pi]
 """
 
+import functools
+import math
 import numpy as np
-from scipy.special import sph_harm
-from config import THETA_POINTS, PHI_POINTS
+from scipy.ndimage import maximum_filter1d
+from config import THETA_POINTS, PHI_POINTS, SPHERICAL_MESH_RTOL, SPHERICAL_NODE_REFINE
 
 def spherical_grid():
     """
@@ -21,24 +24,120 @@ def spherical_grid():
     theta_grid, phi_grid = np.meshgrid(theta, phi, indexing="ij")
     return theta_grid, phi_grid
 
+# -------------------------------------------------------------------
+# 归一化关联 Legendre 函数 P̄_l^m(cosθ)
+#   Y_l^m(θ, φ) = P̄_l^m(cosθ) · e^{i m φ}，m >= 0
+# 递推（全归一化形式，数值稳定，不会出现阶乘溢出）：
+#   P̄_m^m     = (-1)^m · sqrt((2m+1)/(4π) · Π_{k=1..m} (2k-1)/(2k)) · sin^m θ
+#   P̄_{m+1}^m = sqrt(2m+3) · cosθ · P̄_m^m
+#   P̄_l^m     = a_lm · (cosθ · P̄_{l-1}^m - b_lm · P̄_{l-2}^m)
+#   a_lm = sqrt((4l²-1)/(l²-m²))，b_lm = sqrt(((l-1)²-m²)/(4(l-1)²-1))
+# -------------------------------------------------------------------
+def _legendre_mm(m: int, sin_th: np.ndarray):
+    c = (2*m + 1) / (4.0 * math.pi)
+    for k in range(1, m + 1):
+        c *= (2*k - 1) / (2*k)
+    sign = -1.0 if (m % 2) else 1.0
+    return sign * math.sqrt(c) * sin_th**m
+
+def _legendre_ascend(l: int, m: int, cos_th: np.ndarray, P_mm: np.ndarray):
+    """从 P̄_m^m 沿 l 方向递推到 P̄_l^m"""
+    if l == m:
+        return P_mm
+    P_prev = P_mm
+    P_curr = math.sqrt(2*m + 3) * cos_th * P_mm
+    for ll in range(m + 2, l + 1):
+        a = math.sqrt((4*ll*ll - 1) / (ll*ll - m*m))
+        b = math.sqrt(((ll - 1)**2 - m*m) / (4*(ll - 1)**2 - 1))
+        P_prev, P_curr = P_curr, a * (cos_th * P_curr - b * P_prev)
+    return P_curr
+
+def legendre_normalized(l: int, m: int, theta: np.ndarray):
+    """P̄_l^{|m|}(cosθ)，m 取绝对值（负 m 的符号由 spherical_harmonic_parts 处理）"""
+    theta = np.asarray(theta, dtype=float)
+    m = abs(m)
+    return _legendre_ascend(l, m, np.cos(theta), _legendre_mm(m, np.sin(theta)))
+
+def legendre_normalized_all_m(l: int, theta: np.ndarray):
+    """
+    一次给出 m = 0..l 的 P̄_l^m(cosθ)，形状 (l+1,) + theta.shape。
+    cosθ / sinθ 只算一次，P̄_m^m 由 P̄_{m-1}^{m-1} 逐个乘 sinθ 得到。
+    """
+    theta = np.asarray(theta, dtype=float)
+    cos_th = np.cos(theta)
+    sin_th = np.sin(theta)
+
+    out = np.empty((l + 1,) + theta.shape)
+    P_mm = np.full(theta.shape, math.sqrt(1.0 / (4.0 * math.pi)))
+    for m in range(0, l + 1):
+        if m > 0:
+            P_mm = -math.sqrt((2*m + 1) / (2.0*m)) * sin_th * P_mm
+        out[m] = _legendre_ascend(l, m, cos_th, P_mm)
+    return out
+
+# -------------------------------------------------------------------
+# Y_l^m：实部与虚部一起返回
+# -------------------------------------------------------------------
+def _apply_phase(m: int, P: np.ndarray, phi: np.ndarray):
+    """
+    由 P̄_l^{|m|} 与 e^{i|m|φ} 组装 Y_l^m 的 (实部, 虚部)。
+    负 m：Y_l^{-μ} = (-1)^μ · conj(Y_l^μ)。
+    """
+    mu = abs(m)
+    if mu == 0:
+        return P * np.ones_like(phi), np.zeros(np.broadcast(P, phi).shape)
+    sign = -1.0 if (m < 0 and mu % 2) else 1.0
+    re = (sign * P) * np.cos(mu * phi)
+    im = (sign * P) * np.sin(mu * phi)
+    if m < 0:
+        im = -im
+    return re, im
+
+def spherical_harmonic_parts(l: int, m: int, theta: np.ndarray, phi: np.ndarray):
+    """
+    返回 (Re[Y_l^m], Im[Y_l^m])，共享同一次 P̄_l^{|m|} 计算。
+    """
+    phi = np.asarray(phi, dtype=float)
+    P = legendre_normalized(l, m, theta)
+    return _apply_phase(m, P, phi)
+
+def spherical_harmonics_all_m(l: int, theta: np.ndarray, phi: np.ndarray):
+    """
+    一次给出 m = -l..l 的所有 Y_l^m，返回 (re, im)，
+    形状均为 (2l+1,) + broadcast(theta, phi).shape，第 0 行对应 m = -l。
+    """
+    phi = np.asarray(phi, dtype=float)
+    P_all = legendre_normalized_all_m(l, theta)
+    shape = np.broadcast(P_all[0], phi).shape
+    re = np.empty((2*l + 1,) + shape)
+    im = np.empty((2*l + 1,) + shape)
+    for m in range(-l, l + 1):
+        re[m + l], im[m + l] = _apply_phase(m, P_all[abs(m)], phi)
+    return re, im
+
+def spherical_harmonic_abs2(l: int, m: int, theta: np.ndarray):
+    """|Y_l^m|² = P̄_l^{|m|}(cosθ)²，与 φ 无关"""
+    P = legendre_normalized(l, m, theta)
+    return P * P
+
 def spherical_harmonic(l: int, m: int, theta: np.ndarray, phi: np.ndarray):
     """
     计算 Y_l^m(theta, phi)，返回 complex ndarray
-    scipy 的 sph_harm(m, l, phi, theta) 参数顺序是 (m, l, phi, theta)
     """
-    return sph_harm(m, l, phi, theta)
+    re, im = spherical_harmonic_parts(l, m, theta, phi)
+    return re + 1j * im
 
 def spherical_harmonic_real(l: int, m: int, theta: np.ndarray, phi: np.ndarray):
     """
     返回 Re[Y_l^m]
     """
-    return spherical_harmonic(l, m, theta, phi).real
+    return spherical_harmonic_parts(l, m, theta, phi)[0]
 
 def spherical_harmonic_imag(l: int, m: int, theta: np.ndarray, phi: np.ndarray):
     """
     返回 Im[Y_l^m]
     """
-    return spherical_harmonic(l, m, theta, phi).imag
+    return spherical_harmonic_parts(l, m, theta, phi)[1]
 
 def has_nonzero_imag_part(l: int, m: int, atol: float = 1e-8):
     """
@@ -46,10 +145,135 @@ def has_nonzero_imag_part(l: int, m: int, atol: float = 1e-8):
     用少量采样点判断，避免整网格计算。
     """
     theta_samples = np.linspace(0.1, np.pi - 0.1, 5)
-    phi_samples = np.linspace(0.0, 2.0 * np.pi, 5)
+    # φ 避开 π/2 的整数倍：否则 sin(mφ) 在 |m| = 2、4 时恰好全为 0
+    phi_samples = np.linspace(0.1, 2.0 * np.pi - 0.1, 5)
     for theta in theta_samples:
         for phi in phi_samples:
             val = spherical_harmonic(l, m, theta, phi)
             if abs(val.imag) > atol:
                 return True
     return False
+
+# -------------------------------------------------------------------
+# 按 l、m 自适应的 (θ, φ) 网格轴
+# -------------------------------------------------------------------
+# Y_l^m = P̄_l^{|m|}(cosθ)·e^{imφ} 可分离，所以网格取张量积，两条轴分别处理：
+# - 分段线性插值的误差 ≈ h²|f''|/8；θ、φ 两个方向的误差会叠加，各分一半预算，
+#   即每条轴上要求 h²|f''|/8 <= (rtol/2)·max|f|：
+#   θ 轴按 |P̄''| 做误差均布（振荡区密、极区 / 平缓处疏），
+#   φ 轴上 |d²/dφ² e^{imφ}| = m²，等距即可；
+#   两条轴都再以单位球本身（曲率 1）的弦高误差为下限。
+# - 节点线正好是 θ = 常数的圆和 φ = 常数的经线：
+#   θ 节点由 P̄ 的变号区间二分得到，φ 节点 cos(mφ) / sin(mφ) = 0 是解析的；
+#   把节点本身和两侧各一个近邻点插进轴里，变号处的颜色过渡就收窄在很小的范围内。
+_MESH_SCAN_POINTS = 4097
+_NODE_OFFSETS = (-0.125, 0.0, 0.125)  # 以局部步长为单位
+_MIN_THETA_POINTS = 9
+_MIN_PHI_POINTS = 17
+
+def _dedupe_axis(x, tol=1e-9):
+    x = np.sort(np.asarray(x, dtype=float))
+    keep = np.concatenate([[True], np.diff(x) > tol])
+    return x[keep]
+
+def _theta_nodes(l: int, m: int, scan, P):
+    """P̄_l^{|m|}(cosθ) 在 (0, π) 内的全部零点（极点上的零点不算）"""
+    idx = np.nonzero(P[:-1] * P[1:] < 0)[0]
+    if len(idx) == 0:
+        return np.array([])
+    lo, hi = scan[idx], scan[idx + 1]
+    s_lo = np.sign(P[idx])
+    for _ in range(50):
+        mid = 0.5 * (lo + hi)
+        same = np.sign(legendre_normalized(l, m, mid)) == s_lo
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    return 0.5 * (lo + hi)
+
+def _insert_nodes(axis, nodes):
+    """在轴上插入节点和两侧近邻点，近邻间距取节点处的局部步长"""
+    if len(nodes) == 0:
+        return axis
+    h = np.interp(nodes, 0.5 * (axis[1:] + axis[:-1]), np.diff(axis))
+    extra = (nodes[:, None] + h[:, None] * np.array(_NODE_OFFSETS)[None, :]).ravel()
+    extra = extra[(extra > axis[0]) & (extra < axis[-1])]
+    return _dedupe_axis(np.concatenate([axis, extra]))
+
+@functools.lru_cache(maxsize=256)
+def spherical_mesh_axes(l: int, m: int, rtol: float = SPHERICAL_MESH_RTOL,
+                        refine_nodes: bool = SPHERICAL_NODE_REFINE):
+    """
+    返回 (theta, phi) 两条升序一维轴，theta ∈ [0, π]，phi ∈ [0, 2π]。
+    同一 (l, m) 的实部和虚部共用（φ 节点两者的都插入）。
+    """
+    h_max = math.sqrt(4.0 * rtol)   # 曲率为 1 时满足半份误差预算的步长
+
+    # ---- θ：按 |P̄''| / max|P̄| 误差均布 ----
+    scan = np.linspace(0.0, np.pi, _MESH_SCAN_POINTS)
+    P = legendre_normalized(l, m, scan)
+    d2 = np.abs(np.gradient(np.gradient(P, scan), scan)) / max(np.max(np.abs(P)), 1e-300)
+    # |f''| 在拐点（也就是节点）处为 0，取约 1/4 个振荡周期内的最大值作为局部曲率
+    window = max(1, int(_MESH_SCAN_POINTS / (4.0 * (l + 0.5))))
+    d2 = maximum_filter1d(d2, size=window, mode="nearest")
+    density = np.sqrt(np.maximum(d2, 1.0)) / h_max          # 每弧度的点数
+    cum = np.concatenate([[0.0], np.cumsum(0.5 * (density[1:] + density[:-1]) * np.diff(scan))])
+    count = max(_MIN_THETA_POINTS, int(math.ceil(cum[-1])) + 1)
+    theta = np.interp(np.linspace(0.0, cum[-1], count), cum, scan)
+
+    # ---- φ：等距，|m| 次振荡 ----
+    mu = abs(m)
+    count = max(_MIN_PHI_POINTS, int(math.ceil(2.0 * np.pi * max(mu, 1) / h_max)) + 1)
+    phi = np.linspace(0.0, 2.0 * np.pi, count)
+
+    if refine_nodes:
+        theta = _insert_nodes(theta, _theta_nodes(l, m, scan, P))
+        if mu > 0:
+            # cos(mφ) 与 sin(mφ) 的零点合起来是 φ = jπ / (2|m|)
+            phi = _insert_nodes(phi, np.arange(1, 4 * mu) * np.pi / (2 * mu))
+
+    theta.flags.writeable = False
+    phi.flags.writeable = False
+    return theta, phi
+
+# -------------------------------------------------------------------
+# 与 scipy 对比：速度与精度
+# -------------------------------------------------------------------
+def benchmark_against_scipy(l_max: int = 12, points: int = 200_000, seed: int = 0):
+    """
+    在随机 (θ, φ) 上对比本模块与 scipy 的球谐函数。
+    返回 [(l, m, 本模块耗时, scipy 耗时, 最大绝对误差), ...]。
+    """
+    import time
+    import scipy.special as sps
+
+    if hasattr(sps, "sph_harm_y"):
+        def scipy_ylm(l, m, theta, phi):
+            return sps.sph_harm_y(l, m, theta, phi)
+    else:
+        def scipy_ylm(l, m, theta, phi):
+            return sps.sph_harm(m, l, phi, theta)
+
+    rng = np.random.default_rng(seed)
+    theta = np.arccos(rng.uniform(-1.0, 1.0, points))
+    phi = rng.uniform(0.0, 2.0 * np.pi, points)
+
+    results = []
+    for l in range(0, l_max + 1):
+        for m in range(-l, l + 1):
+            t0 = time.perf_counter()
+            re, im = spherical_harmonic_parts(l, m, theta, phi)
+            t1 = time.perf_counter()
+            ref = scipy_ylm(l, m, theta, phi)
+            t2 = time.perf_counter()
+            err = float(np.max(np.abs((re + 1j * im) - ref)))
+            results.append((l, m, t1 - t0, t2 - t1, err))
+    return results
+
+if __name__ == "__main__":
+    rows = benchmark_against_scipy()
+    for l, m, t_own, t_ref, err in rows:
+        print(f"l={l:2d} m={m:+3d}  own {t_own*1e3:7.2f} ms  scipy {t_ref*1e3:7.2f} ms  max|ΔY| {err:.2e}")
+    t_own = sum(r[2] for r in rows)
+    t_ref = sum(r[3] for r in rows)
+    print(f"total: own {t_own:.3f} s, scipy {t_ref:.3f} s, speedup {t_ref / t_own:.2f}x, "
+          f"max|ΔY| {max(r[4] for r in rows):.2e}")
@@ -0,0 +1,119 @@
+﻿# math_superposition.py
+"""
+叠加态 Ψ(t) = Σ c_k ψ_{n_k l_k m_k} e^{-i E_{n_k} t}（原子单位，E_n = -Z²/2n²）：
+- 固定一组抽样点，按混合密度 p_mix = Σ|c_k|²|ψ_k|² 抽取
+  （各项用 HydrogenSampler 按 |c_k|² 分配点数；p_mix 正好是 |Ψ(t)|² 的时间平均）
+- 每个基函数在这组点上的复数值只算一次，存成 (N, K) 矩阵；
+  每一帧只做一次 (N, K) × (K,) 的矩阵–向量乘法
+- 矩阵预先除以 sqrt(K·p_mix)：于是 |a(t)| <= 1（Cauchy–Schwarz），
+  |a|² = |Ψ|² / (K·p_mix) 就是“此刻密度相对时间平均”的比值，可以直接当透明度
+"""
+
+import math
+
+import numpy as np
+
+from math_wave import psi_components
+from math_wave_sample import HydrogenSampler
+from cache_manager import cache_manager
+from config import SHELL_DISPLAY_FILTER, SAMPLING_SEED, SAMPLING_WORKERS
+
+_CLOUD_CACHE = cache_manager.cache("superposition_clouds")
+
+def energy(n: int, Z: float = 1.0):
+    """氢原子能级 E_n = -Z² / (2n²)（Hartree）"""
+    return -Z * Z / (2.0 * n * n)
+
+def normalize_terms(terms):
+    """
+    规范化项列表：terms 为 (n, l, m, c) 序列，c 可以是复数。
+    相同 (n, l, m) 的系数合并，去掉 c = 0 的项，再把 Σ|c|² 归一到 1。
+    返回按 (n, l, m) 排序的元组，可直接作缓存键。
+    """
+    merged = {}
+    for n, l, m, c in terms:
+        n, l, m = int(n), int(l), int(m)
+        if n < 1 or not (0 <= l <= n - 1) or not (-l <= m <= l):
+            raise ValueError(f"invalid quantum numbers: {(n, l, m)}")
+        merged[(n, l, m)] = merged.get((n, l, m), 0.0) + complex(c)
+
+    items = [(key, c) for key, c in sorted(merged.items()) if abs(c) > 0.0]
+    if not items:
+        raise ValueError("superposition needs at least one non-zero coefficient")
+    norm = math.sqrt(sum(abs(c) ** 2 for _, c in items))
+    return tuple((n, l, m, c / norm) for (n, l, m), c in items)
+
+def _split_counts(weights, N):
+    """按权重把 N 个点分给各项（最大余数法，确定性，不用随机数）"""
+    raw = np.asarray(weights, dtype=float) * N
+    counts = np.floor(raw).astype(int)
+    rest = N - int(counts.sum())
+    if rest > 0:
+        counts[np.argsort(-(raw - counts))[:rest]] += 1
+    return counts
+
+class SuperpositionCloud:
+    """
+    一组固定的抽样点和基函数矩阵：
+    - pts       (N, 3) 点坐标
+    - basis     (N, K) complex64，第 k 列为 c_k ψ_k / sqrt(K·p_mix)
+    - energies  (K,)   各项能量
+    amplitude(t) 返回 a(t) = basis @ e^{-iEt}，|a| <= 1。
+    """
+
+    def __init__(self, terms, N, seed=SAMPLING_SEED):
+        self.terms = normalize_terms(terms)
+        self.N = int(N)
+        K = len(self.terms)
+        coeffs = np.array([c for _, _, _, c in self.terms])
+        self.energies = np.array([energy(n) for n, _, _, _ in self.terms])
+
+        # 1) 混合密度抽样：第 k 项分到 |c_k|²·N 个点，种子与单态点云相同的派生方式
+        parts = []
+        rmax = 0.0
+        for (n, l, m, _), count in zip(self.terms, _split_counts(np.abs(coeffs) ** 2, self.N)):
+            if count == 0:
+                continue
+            seed_seq = np.random.SeedSequence(seed, spawn_key=(n, l, m + l))
+            sampler = HydrogenSampler(n, l, m, count, seed=seed_seq, workers=SAMPLING_WORKERS)
+            parts.append(sampler.sample(count))
+            rmax = max(rmax, sampler.rmax)
+
+        r, th, ph, x, y, z = (np.concatenate(a) for a in zip(*parts))
+        # 显示过滤对所有点用同一个半径（各项里最大的那个），不改变混合密度的形状
+        if SHELL_DISPLAY_FILTER:
+            keep = r <= rmax
+            r, th, ph, x, y, z = (a[keep] for a in (r, th, ph, x, y, z))
+        self.pts = np.column_stack((x, y, z))
+
+        # 2) 每个基函数在全部点上求一次值
+        #    radial_wavefunction 的归一化满足 ∫r²R² dr = n/2，这里除掉，使 ψ_k 真正归一
+        psi = np.empty((len(r), K), dtype=complex)
+        for k, (n, l, m, _) in enumerate(self.terms):
+            R, Yr, Yi = psi_components(n, l, m, r, th, ph)
+            psi[:, k] = (R / math.sqrt(0.5 * n)) * (Yr + 1j * Yi)
+
+        p_mix = np.sum(np.abs(coeffs[None, :] * psi) ** 2, axis=1)
+        scale = 1.0 / np.sqrt(K * np.maximum(p_mix, 1e-300))
+        self.basis = (psi * coeffs[None, :] * scale[:, None]).astype(np.complex64)
+
+    def amplitude(self, t: float):
+        """a(t) = Ψ(t) / sqrt(K·p_mix)，每帧一次矩阵–向量乘法"""
+        phases = np.exp(-1j * self.energies * t).astype(np.complex64)
+        return self.basis @ phases
+
+    def beat_period(self):
+        """最快的拍频周期 2π / max|E_i - E_j|；所有项能量相同时退回整体相位的周期 2π / |E|"""
+        E = np.unique(self.energies)
+        if len(E) > 1:
+            return 2.0 * np.pi / float(E.max() - E.min())
+        return 2.0 * np.pi / abs(float(E[0]))
+
+def superposition_cloud(terms, N, seed=SAMPLING_SEED):
+    """按 (规范化项, N, 种子) 缓存的 SuperpositionCloud"""
+    key = (normalize_terms(terms), int(N), seed)
+    cloud = _CLOUD_CACHE.get(key)
+    if cloud is None:
+        cloud = SuperpositionCloud(terms, N, seed)
+        _CLOUD_CACHE.put(key, cloud, nbytes=cloud.pts.nbytes + cloud.basis.nbytes)
+    return cloud
@@ -5,7 +5,13 @@
 
 import numpy as np
 from math_radial import radial_wavefunction
-from math_spherical import spherical_harmonic_real, spherical_harmonic_imag
+from math_spherical import (
+    spherical_harmonic_real,
+    spherical_harmonic_imag,
+    spherical_harmonic_abs2,
+    spherical_harmonic_parts,
+)
+from tracing import trace_span
 
 def psi_real(n, l, m, r, theta, phi):
     """ψ 的实部 = R * Re(Y)"""
@@ -24,6 +30,27 @@ def psi_prob(n, l, m, r, theta, phi):
     概率密度 |ψ|^2 = |R|^2 * |Y|^2
     """
     R = radial_wavefunction(n, l, r)
-    Yr = spherical_harmonic_real(l, m, theta, phi)
-    Yi = spherical_harmonic_imag(l, m, theta, phi)
-    return (R * R) * (Yr * Yr + Yi * Yi)
+    Y2 = spherical_harmonic_abs2(l, m, theta)
+    return (R * R) * Y2
+
+def psi_components(n, l, m, r, theta, phi):
+    """
+    单次求值：返回 (R, Re(Y), Im(Y))。
+    三种显示模式（实部 / 虚部 / |ψ|²）都可以由这三个数组直接组合出来，
+    调用方缓存它们之后切换模式就不再需要任何特殊函数求值。
+    """
+    with trace_span("psi.radial", n=n, l=l, points=np.size(r)):
+        R = radial_wavefunction(n, l, r)
+    with trace_span("psi.angular", l=l, m=m, points=np.size(theta)):
+        Yr, Yi = spherical_harmonic_parts(l, m, theta, phi)
+    return R, Yr, Yi
+
+def psi_from_components(mode, R, Yr, Yi):
+    """由 psi_components 的结果组合出指定模式的数值"""
+    if mode == "psi_real":
+        return R * Yr
+    if mode == "psi_imag":
+        return R * Yi
+    if mode == "psi_prob":
+        return (R * R) * (Yr * Yr + Yi * Yi)
+    raise ValueError(f"unknown mode: {mode}")
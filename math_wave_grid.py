@@ -0,0 +1,96 @@
+﻿# math_wave_grid.py
+"""
+均匀笛卡尔网格上的 ψ：
+- 网格半宽取径向概率 r²R² 累积到 VOLUME_EXTENT_QUANTILE 处的半径
+- 只求一次 R(r)、Re Y、Im Y（float32 存储），实部 / 虚部 / |ψ|² 都由它们组合
+- 按 (n, l, m, 分辨率) 缓存在统一缓存层里
+- 等概率面阈值：点云按 |ψ|² 抽样，所以 {|ψ|² ≥ t} 内的概率就是样本里 |ψ|² ≥ t 的比例，
+  阈值直接取样本 |ψ|² 的分位数
+"""
+
+import numpy as np
+
+from math_radial import radial_wavefunction
+from math_spherical import spherical_harmonic_parts
+from math_wave import psi_components, psi_from_components
+from math_wave_sample import HydrogenSampler
+from cache_manager import cache_manager
+from config import (
+    VOLUME_GRID_RES,
+    VOLUME_EXTENT_QUANTILE,
+    ISOSURFACE_SAMPLES,
+    SAMPLING_SEED,
+)
+
+_GRID_CACHE = cache_manager.cache("wave_grid")
+_DENSITY_CACHE = cache_manager.cache("enclosure_density")
+
+def radial_extent(n: int, l: int, quantile: float = VOLUME_EXTENT_QUANTILE):
+    """径向概率 ∫ r²R² dr 累积到 quantile 时的半径"""
+    r = np.linspace(0.0, max(8.0 * n * n, 10.0), 4001)
+    R = radial_wavefunction(n, l, r)
+    P = r * r * R * R
+    cdf = np.cumsum(P)
+    cdf /= cdf[-1]
+    return float(r[np.searchsorted(cdf, quantile)])
+
+def psi_grid(n: int, l: int, m: int, res: int = VOLUME_GRID_RES):
+    """
+    返回字典：origin / spacing / dims 描述网格（x 最快变化，即 VTK 的点顺序），
+    R / Yr / Yi 是展平后的 float32 数组。
+    """
+    key = (n, l, m, res)
+    grid = _GRID_CACHE.get(key)
+    if grid is not None:
+        return grid
+
+    half = radial_extent(n, l)
+    axis = np.linspace(-half, half, res)
+    spacing = axis[1] - axis[0]
+
+    # indexing="ij" 后按 Fortran 顺序展平：x 变化最快，与 pv.ImageData 的点顺序一致
+    X, Y, Z = np.meshgrid(axis, axis, axis, indexing="ij")
+    x = X.ravel(order="F")
+    y = Y.ravel(order="F")
+    z = Z.ravel(order="F")
+
+    r = np.sqrt(x * x + y * y + z * z)
+    theta = np.arccos(np.divide(z, r, out=np.ones_like(z), where=r > 0).clip(-1.0, 1.0))
+    phi = np.arctan2(y, x)
+
+    R = radial_wavefunction(n, l, r)
+    Yr, Yi = spherical_harmonic_parts(l, m, theta, phi)
+
+    grid = {
+        "origin": (-half, -half, -half),
+        "spacing": (spacing, spacing, spacing),
+        "dims": (res, res, res),
+        "R": R.astype(np.float32),
+        "Yr": np.asarray(Yr, dtype=np.float32),
+        "Yi": np.asarray(Yi, dtype=np.float32),
+    }
+    _GRID_CACHE.put(key, grid)
+    return grid
+
+def psi_grid_values(mode: str, grid):
+    """在缓存的网格因子上组合出指定模式（psi_real / psi_imag / psi_prob）"""
+    return psi_from_components(mode, grid["R"], grid["Yr"], grid["Yi"])
+
+def enclosure_threshold(n: int, l: int, m: int, fraction: float,
+                        samples: int = ISOSURFACE_SAMPLES):
+    """
+    返回 |ψ|² 的阈值 t，使等值面 |ψ|² = t 内部的概率约为 fraction。
+    样本 |ψ|² 排好序后按态缓存，之后任意 fraction 都只是一次取下标。
+    """
+    key = (n, l, m, samples)
+    density = _DENSITY_CACHE.get(key)
+    if density is None:
+        seed = np.random.SeedSequence(SAMPLING_SEED, spawn_key=(n, l, m + l))
+        r, th, ph, _, _, _ = HydrogenSampler(n, l, m, samples, seed=seed).sample()
+        R, Yr, Yi = psi_components(n, l, m, r, th, ph)
+        density = np.sort(psi_from_components("psi_prob", R, Yr, Yi))
+        _DENSITY_CACHE.put(key, density)
+
+    fraction = min(max(fraction, 0.0), 1.0)
+    idx = int(round((1.0 - fraction) * (len(density) - 1)))
+    return float(density[idx])
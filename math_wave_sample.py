@@ -1,83 +1,314 @@
 ﻿# math_wave_sample.py
 """
-严格物理连续采样（按 |ψ|² r² sinθ），
-但径向范围根据 R_{nl}(r) 自动裁剪到“最后一层壳附近”，
-避免把一大段几乎没有结构的 tail 也纳入归一化，导致外层壳被稀释得看不见。
+严格物理连续采样（按 |ψ|² r² sinθ）。
+径向按 r²R² 精确抽样（壳分解 + gamma 包络的组合–拒绝法，无网格、无截断）；
+“只显示到最后一层壳附近”的裁剪保留为可选的显示过滤（display_mask），
+避免把一大段几乎没有结构的 tail 也画出来，导致外层壳被稀释得看不见。
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from math_radial import radial_wavefunction
-from math_spherical import spherical_harmonic_real, spherical_harmonic_imag
+from numpy.polynomial import Legendre, Polynomial
+from numpy.polynomial.legendre import leggauss
+from numpy.polynomial.laguerre import laggauss
+from scipy.special import gammaln
+from math_radial import radial_wavefunction, radial_norm, assoc_laguerre, radial_structure
+from math_spherical import spherical_harmonic_abs2
+from cache_manager import cache_manager
+from tracing import trace_span
+
+# -------------------------------------------------------------------
+# 径向精确采样的预处理
+# -------------------------------------------------------------------
+# 以 rho = 2r/n 为变量，径向密度
+#     g(rho) ∝ r² R_{nl}(r)² ∝ rho^{2l+2} e^{-rho} [L_{n-l-1}^{2l+1}(rho)]²
+# 是“多项式 × e^{-rho}”，即若干 gamma 分布的有限混合。但 L² 的系数正负交替，
+# 直接按系数拆成混合分量时正负部分相互抵消（n=12 时正部分总质量是 1 的 10^9 倍以上），
+# 没法直接“选分量再抽 gamma”。
+# 这里改为按 L 的根（径向节点）把 rho 轴切成若干壳：
+#   1) 每个壳的概率质量 prob 用 Gauss 积分精确算出（内层壳 Gauss–Legendre，
+#      最外壳 [x_k, ∞) 用 Gauss–Laguerre；被积函数是多项式 × e^{-rho}，节点足够时积分是精确的）；
+#   2) 每个壳配一个 gamma 包络 M·Gamma(κ, β)（壳内 g/prob <= M·pdf）；
+#   3) 按 prob·M 选壳、抽 gamma 变量、壳外拒绝，再以 (g/prob)/(M·pdf) 的概率接受。
+# 接受下来的点正好服从 g 本身，没有网格插值也没有截断。
+# 包络约束：最内壳 κ <= 2l+3（rho→0 时不比 rho^{2l+2} 衰减快），
+#           最外壳 β <= 1（rho→∞ 时不比 e^{-rho} 衰减快）。
+_ENVELOPE_MARGIN = 1.03      # 包络常数的安全余量
+_ENVELOPE_CHECK_POINTS = 4001
+
+def _log_radial_density(n, l, rho):
+    """log[r² R_{nl}(r)²]，r = n·rho/2（未归一化，归一化常数见 _radial_envelope）"""
+    r = 0.5 * n * rho
+    R = radial_wavefunction(n, l, r)
+    with np.errstate(divide="ignore"):
+        return 2.0 * np.log(r) + 2.0 * np.log(np.abs(R))
+
+def _log_radial_density_exact(n, l, rho):
+    """
+    同一个 log[r² R²]，但全程在对数域里算（预处理用）：
+    远尾部 R 本身会下溢成 0，这里仍然给出有限的对数值。
+    """
+    rho = np.asarray(rho, dtype=float)
+    L = assoc_laguerre(n - l - 1, 2*l + 1, rho)
+    r = 0.5 * n * rho
+    with np.errstate(divide="ignore"):
+        return (2.0 * np.log(r) + 2.0 * np.log(radial_norm(n, l))
+                + 2.0 * (l * np.log(rho) - 0.5 * rho + np.log(np.abs(L))))
+
+def _log_gamma_pdf(kappa, beta, x):
+    with np.errstate(divide="ignore"):
+        return kappa * np.log(beta) - gammaln(kappa) + (kappa - 1.0) * np.log(x) - beta * x
+
+def _radial_envelope(n, l):
+    """
+    为 (n, l) 构造壳分解与各壳的 gamma 包络。
+    返回 dict：prob / lo / hi / kappa / beta / log_M 均为长度 = 壳数的数组，
+    log_total 为 ∫ r²R² drho 的对数（归一化常数）。
+    壳的分界直接取 radial_structure 的解析节点。
+    """
+    k = n - l - 1
+    nodes = radial_structure(n, l)["nodes_rho"]
+    edges = np.concatenate([[0.0], nodes, [np.inf]])
+
+    gl_x, gl_w = leggauss(64)
+    lg_x, lg_w = laggauss(64)
+
+    shells = []
+    for i in range(k + 1):
+        lo, hi = edges[i], edges[i + 1]
+        outer = not np.isfinite(hi)
+        hi_check = (max(lo, 2.0 * n) + 40.0 + 8.0 * n) if outer else hi
+
+        # 壳内质量（未归一化）
+        if not outer:
+            xq = 0.5 * (hi - lo) * gl_x + 0.5 * (hi + lo)
+            mass = 0.5 * (hi - lo) * float(np.sum(gl_w * np.exp(_log_radial_density_exact(n, l, xq))))
+        else:
+            # ∫_lo^∞ g = ∫_0^∞ e^{-s} [g(lo+s) e^{s}] ds
+            mass = float(np.sum(lg_w * np.exp(_log_radial_density_exact(n, l, lo + lg_x) + lg_x)))
+
+        # 壳内矩 → 矩匹配的 gamma 参数，作为包络搜索的起点
+        x = np.linspace(lo, hi_check, _ENVELOPE_CHECK_POINTS)[1:-1]
+        log_g = _log_radial_density_exact(n, l, x)
+        y = np.exp(log_g - log_g.max())
+        w = y / y.sum()
+        mu = float(np.sum(w * x))
+        var = float(np.sum(w * (x - mu) ** 2))
+
+        shells.append((lo, hi, hi_check, mass, mu, var))
+
+    # 归一化常数：g_norm = r²R² / total
+    log_total = float(np.log(sum(sh[3] for sh in shells)))
+
+    prob, lo_arr, hi_arr, kappa_arr, beta_arr, logM_arr = [], [], [], [], [], []
+    for i, (lo, hi, hi_check, mass, mu, var) in enumerate(shells):
+        log_mass = np.log(mass)
+        first = (i == 0)
+        last = (i == k)
+
+        def log_M(kappa, beta):
+            """壳内 max log[(g / 壳质量) / pdf]；不满足边界约束时返回 inf"""
+            if first and kappa > 2*l + 3:
+                return np.inf
+            if last and (beta > 1.0 or (beta == 1.0 and kappa < 2*n + 1)):
+                return np.inf
+            x = np.linspace(lo, hi_check, _ENVELOPE_CHECK_POINTS)[1:]
+            if not last:
+                x = x[:-1]
+            elif beta < 1.0 and kappa < 2*n + 1:
+                # 比值在 rho* ≈ (2n+1-κ)/(1-β) 附近才开始下降，检查区间要盖住它
+                end = 2.0 * (2*n + 1 - kappa) / (1.0 - beta)
+                if end > hi_check:
+                    x = np.concatenate([x, np.geomspace(hi_check, end, _ENVELOPE_CHECK_POINTS)])
+            ratio = (_log_radial_density_exact(n, l, x) - log_mass
+                     - _log_gamma_pdf(kappa, beta, x))
+            return float(np.max(ratio[np.isfinite(ratio)]))
+
+        k0 = mu * mu / var
+        b0 = mu / var
+        starts = [(k0, b0)]
+        if first:
+            starts += [(2*l + 3, (2*l + 3) / mu), (2*l + 3, 1.0)]
+        if last:
+            starts += [(2*n + 1, 1.0), (k0, min(b0, 0.999))]
+
+        best = (np.inf, None)
+        for kk, bb in starts:
+            for sk in (0.5, 0.7, 0.85, 1.0, 1.2):
+                for sb in (0.7, 0.85, 1.0, 1.2):
+                    cand = (kk * sk, bb * sb * sk)
+                    val = log_M(*cand)
+                    if val < best[0]:
+                        best = (val, cand)
+            for sb in (0.8, 0.9, 0.95, 1.0):
+                cand = (kk, bb * sb)
+                val = log_M(*cand)
+                if val < best[0]:
+                    best = (val, cand)
+
+        prob.append(mass)
+        lo_arr.append(lo)
+        hi_arr.append(hi)
+        kappa_arr.append(best[1][0])
+        beta_arr.append(best[1][1])
+        logM_arr.append(best[0] + np.log(_ENVELOPE_MARGIN))
+
+    prob = np.array(prob) / np.exp(log_total)
+    log_M = np.array(logM_arr)
+    # 批量拒绝时各壳接受率不同，提议阶段要按 prob·M 选壳，接受后的分布才正好按 prob 分配
+    propose = prob * np.exp(log_M)
+    return {
+        "prob": prob,
+        "propose": propose / propose.sum(),
+        "log_total": log_total,
+        "lo": np.array(lo_arr),
+        "hi": np.array(hi_arr),
+        "kappa": np.array(kappa_arr),
+        "beta": np.array(beta_arr),
+        "log_M": log_M,
+        # 期望接受率 = 1 / Σ prob·M
+        "accept": float(1.0 / np.sum(prob * np.exp(log_M))),
+    }
+
+def make_seed_sequence(seed):
+    """随机源：seed 可以是 None / 整数 / SeedSequence / Generator，统一成 SeedSequence"""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(0, 2**63, size=4))
+    return np.random.SeedSequence(seed)
 
 class HydrogenSampler:
-    _angular_cache = {}
+    _angular_cache = cache_manager.cache("sampler_angular")
+    _radial_cache = cache_manager.cache("sampler_radial")    # (n, l) -> _radial_envelope(n, l)
+
+    # 角向采样方式：
+    #   "separable" —— |Y_lm|² 与 φ 无关：θ 由 cosθ 的解析多项式 CDF 反演得到，φ 均匀
+    #   "grid"      —— 旧做法：(θ, φ) 二维直方图 + 格内抖动
+    ANGULAR_MODES = ("separable", "grid")
+
+    # 可分离模式下 cosθ 方向 CDF 表的节点数
+    _COS_NODES = 4097
 
-    def __init__(self, n, l, m, N=80000):
+    # 抽样分块大小：块的划分只取决于 N，与线程数无关，
+    # 每块用各自的 SeedSequence 子流，所以结果对给定种子是确定的
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, n, l, m, N=80000, angular="separable", seed=None, workers=None):
+        if angular not in self.ANGULAR_MODES:
+            raise ValueError(f"unknown angular mode: {angular}")
         self.n = n
         self.l = l
         self.m = m
         self.N = N
+        self.angular = angular
+        self.workers = workers
+
+        self._seed_seq = make_seed_sequence(seed)
 
-        # 先给一个理论上的最大范围，后面会自动裁剪
+        # 显示过滤的上限（抽样本身不受它限制）
         self.rmax_theory = 8.0 * n * n
 
-        self._prepare_radial()
-        self._prepare_angular()
+        with trace_span("sampler.prepare", n=n, l=l, m=m):
+            self._prepare_radial()
+            self._prepare_angular()
 
     # ---------------------------------------------------------
-    # 1) 径向：自动找到“最后一层壳”的位置，再在那之前做严格物理采样
+    # 1) 径向：按 r²R² 精确抽样；“最后一层壳”只用于显示过滤
     # ---------------------------------------------------------
     def _prepare_radial(self):
-        # 单次高分辨率扫描，同时用于峰值定位与最终抽样
-        r_full = np.linspace(0.0, self.rmax_theory, 30000)
-        R_full = radial_wavefunction(self.n, self.l, r_full)
-        P_full = (r_full**2) * (R_full**2)
-
-        # 找所有局部峰值（壳中心）
-        peaks_mask = (P_full[1:-1] > P_full[:-2]) & (P_full[1:-1] > P_full[2:])
-        peak_indices = np.where(peaks_mask)[0] + 1  # 对应 r_full 的索引
-
-        if len(peak_indices) == 0:
-            # 极少数异常，兜底直接用理论 rmax
-            r_cut = self.rmax_theory
-        else:
-            # 最后一个“真正的壳峰”
-            last_peak_idx = peak_indices[-1]
-            last_peak_r = r_full[last_peak_idx]
+        key = (self.n, self.l)
+        env = self._radial_cache.get(key)
+        if env is None:
+            env = _radial_envelope(self.n, self.l)
+            self._radial_cache.put(key, env)
+        self._radial_env = env
+
+        # 最后一个“真正的壳峰”（解析位置），在外面再留一点余量（防止裁太死）
+        last_peak_r = float(radial_structure(self.n, self.l)["peaks"][-1])
+        self.rmax = float(min(self.rmax_theory, last_peak_r * 1.4))
+
+    def display_mask(self, r):
+        """可选的显示过滤：只保留最后一层壳附近（r <= rmax）的点"""
+        return np.asarray(r) <= self.rmax
+
+    def _rng(self, rng):
+        if rng is None:
+            rng = np.random.default_rng(self._seed_seq.spawn(1)[0])
+        return rng
+
+    def _sample_r(self, N=None, rng=None):
+        if N is None:
+            N = self.N
+        rng = self._rng(rng)
 
-            # 在最后一层壳外面再留一点余量（防止裁太死）
-            r_cut = min(self.rmax_theory, last_peak_r * 1.4)
+        env = self._radial_env
+        prob = env["prob"]
+        lo, hi = env["lo"], env["hi"]
+        kappa, beta, log_M = env["kappa"], env["beta"], env["log_M"]
 
-        self.rmax = float(r_cut)
+        rho = np.empty(N)
+        filled = 0
+        while filled < N:
+            need = N - filled
+            batch = int(need / env["accept"] * 1.1) + 16
 
-        # 现在在 [0, rmax] 内直接用已计算的高分辨率网格，严格按 r^2|R|^2 做 PDF
-        r_mask = r_full <= self.rmax
-        r_grid = r_full[r_mask]
-        pdf = P_full[r_mask]
-        pdf = np.maximum(pdf, 0.0)
-        s = pdf.sum()
-        if s <= 0:
-            pdf[:] = 1.0
-            s = pdf.sum()
-        pdf /= s
+            # 按 prob·M 选壳 → 抽 gamma → 壳外直接拒绝 → 包络接受–拒绝
+            shell = rng.choice(len(prob), size=batch, p=env["propose"])
+            x = rng.gamma(kappa[shell], 1.0 / beta[shell])
+            inside = (x > lo[shell]) & (x < hi[shell])
+            shell, x = shell[inside], x[inside]
 
-        cdf = np.cumsum(pdf)
-        cdf /= cdf[-1]
+            log_target = (_log_radial_density(self.n, self.l, x)
+                          - env["log_total"] - np.log(prob[shell]))
+            log_env = log_M[shell] + _log_gamma_pdf(kappa[shell], beta[shell], x)
+            with np.errstate(divide="ignore"):
+                accept = np.log(rng.random(len(x))) + log_env <= log_target
 
-        self._r_grid = r_grid
-        self._r_cdf = cdf
+            x = x[accept][:need]
+            rho[filled:filled + len(x)] = x
+            filled += len(x)
 
-    def _sample_r(self, N=None):
-        if N is None:
-            N = self.N
-        u = np.random.rand(N)
-        r = np.interp(u, self._r_cdf, self._r_grid)
-        return r
+        return 0.5 * self.n * rho
 
     # ---------------------------------------------------------
     # 2) 角分布：p(θ, φ) ∝ |Y|^2 sinθ
     # ---------------------------------------------------------
     def _prepare_angular(self):
+        if self.angular == "separable":
+            self._prepare_angular_separable()
+        else:
+            self._prepare_angular_grid()
+
+    def _prepare_angular_separable(self):
+        """
+        p(θ, φ) dθ dφ ∝ |Y_l^m|² sinθ dθ dφ = P̄_l^{|m|}(u)² du dφ，u = cosθ。
+        P_l^m(u)² = (1-u²)^m · (d^m P_l / du^m)² 是 u 的 2l 次多项式，
+        在 Legendre 基下精确构造并积分得到解析 CDF，只依赖 (l, |m|)。
+        """
+        mu = abs(self.m)
+        key = ("separable", self.l, mu)
+        cache = self._angular_cache.get(key)
+
+        if cache is None:
+            dP = Legendre.basis(self.l).deriv(mu)
+            weight = (Polynomial([1.0, 0.0, -1.0]) ** mu).convert(kind=Legendre)
+            density = dP * dP * weight
+            cdf_poly = density.integ(lbnd=-1.0)
+
+            u_nodes = np.linspace(-1.0, 1.0, self._COS_NODES)
+            cdf = cdf_poly(u_nodes)
+            cdf = np.maximum.accumulate(np.maximum(cdf, 0.0))
+            cdf /= cdf[-1]
+
+            cache = (u_nodes, cdf)
+            self._angular_cache.put(key, cache)
+
+        self._u_nodes, self._u_cdf = cache
+
+    def _prepare_angular_grid(self):
         key = (self.l, self.m)
         cache = self._angular_cache.get(key)
 
@@ -93,9 +324,7 @@ class HydrogenSampler:
 
             TH, PH = np.meshgrid(th_centers, ph_centers, indexing="ij")
 
-            Yr = spherical_harmonic_real(self.l, self.m, TH, PH)
-            Yi = spherical_harmonic_imag(self.l, self.m, TH, PH)
-            Y2 = Yr*Yr + Yi*Yi
+            Y2 = spherical_harmonic_abs2(self.l, self.m, TH)
 
             pdf = Y2 * np.sin(TH)
             pdf = np.maximum(pdf, 0.0)
@@ -118,7 +347,7 @@ class HydrogenSampler:
                 ph_centers,
                 cdf,
             )
-            self._angular_cache[key] = cache
+            self._angular_cache.put(key, cache)
 
         (
             self._Nth,
@@ -130,9 +359,16 @@ class HydrogenSampler:
             self._ang_cdf,
         ) = cache
 
-    def _sample_theta_phi(self, N=None):
+    def _sample_theta_phi(self, N=None, rng=None):
         if N is None:
             N = self.N
+        rng = self._rng(rng)
+
+        if self.angular == "separable":
+            u = np.interp(rng.random(N), self._u_cdf, self._u_nodes)
+            th = np.arccos(np.clip(u, -1.0, 1.0))
+            ph = 2*np.pi * rng.random(N)
+            return th, ph
 
         Nth, Nph = self._Nth, self._Nph
         th_edges = self._th_edges
@@ -141,7 +377,7 @@ class HydrogenSampler:
         ph_centers = self._ph_centers
         cdf = self._ang_cdf
 
-        u = np.random.rand(N)
+        u = rng.random(N)
         idx = np.searchsorted(cdf, u, side="right")
         idx = np.clip(idx, 0, len(cdf) - 1)
 
@@ -154,8 +390,8 @@ class HydrogenSampler:
         dth = th_edges[1] - th_edges[0]
         dph = ph_edges[1] - ph_edges[0]
 
-        th = th0 + (np.random.rand(N) - 0.5) * dth
-        ph = ph0 + (np.random.rand(N) - 0.5) * dph
+        th = th0 + (rng.random(N) - 0.5) * dth
+        ph = ph0 + (rng.random(N) - 0.5) * dph
 
         th = np.clip(th, 0.0, np.pi)
         ph = np.mod(ph, 2*np.pi)
@@ -166,15 +402,64 @@ class HydrogenSampler:
     # 3) 对外接口：返回 (r, θ, φ, x, y, z)
     # ---------------------------------------------------------
     def sample(self, N=None):
+        """
+        把 N 切成固定大小的块，每块用 SeedSequence.spawn 出来的独立子流，
+        在线程池里并行填充（numpy 的批量内核会释放 GIL）。
+        同一种子下结果与线程数无关；多次调用依次得到不同但可复现的点集。
+        """
         if N is None:
             N = self.N
 
-        r = self._sample_r(N)
-        th, ph = self._sample_theta_phi(N)
+        out = np.empty((6, N))
+        starts = list(range(0, N, self.CHUNK_SIZE))
+        seeds = self._seed_seq.spawn(len(starts))
+
+        def fill(i):
+            start = starts[i]
+            stop = min(start + self.CHUNK_SIZE, N)
+            rng = np.random.default_rng(seeds[i])
+            self._fill_chunk(out[:, start:stop], rng)
+
+        workers = self.workers or os.cpu_count() or 1
+        with trace_span("sampler.sample", n=self.n, l=self.l, m=self.m, N=N):
+            if workers <= 1 or len(starts) <= 1:
+                for i in range(len(starts)):
+                    fill(i)
+            else:
+                with ThreadPoolExecutor(max_workers=min(workers, len(starts))) as pool:
+                    list(pool.map(fill, range(len(starts))))
+
+        r, th, ph, x, y, z = out
+        return r, th, ph, x, y, z
 
-        sin_th = np.sin(th)
-        x = r * sin_th * np.cos(ph)
-        y = r * sin_th * np.sin(ph)
-        z = r * np.cos(th)
+    def iter_chunks(self, N=None):
+        """
+        与 sample 相同的分块与子流，但按顺序一块一块地产出 (start, stop, out)，
+        out 形状 (6, stop-start)，行依次为 r, θ, φ, x, y, z。
+        渐进式绘制用它：先拿到第一块就能画，剩下的边画边抽。
+        """
+        if N is None:
+            N = self.N
 
-        return r, th, ph, x, y, z
+        starts = list(range(0, N, self.CHUNK_SIZE))
+        seeds = self._seed_seq.spawn(len(starts))
+        for start, seed in zip(starts, seeds):
+            stop = min(start + self.CHUNK_SIZE, N)
+            out = np.empty((6, stop - start))
+            self._fill_chunk(out, np.random.default_rng(seed))
+            yield start, stop, out
+
+    def _fill_chunk(self, out, rng):
+        count = out.shape[1]
+        with trace_span("sampler.radial", points=count):
+            r = self._sample_r(count, rng)
+        with trace_span("sampler.angular", points=count):
+            th, ph = self._sample_theta_phi(count, rng)
+
+        sin_th = np.sin(th)
+        out[0] = r
+        out[1] = th
+        out[2] = ph
+        out[3] = r * sin_th * np.cos(ph)
+        out[4] = r * sin_th * np.sin(ph)
+        out[5] = r * np.cos(th)
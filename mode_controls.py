@@ -15,6 +15,12 @@ class ModeControls(QtWidgets.QGroupBox):
         self.radio_psire = QtWidgets.QRadioButton("R·Y（实）")
         self.radio_psiim = QtWidgets.QRadioButton("R·Y（虚）")
         self.radio_prob = QtWidgets.QRadioButton("|ψ|²")
+        self.radio_vol_prob = QtWidgets.QRadioButton("体渲染 |ψ|²")
+        self.radio_vol_re = QtWidgets.QRadioButton("体渲染 Re ψ")
+        self.radio_vol_im = QtWidgets.QRadioButton("体渲染 Im ψ")
+        self.radio_iso = QtWidgets.QRadioButton("等概率面")
+        self.radio_radial_overlay = QtWidgets.QRadioButton("径向对比")
+        self.radio_superposition = QtWidgets.QRadioButton("叠加态动画")
 
         radios = [
             self.radio_radial,
@@ -23,6 +29,12 @@ class ModeControls(QtWidgets.QGroupBox):
             self.radio_psire,
             self.radio_psiim,
             self.radio_prob,
+            self.radio_vol_prob,
+            self.radio_vol_re,
+            self.radio_vol_im,
+            self.radio_iso,
+            self.radio_radial_overlay,
+            self.radio_superposition,
         ]
 
         self.radio_radial.setChecked(True)
@@ -32,9 +44,7 @@ class ModeControls(QtWidgets.QGroupBox):
 
         self.group = QtWidgets.QButtonGroup(self)
 
-        half = (len(radios) + 1) // 2
+        # 每列三个：径向/球谐 | 点云 | 体渲染 | 等概率面/径向对比/叠加态
         for i, btn in enumerate(radios):
             self.group.addButton(btn)
-            col = 0 if i < half else 1
-            row = i if i < half else i - half
-            layout.addWidget(btn, row, col)
+            layout.addWidget(btn, i % 3, i // 3)
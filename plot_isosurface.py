@@ -0,0 +1,102 @@
+﻿# plot_isosurface.py
+"""
+等概率面视图（教科书式轨道图）：
+- 取 |ψ|² 的等值面，使其内部包含用户指定比例的概率
+- 阈值来自抽样点 |ψ|² 的分位数，曲面在缓存的解析网格上用 marching cubes（VTK flying edges）提取
+- 曲面按 Re ψ 的正负着色：正红、负蓝
+- 每个 (态, 分辨率, 比例) 的曲面都缓存，拖动比例滑块时命中缓存即可直接显示
+"""
+
+import numpy as np
+import pyvista as pv
+
+from math_wave import psi_components
+from math_wave_grid import psi_grid, psi_grid_values, enclosure_threshold
+from cache_manager import cache_manager
+from config import VOLUME_GRID_RES
+
+# Re ψ < 0 → 蓝，Re ψ > 0 → 红（与点云配色一致）
+_SIGN_COLORS = ["#3366ff", "#ff3333"]
+
+class IsosurfacePlotter:
+    def __init__(self, plotter: pv.Plotter):
+        self.plotter = plotter
+        self._surface_cache = cache_manager.cache("isosurfaces")
+        self._shown_state = None
+
+    # ---------------------------------------------------------
+    # 计算部分（可在后台线程里跑；只建 VTK 数据对象，不碰渲染）
+    # ---------------------------------------------------------
+    def surface(self, n, l, m, fraction, res=VOLUME_GRID_RES):
+        fraction = round(float(fraction), 4)
+        key = (n, l, m, res, fraction)
+        surf = self._surface_cache.get(key)
+        if surf is not None:
+            return surf
+
+        grid = psi_grid(n, l, m, res)
+        image = pv.ImageData(
+            dimensions=grid["dims"],
+            spacing=grid["spacing"],
+            origin=grid["origin"],
+        )
+        image.point_data["prob"] = psi_grid_values("psi_prob", grid)
+        threshold = enclosure_threshold(n, l, m, fraction)
+        surf = image.contour([threshold], scalars="prob")
+
+        if surf.n_points > 0:
+            # 曲面顶点上直接解析求 Re ψ 的符号（比从网格插值更准，节点面附近也不会糊）
+            x, y, z = surf.points.T
+            r = np.sqrt(x * x + y * y + z * z)
+            theta = np.arccos(np.divide(z, r, out=np.ones_like(z), where=r > 0).clip(-1.0, 1.0))
+            phi = np.arctan2(y, x)
+            R, Yr, _ = psi_components(n, l, m, r, theta, phi)
+            surf.point_data["sign"] = np.where(R * Yr >= 0, 1.0, -1.0)
+
+        self._surface_cache.put(key, surf, nbytes=int(surf.actual_memory_size) * 1024)
+        return surf
+
+    def iter_frames(self, n, l, m, fraction, res=VOLUME_GRID_RES):
+        """生成器：与 Wave3DPlotter.iter_frames 同样的 (done, total, frame) 约定，只产出一帧"""
+        surf = self.surface(n, l, m, fraction, res)
+        yield 1, 1, {
+            "state": (n, l, m, res),
+            "text": f"|ψ|² enclosing {fraction:.0%}  (n={n}, l={l}, m={m})",
+            "surface": surf,
+        }
+
+    def prefetch(self, n, l, m, fraction, res=VOLUME_GRID_RES):
+        """空闲预取：提前提取相邻比例的曲面"""
+        self.surface(n, l, m, fraction, res)
+        yield
+
+    # ---------------------------------------------------------
+    # 显示部分（主线程）
+    # ---------------------------------------------------------
+    def show_frame(self, frame):
+        self.plotter.clear()
+
+        surf = frame["surface"]
+        if surf.n_points == 0:
+            self.plotter.add_text(frame["text"] + "  (empty)", font_size=14)
+        else:
+            self.plotter.add_mesh(
+                surf,
+                scalars="sign",
+                cmap=_SIGN_COLORS,
+                clim=(-1.0, 1.0),
+                smooth_shading=True,
+                show_scalar_bar=False,
+            )
+            self.plotter.add_text(frame["text"], font_size=16)
+        self.plotter.add_axes()
+
+        # 换了态才重置相机，拖动比例滑块时保持视角
+        if frame["state"] != self._shown_state:
+            self.plotter.reset_camera()
+        self._shown_state = frame["state"]
+        self.plotter.render()
+
+    def plot(self, n, l, m, fraction, res=VOLUME_GRID_RES):
+        for _, _, frame in self.iter_frames(n, l, m, fraction, res=res):
+            self.show_frame(frame)
@@ -1,7 +1,45 @@
-﻿import numpy as np
+﻿import math
+
+import numpy as np
 import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from math_radial import radial_wavefunction
+from math_radial import radial_wavefunction, radial_structure
+from cache_manager import cache_manager
+from tracing import trace_span, traced
+from config import RADIAL_SAMPLES_PER_PIXEL, RADIAL_REDRAW_INTERVAL_MS
+
+# 曲线按块缓存：步长 dr = 2^level，每块 _BLOCK_SIZE 个等距点，
+# 键为 (n, l, level, 块号)；平移只补算新露出的块，缩放回原级别时全部命中
+_BLOCK_CACHE = cache_manager.cache("radial_curve_blocks")
+_BLOCK_SIZE = 256
+
+# 节点附近加密：节点 ± 1 个步长内再插这些点（以步长为单位），节点本身也在其中
+_NODE_OFFSETS = np.linspace(-1.0, 1.0, 9)
+
+
+def _radial_block(n, l, level, b):
+    """第 b 块：r ∈ [b·B·dr, (b+1)·B·dr) 的等距点加上块内节点附近的加密点"""
+    key = (n, l, level, b)
+    block = _BLOCK_CACHE.get(key)
+    if block is not None:
+        return block
+
+    dr = 2.0 ** level
+    lo = b * _BLOCK_SIZE * dr
+    hi = lo + _BLOCK_SIZE * dr
+    r = lo + dr * np.arange(_BLOCK_SIZE)
+
+    nodes = radial_structure(n, l)["nodes"]
+    nodes = nodes[(nodes >= lo) & (nodes < hi)]
+    if len(nodes) > 0:
+        extra = (nodes[:, None] + dr * _NODE_OFFSETS[None, :]).ravel()
+        extra = extra[(extra >= lo) & (extra < hi)]
+        r = np.unique(np.concatenate([r, extra]))
+
+    block = (r, radial_wavefunction(n, l, r))
+    _BLOCK_CACHE.put(key, block)
+    return block
 
 
 class Radial2DCanvas(QWidget):
@@ -20,44 +58,38 @@ class Radial2DCanvas(QWidget):
 
         self.curve = self.plot_widget.plot([], [], pen=pg.mkPen(color='cyan', width=2))
 
-        self.n = 1
-        self.l = 0
-
-        # 固定的初始绘制范围
-        self.default_min = 0
-        self.default_max = 40
+        # 还没画过任何态：第一次 plot_radial 一定自动缩放
+        self.n = None
+        self.l = None
 
         # 防止递归触发
         self._manual_update = False
 
+        # 平移 / 缩放时视野变化信号很密，合并成每帧最多重画一次
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(RADIAL_REDRAW_INTERVAL_MS)
+        self._redraw_timer.timeout.connect(self._redraw_view)
+
         # 只在用户真的缩放/平移后自动更新
         self.plot_widget.sigRangeChanged.connect(self._on_range_changed)
 
     def _autoscale_radial(self):
         """自动调整坐标系：左端靠近 0，右端是最后峰值后一点，上下端包住最大最小值"""
-        # 使用默认全范围计算一次
-        r = np.linspace(self.default_min, self.default_max, 3000)
-        R = radial_wavefunction(self.n, self.l, r)
+        # 最外壳 r²R² 峰的解析位置（不受默认范围限制，n 大时外层壳也在视野里）
+        last_peak_r = float(radial_structure(self.n, self.l)["peaks"][-1])
 
-        # 找出最后一个波峰
-        # 简单方式：找局部最大值
-        from scipy.signal import find_peaks
-        peaks, _ = find_peaks(R)
-
-        if len(peaks) > 0:
-            last_peak_r = r[peaks[-1]]
-        else:
-            last_peak_r = self.default_max * 0.8  # 无峰的情况（比如 n=1,l=0）
-
-        # 右侧多给一点 buffer
-        right = last_peak_r + (last_peak_r * 0.15)
+        # 右侧多给一点 buffer（外侧尾部按 e^{-r/n} 衰减，至少留 2n）
+        right = last_peak_r + max(last_peak_r * 0.15, 2.0 * self.n)
 
         # 左侧固定，例如 0 或 -2
         left = -2  # 如果你想要 x=0，就改成 0
 
-        # 上下限
-        top = np.max(R)
-        bottom = np.min(R)
+        # 先按新视野画出曲线，上下限直接取画出来的点（块缓存里的值，不再另算一遍）
+        r, R = self._draw_range(left, right)
+        inside = r <= right
+        top = np.max(R[inside])
+        bottom = np.min(R[inside])
 
         # 应用范围（防止递归触发重绘）
         self._manual_update = True
@@ -75,48 +107,62 @@ class Radial2DCanvas(QWidget):
         self.n = n
         self.l = l
 
-        # 如果 n/l 变了 → 自动调整开始
+        # 如果 n/l 变了 → 自动调整到合理视图
         if is_changed:
-            self._manual_update = True
-            # 用默认范围先画一次（避免空图 autoscale）
-            self._draw_range(self.default_min, self.default_max)
-            self._manual_update = False
-
-            # 自动缩放到合理视图
+            self._redraw_timer.stop()
             self._autoscale_radial()
-        else:
-            # m 改变，不触发 autoscale
-            self._draw_range(self.default_min, self.default_max)
+        # m 改变不影响 R(r)，曲线保持不变
 
     # ---------------------
     # 主动绘制某个范围
     # ---------------------
-    def _draw_range(self, xmin, xmax):
-        if xmax <= xmin:
-            return
+    def _sample_level(self, xmin, xmax):
+        """按视图的像素宽度选步长级别：dr = 2^level，每像素 RADIAL_SAMPLES_PER_PIXEL ~ 2 倍点"""
+        pixels = max(int(self.plot_widget.getViewBox().width()), 200)
+        dr = (xmax - xmin) / (pixels * RADIAL_SAMPLES_PER_PIXEL)
+        return math.floor(math.log2(dr))
 
+    @traced("Radial2DCanvas._draw_range")
+    def _draw_range(self, xmin, xmax):
+        """画出 [xmin, xmax]（r < 0 部分不画），返回实际画上的 (r, R)"""
         # r 必须 ≥ 0
         xmin = max(0, xmin)
         xmax = max(0, xmax)
+        if xmax <= xmin:
+            return np.empty(0), np.empty(0)
 
-        r = np.linspace(xmin, xmax, 2000)
-        R = radial_wavefunction(self.n, self.l, r)
+        level = self._sample_level(xmin, xmax)
+        span = _BLOCK_SIZE * 2.0 ** level
+        first = int(xmin // span)
+        last = int(xmax // span)
 
-        self.curve.setData(r, R)
+        with trace_span("radial.blocks", level=level, blocks=last - first + 1):
+            blocks = [_radial_block(self.n, self.l, level, b) for b in range(first, last + 1)]
+            r = np.concatenate([blk[0] for blk in blocks])
+            R = np.concatenate([blk[1] for blk in blocks])
 
+        with trace_span("radial.set_data", points=len(r)):
+            self.curve.setData(r, R)
+        return r, R
 
     # ---------------------
     # 仅在用户操作时自动更新
     # ---------------------
     def _on_range_changed(self, view, range):
-        if self._manual_update:
+        if self._manual_update or self.n is None:
             return    # 不处理程序内部设定的范围
 
+        # 只记下“需要重画”，真正的重画由定时器合并执行
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start()
+
+    def _redraw_view(self):
         xmin, xmax = self.plot_widget.viewRange()[0]
 
-        # 限制最大可绘制范围，防止坐标爆炸
-        if xmax - xmin > 200:
-            xmax = xmin + 200
+        # 限制最大可绘制范围，防止坐标爆炸（大 n 的自动视野本身就超过 200，上限随 n² 放宽）
+        max_span = max(200.0, 2.5 * self.n * self.n)
+        if xmax - xmin > max_span:
+            xmax = xmin + max_span
             self._manual_update = True
             self.plot_widget.setXRange(xmin, xmax, padding=0)
             self._manual_update = False
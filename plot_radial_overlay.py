@@ -0,0 +1,154 @@
+﻿# plot_radial_overlay.py
+"""
+径向对比视图：
+- 任选若干 (n, l)，把 R(r)、径向概率密度 r²R²、累积概率叠加显示
+- 每种物理量一行，x 轴联动；同一个态在各行颜色一致
+- 曲线数据由 math_radial.radial_profiles 在同一条 r 网格上批量算好并缓存，
+  每条曲线只建一次，勾选 / 取消只切换可见性
+"""
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtWidgets import QWidget, QHBoxLayout
+
+from math_radial import radial_profiles, radial_profile_grid, radial_structure
+from radial_overlay_controls import RadialOverlayControls, state_label
+from config import MAX_N
+
+_Y_LABELS = {
+    "R": "R(r)",
+    "P": "r²R²",
+    "cdf": "∫ r²R² dr",
+}
+
+class RadialOverlayCanvas(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.controls = RadialOverlayControls()
+        layout.addWidget(self.controls, stretch=0)
+
+        self.graphics = pg.GraphicsLayoutWidget()
+        layout.addWidget(self.graphics, stretch=1)
+
+        # 每种物理量一行
+        self.plots = {}
+        first = None
+        for row, (key, _text) in enumerate(RadialOverlayControls.QUANTITIES):
+            plot = self.graphics.addPlot(row=row, col=0)
+            plot.showGrid(x=True, y=True, alpha=0.3)
+            plot.setLabel('left', _Y_LABELS[key])
+            if first is None:
+                first = plot
+                # 图例只放在第一行，按当前勾选的态重建
+                self._legend = plot.addLegend(offset=(-10, 10))
+            else:
+                plot.setXLink(first)
+            self.plots[key] = plot
+        self.plots[RadialOverlayControls.QUANTITIES[-1][0]].setLabel('bottom', 'r')
+
+        # (n, l, 物理量) -> PlotDataItem，建好后只切换可见性
+        self._curves = {}
+        self._shown_states = None
+
+        self.n = None
+        self.l = None
+
+        self.controls.selection_changed.connect(self._refresh)
+        self.controls.preset_requested.connect(self._apply_preset)
+
+    # ---------------------
+    # 外部调用
+    # ---------------------
+    def plot_overlay(self, n, l):
+        """记下当前 (n, l) 供预设使用；第一次进入时默认对比同一 n 的全部 l"""
+        self.n = n
+        self.l = l
+        if not self.controls.checked_states():
+            self._apply_preset("same_n")
+
+    # ---------------------
+    # 预设
+    # ---------------------
+    def _apply_preset(self, kind):
+        n, l = self.n, self.l
+        if n is None:
+            return
+        if kind == "same_n":
+            states = [(n, l2) for l2 in range(n)]
+        elif kind == "same_l":
+            states = [(n2, l) for n2 in range(l + 1, MAX_N + 1)]
+        elif kind == "current":
+            states = [(n, l)]
+        elif kind == "clear":
+            states = []
+        else:
+            raise ValueError(f"unknown preset: {kind}")
+        self.controls.set_checked_states(states)
+
+    # ---------------------
+    # 曲线
+    # ---------------------
+    def _curve(self, state, key, profile):
+        item = self._curves.get(state + (key,))
+        if item is None:
+            r = radial_profile_grid()
+            item = self.plots[key].plot(r, profile[key])
+            # 网格有 8192 点：按视野裁剪、按像素峰值降采样，叠几十条也不卡
+            item.setClipToView(True)
+            item.setDownsampling(auto=True, method='peak')
+            self._curves[state + (key,)] = item
+        return item
+
+    def _refresh(self):
+        states = self.controls.checked_states()
+        quantities = set(self.controls.checked_quantities())
+
+        # 只为还没有曲线的态取数据（缓存里没有的态在一次批量调用里算完）
+        need = [s for s in states
+                if any(s + (key,) not in self._curves for key in quantities)]
+        profiles = radial_profiles(need) if need else {}
+
+        # 颜色按在当前勾选列表里的位置分配，色相尽量拉开；同一个态在各行颜色一致
+        for i, state in enumerate(states):
+            pen = pg.mkPen(color=pg.intColor(i, hues=max(len(states), 6)), width=2)
+            for key in quantities:
+                self._curve(state, key, profiles.get(state)).setPen(pen)
+
+        visible = set(states)
+        for (n, l, key), item in self._curves.items():
+            item.setVisible((n, l) in visible and key in quantities)
+
+        for key, plot in self.plots.items():
+            plot.setVisible(key in quantities)
+
+        first_key = RadialOverlayControls.QUANTITIES[0][0]
+        self._legend.clear()
+        for state in states:
+            item = self._curves.get(state + (first_key,))
+            if item is not None and item.isVisible():
+                self._legend.addItem(item, state_label(*state))
+
+        # 态集合变了才重新定视野（只切换物理量时保持用户的缩放）
+        if set(states) != self._shown_states:
+            self._shown_states = set(states)
+            self._autoscale(states)
+
+    def _autoscale(self, states):
+        if not states:
+            return
+        # 所有勾选态里最外壳峰最远的那个决定右端
+        right = max(
+            float(radial_structure(n, l)["peaks"][-1]) * 1.15 + 2.0 * n
+            for n, l in states
+        )
+        r = radial_profile_grid()
+        inside = r <= right
+        profiles = radial_profiles(states)
+        for key, plot in self.plots.items():
+            plot.setXRange(0.0, right, padding=0.02)
+            values = np.concatenate([profiles[s][key][inside] for s in states])
+            plot.setYRange(float(values.min()), float(values.max()), padding=0.05)
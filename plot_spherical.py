@@ -4,11 +4,55 @@
 - 左：球面着色图（Surface plot）
 - 右：径向变形“等值面形状”（Shape plot）
 - m = 0 且 component = "imag" 时：两边不绘制几何，只显示类型 + (Im = 0)
+- 网格分辨率按 (l, m) 自适应（见 math_spherical.spherical_mesh_axes）：低 l 网格很小，
+  高 l 只在振荡区加密，并可在节点线附近插点
+- 保留模式：两边各一个常驻网格，切换 (l, m) 只原地替换点坐标与标量；
+  每个 (l, m) 的单位球网格与 Y_l^m（按分量）都缓存，两边共用
 """
 
 import numpy as np
 import pyvista as pv
-from math_spherical import spherical_harmonic_real, spherical_harmonic_imag
+from math_spherical import spherical_harmonic_parts, spherical_mesh_axes
+from cache_manager import cache_manager
+from tracing import trace_span, traced
+
+# 控制形变强度，避免过分“鼓”
+_SHAPE_SCALE = 0.3
+
+_MESH_CACHE = cache_manager.cache("sphere_mesh")
+
+def _sphere_tables(l: int, m: int):
+    """
+    (l, m) 对应的单位球网格：theta 形状 (nt, 1)、phi 形状 (1, np)（供 Y_l^m 按 θ、φ 分离求值），
+    points 为单位球面点坐标，按 StructuredGrid 的点顺序（θ 变化最快）展平；
+    weights 是 (θ, φ) 参数平面上的梯形积分权重（非均匀网格上求平均用）。
+    """
+    key = (l, m)
+    tables = _MESH_CACHE.get(key)
+    if tables is not None:
+        return tables
+
+    theta, phi = spherical_mesh_axes(l, m)
+    theta = theta[:, None]
+    phi = phi[None, :]
+
+    X = np.sin(theta) * np.cos(phi)
+    Y = np.sin(theta) * np.sin(phi)
+    Z = np.cos(theta) * np.ones_like(phi)
+    points = np.column_stack([X.ravel(order="F"), Y.ravel(order="F"), Z.ravel(order="F")])
+    points.flags.writeable = False
+
+    def trapezoid_weights(x):
+        w = np.zeros_like(x)
+        w[1:] += 0.5 * np.diff(x)
+        w[:-1] += 0.5 * np.diff(x)
+        return w
+
+    weights = (trapezoid_weights(theta[:, 0])[:, None] * trapezoid_weights(phi[0])[None, :]).ravel(order="F")
+    weights /= weights.sum()
+    tables = (theta, phi, points, (theta.shape[0], phi.shape[1], 1), weights)
+    _MESH_CACHE.put(key, tables)
+    return tables
 
 class SphericalDualPlotter:
     def __init__(self, pv_left: pv.Plotter, pv_right: pv.Plotter):
@@ -16,132 +60,143 @@ class SphericalDualPlotter:
         self.pv_right = pv_right
         self.pv_right.camera = self.pv_left.camera
 
+        self._ylm_cache = cache_manager.cache("sphere_ylm")
+        self._shown_mesh = None
+
+        # 常驻网格 / actor（首次绘制时创建）
+        self._left_grid = None
+        self._right_grid = None
+        self._left_actor = None
+        self._right_actor = None
+        self._left_text = None
+        self._right_text = None
+
+    # -----------------------------------------------------
+    # Y_l^m：按 (l, m, 分量) 缓存，左右两图共用
+    # -----------------------------------------------------
+    def _ylm(self, l: int, m: int, component: str):
+        key = (l, m, component)
+        vals = self._ylm_cache.get(key)
+        if vals is not None:
+            return vals
+
+        theta, phi, _, _, _ = _sphere_tables(l, m)
+        # P̄_l^m 只在 nt 个 θ 上算，e^{imφ} 只在 np 个 φ 上算，再外积
+        re, im = spherical_harmonic_parts(l, m, theta, phi)
+        # 实部 / 虚部出自同一次计算、同一张网格，一起放进缓存
+        for comp, part in (("real", re), ("imag", im)):
+            flat = np.asarray(part, float).ravel(order="F")
+            self._ylm_cache.put((l, m, comp), flat)
+            if comp == component:
+                vals = flat
+        return vals
+
     # -----------------------------------------------------
-    # 公用单位球网格
+    # 常驻网格
     # -----------------------------------------------------
-    def _sphere_grid(self, nt: int = 200, np_: int = 200):
-        theta = np.linspace(0.0, np.pi, nt)
-        phi = np.linspace(0.0, 2.0 * np.pi, np_)
-        TH, PH = np.meshgrid(theta, phi, indexing="ij")
+    def _ensure_meshes(self, l: int, m: int):
+        """首次创建两边的常驻网格；之后 (l, m) 的网格尺寸变了就原地换点坐标和维度"""
+        _, _, points, dims, _ = _sphere_tables(l, m)
+
+        if self._left_grid is not None:
+            if self._shown_mesh != (l, m):
+                for grid in (self._left_grid, self._right_grid):
+                    grid.points = points.copy()
+                    grid.dimensions = dims
+                    grid["Ylm"] = np.zeros(len(points))
+                self._shown_mesh = (l, m)
+            return
 
-        X = np.sin(TH) * np.cos(PH)
-        Y = np.sin(TH) * np.sin(PH)
-        Z = np.cos(TH)
-        return TH, PH, X, Y, Z
+        zeros = np.zeros(len(points))
+        self._shown_mesh = (l, m)
+        for side in ("left", "right"):
+            plotter = self.pv_left if side == "left" else self.pv_right
+            grid = pv.StructuredGrid()
+            grid.points = points.copy()
+            grid.dimensions = dims
+            grid["Ylm"] = zeros.copy()
+            actor = plotter.add_mesh(
+                grid,
+                scalars="Ylm",
+                cmap="coolwarm",
+                show_scalar_bar=True,
+                show_edges=False,
+            )
+            plotter.add_axes()
+            setattr(self, f"_{side}_grid", grid)
+            setattr(self, f"_{side}_actor", actor)
+
+    @staticmethod
+    def _set_text(plotter: pv.Plotter, old, text: str):
+        # 每侧只建一个文本 actor（CornerAnnotation），之后只改字符串
+        if old is None:
+            return plotter.add_text(text, position="upper_left", font_size=14, render=False)
+        old.set_text("upper_left", text)
+        return old
+
+    @staticmethod
+    def _clim(vals):
+        lo, hi = float(vals.min()), float(vals.max())
+        if hi <= lo:
+            hi = lo + 1e-12
+        return lo, hi
 
     # -----------------------------------------------------
     # 左图：球面图（Surface plot）
     # -----------------------------------------------------
-    def _plot_left(self, l: int, m: int, component: str):
-        self.pv_left.clear()
-
+    def _plot_left(self, vals):
         # 虚部且 m = 0 → 不画，只写类型
-        if component == "imag" and m == 0:
-            self.pv_left.add_text(
-                "Surface plot (Im = 0)",
-                position="upper_left",
-                font_size=14,
-            )
-            self.pv_left.add_axes()
-            self.pv_left.reset_camera()
-            self.pv_left.render()
+        if vals is None:
+            self._left_actor.SetVisibility(False)
+            self._left_text = self._set_text(self.pv_left, self._left_text, "Surface plot (Im = 0)")
             return
 
-        TH, PH, X, Y, Z = self._sphere_grid()
-
-        # 计算球谐
-        if component == "real":
-            vals = spherical_harmonic_real(l, m, TH, PH)
-        else:
-            vals = spherical_harmonic_imag(l, m, TH, PH)
-
-        vals = np.asarray(vals, float)
-
-        grid = pv.StructuredGrid(X, Y, Z)
-        grid["Ylm"] = vals.ravel(order="F")
-
-        # 球面着色
-        self.pv_left.add_mesh(
-            grid,
-            scalars="Ylm",
-            cmap="coolwarm",
-            show_scalar_bar=True,
-            show_edges=False,
-        )
+        # 球面着色：网格已由 _ensure_meshes 换好，这里只换标量
+        self._left_grid["Ylm"] = vals
+        self._left_actor.mapper.scalar_range = self._clim(vals)
+        self._left_actor.SetVisibility(True)
 
         # 标明图类型
-        self.pv_left.add_text(
-            "Surface plot",
-            position="upper_left",
-            font_size=14,
-        )
-
-        self.pv_left.add_axes()
-        self.pv_left.reset_camera()
-        self.pv_left.render()
+        self._left_text = self._set_text(self.pv_left, self._left_text, "Surface plot")
 
     # -----------------------------------------------------
     # 右图：等值面形状（径向变形）Shape plot
     # -----------------------------------------------------
-    def _plot_right(self, l: int, m: int, component: str):
-        self.pv_right.clear()
-
+    def _plot_right(self, l: int, m: int, vals):
         # 虚部且 m = 0 → 不画，只写类型
-        if component == "imag" and m == 0:
-            self.pv_right.add_text(
-                "Shape plot (Im = 0)",
-                position="upper_left",
-                font_size=14,
-            )
-            self.pv_right.add_axes()
-            self.pv_right.reset_camera()
-            self.pv_right.render()
+        if vals is None:
+            self._right_actor.SetVisibility(False)
+            self._right_text = self._set_text(self.pv_right, self._right_text, "Shape plot (Im = 0)")
             return
 
-        TH, PH, X0, Y0, Z0 = self._sphere_grid()
-
-        # 计算球谐
-        if component == "real":
-            vals = spherical_harmonic_real(l, m, TH, PH)
-        else:
-            vals = spherical_harmonic_imag(l, m, TH, PH)
-
-        vals = np.asarray(vals, float)
-        vals = vals - vals.mean()
-
-        # 控制形变强度，避免过分“鼓”
-        k = 0.3
-        R = 1 + k * vals
-
-        X = R * np.sin(TH) * np.cos(PH)
-        Y = R * np.sin(TH) * np.sin(PH)
-        Z = R * np.cos(TH)
+        _, _, points, _, weights = _sphere_tables(l, m)
+        # 非均匀网格：按 (θ, φ) 参数平面的面积加权求平均，与等距网格上的算术平均一致
+        vals = vals - np.dot(weights, vals)
 
-        grid = pv.StructuredGrid(X, Y, Z)
-        grid["Ylm"] = vals.ravel(order="F")
-
-        self.pv_right.add_mesh(
-            grid,
-            scalars="Ylm",
-            cmap="coolwarm",
-            show_scalar_bar=True,
-            show_edges=False,
-        )
+        # 径向变形：单位球点坐标乘以 1 + k·Y，原地替换点坐标与标量
+        self._right_grid.points = points * (1.0 + _SHAPE_SCALE * vals)[:, None]
+        self._right_grid["Ylm"] = vals
+        self._right_actor.mapper.scalar_range = self._clim(vals)
+        self._right_actor.SetVisibility(True)
 
         # 标明图类型
-        self.pv_right.add_text(
-            "Shape plot",
-            position="upper_left",
-            font_size=14,
-        )
-
-        self.pv_right.add_axes()
-        self.pv_right.reset_camera()
-        self.pv_right.render()
+        self._right_text = self._set_text(self.pv_right, self._right_text, "Shape plot")
 
     # -----------------------------------------------------
     # 外部入口
     # -----------------------------------------------------
+    @traced("SphericalDualPlotter.plot")
     def plot(self, l: int, m: int, component: str = "real"):
-        self._plot_left(l, m, component)
-        self._plot_right(l, m, component)
+        with trace_span("spherical.mesh", l=l, m=m):
+            self._ensure_meshes(l, m)
+
+        with trace_span("spherical.ylm", l=l, m=m, component=component):
+            vals = None if (component == "imag" and m == 0) else self._ylm(l, m, component)
+        with trace_span("spherical.vtk_upload", points=self._left_grid.n_points):
+            self._plot_left(vals)
+            self._plot_right(l, m, vals)
+
+        self.pv_left.reset_camera()
+        with trace_span("spherical.render"):
+            self.pv_left.render()
+            self.pv_right.render()
@@ -0,0 +1,123 @@
+﻿# plot_superposition.py
+"""
+叠加态动画（在 Wave3DPlotter 的点云 actor 上播放）：
+- 点集与基函数矩阵由 math_superposition 一次算好（后台线程），之后点坐标不再变
+- 每一帧：a(t) = basis @ e^{-iEt}（一次 (N, K) × (K,) 乘法）→ 着色 → 只换颜色标量
+- 态（项、N）不变时 show_frame 不重置相机，动画过程中可以随意旋转
+- 时间按真实流逝推进：一个最快拍频周期对应 SUPERPOSITION_BEAT_SECONDS 秒（乘以速度倍率），
+  掉帧时动画不会变慢
+"""
+
+import time
+
+import numpy as np
+
+from math_superposition import superposition_cloud
+from config import SUPERPOSITION_BEAT_SECONDS
+
+_MODE_TITLES = {
+    "psi_prob": "|Ψ(t)|²",
+    "psi_real": "Re Ψ(t)",
+    "psi_imag": "Im Ψ(t)",
+}
+
+def terms_label(terms):
+    """(n, l, m, c) 列表 → 如 0.71ψ100 + 0.71e^{i90°}ψ210"""
+    parts = []
+    for n, l, m, c in terms:
+        amp = abs(c)
+        phase = int(round(np.degrees(np.angle(c)))) % 360
+        coeff = f"{amp:.2f}" if phase == 0 else f"{amp:.2f}e^(i{phase}°)"
+        parts.append(f"{coeff}ψ{n}{l}{m}")
+    return " + ".join(parts)
+
+class SuperpositionAnimator:
+    def __init__(self, wave3d_plotter):
+        self.wave3d_plotter = wave3d_plotter
+        self.mode = "psi_prob"
+        self.speed = 1.0
+
+        self._cloud = None
+        self._state = None
+        self._t = 0.0
+        self._last_tick = None
+
+    # ---------------------------------------------------------
+    # 计算部分（后台线程）：建点集与基函数矩阵，产出第一帧
+    # ---------------------------------------------------------
+    def iter_frames(self, terms, N):
+        """
+        生成器，产出 (done, total, frame)，与 Wave3DPlotter.iter_frames 的约定相同。
+        frame["cloud"] 交给 show_frame 记下，之后的动画帧都在主线程里直接出。
+        """
+        cloud = superposition_cloud(terms, N)
+        frame = self._frame(cloud, ("superposition", cloud.terms, cloud.N), 0.0, self.mode)
+        frame["cloud"] = cloud
+        yield N, N, frame
+
+    # ---------------------------------------------------------
+    # 着色：沿用 Wave3DPlotter 的红–透明–蓝 / 白色
+    # ---------------------------------------------------------
+    @staticmethod
+    def _colors(a, mode):
+        """
+        |a| <= 1，所以不需要再按壳归一化：
+        - Re / Im：透明度 = |Re a| 或 |Im a|，正红负蓝
+        - |Ψ|²：白色，透明度 = |a|²（此刻密度相对时间平均的比值，干涉相消处透明）
+        """
+        colors = np.empty((len(a), 4), dtype=np.uint8)
+        if mode == "psi_prob":
+            colors[:, :3] = 255
+            colors[:, 3] = np.round((a.real ** 2 + a.imag ** 2).clip(0.0, 1.0) * 255)
+            return colors
+
+        values = a.real if mode == "psi_real" else a.imag
+        pos = values > 0
+        colors[:, :3] = (51, 102, 255)
+        colors[pos, :3] = (255, 51, 51)
+        colors[:, 3] = np.round(np.abs(values).clip(0.0, 1.0) * 255)
+        return colors
+
+    def _frame(self, cloud, state, t, mode):
+        # 每帧都是新的颜色数组：_update_cloud 按对象身份判断要不要换标量
+        colors = self._colors(cloud.amplitude(t), mode)
+        text = f"{_MODE_TITLES[mode]}  {terms_label(cloud.terms)}  t = {t:.1f}  (N={cloud.N})"
+        return {"state": state, "text": text, "pts": cloud.pts,
+                "colors": colors, "scalars": "rgba_superposition"}
+
+    # ---------------------------------------------------------
+    # 显示与动画（主线程）
+    # ---------------------------------------------------------
+    def show_frame(self, frame):
+        cloud = frame.pop("cloud", None)
+        if cloud is not None:
+            self._cloud = cloud
+            self._state = frame["state"]
+            self._t = 0.0
+            self._last_tick = None
+        self.wave3d_plotter.show_frame(frame)
+
+    @property
+    def ready(self):
+        return self._cloud is not None and self._state == self.wave3d_plotter._shown_state
+
+    def tick(self):
+        """推进到当前时刻并刷新颜色；由 UI 的定时器按 SUPERPOSITION_FPS 调用"""
+        if not self.ready:
+            return
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            rate = self._cloud.beat_period() / SUPERPOSITION_BEAT_SECONDS
+            self._t += (now - self._last_tick) * rate * self.speed
+        self._last_tick = now
+        self.redraw()
+
+    def pause(self):
+        # 暂停后再继续时不把暂停期间的时间算进去
+        self._last_tick = None
+
+    def redraw(self):
+        """按当前时刻和模式重画（暂停时切换模式也用它）"""
+        if not self.ready:
+            return
+        self.wave3d_plotter.show_frame(self._frame(self._cloud, self._state, self._t, self.mode))
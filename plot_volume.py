@@ -0,0 +1,106 @@
+﻿# plot_volume.py
+"""
+体渲染视图：
+- |ψ|²：单边传递函数，密度越高越亮、越不透明
+- Re ψ / Im ψ：以 0 为中心的红–透明–蓝传递函数（与点云配色一致），节点面自动透明
+- 网格与 R / Y 因子由 math_wave_grid 缓存，切换模式只重新组合数值
+"""
+
+import numpy as np
+import pyvista as pv
+
+from math_spherical import has_nonzero_imag_part
+from math_wave_grid import psi_grid, psi_grid_values
+from config import VOLUME_GRID_RES
+
+# 正负对称的不透明度：中心（ψ = 0）完全透明，两端最不透明
+_SIGNED_OPACITY = [0.9, 0.5, 0.2, 0.05, 0.0, 0.05, 0.2, 0.5, 0.9]
+# |ψ|²：低密度几乎透明，按平方根增长
+_PROB_OPACITY = list(np.sqrt(np.linspace(0.0, 1.0, 9)) * 0.8)
+
+class VolumePlotter:
+    def __init__(self, plotter: pv.Plotter):
+        self.plotter = plotter
+        self._shown_state = None
+
+    # ---------------------------------------------------------
+    # 计算部分（可在后台线程里跑，不碰 VTK）
+    # ---------------------------------------------------------
+    def iter_frames(self, n, l, m, mode="psi_prob", res=VOLUME_GRID_RES):
+        """生成器：与 Wave3DPlotter.iter_frames 同样的 (done, total, frame) 约定，只产出一帧"""
+        state = (n, l, m, res)
+        if mode == "psi_real":
+            title = "Re(ψ) volume"
+        elif mode == "psi_imag":
+            title = "Im(ψ) volume"
+        elif mode == "psi_prob":
+            title = "|ψ|² volume"
+        else:
+            raise ValueError(f"unknown mode: {mode}")
+
+        if mode == "psi_imag" and not has_nonzero_imag_part(l, m):
+            yield 1, 1, {"state": state, "text": "Im(ψ) = 0", "grid": None}
+            return
+
+        grid = psi_grid(n, l, m, res)
+        values = np.asarray(psi_grid_values(mode, grid), dtype=np.float32)
+        vmax = float(np.max(np.abs(values))) or 1e-30
+        clim = (0.0, vmax) if mode == "psi_prob" else (-vmax, vmax)
+
+        yield 1, 1, {
+            "state": state,
+            "text": f"{title}  (n={n}, l={l}, m={m}, {res}³)",
+            "grid": grid,
+            "values": values,
+            "clim": clim,
+            "signed": mode != "psi_prob",
+        }
+
+    # ---------------------------------------------------------
+    # 显示部分（主线程）
+    # ---------------------------------------------------------
+    def show_frame(self, frame):
+        self.plotter.clear()
+
+        if frame["grid"] is None:
+            self.plotter.add_text(frame["text"], font_size=14)
+            self.plotter.add_axes()
+            self.plotter.render()
+            self._shown_state = frame["state"]
+            return
+
+        grid = frame["grid"]
+        image = pv.ImageData(
+            dimensions=grid["dims"],
+            spacing=grid["spacing"],
+            origin=grid["origin"],
+        )
+        image.point_data["psi"] = frame["values"]
+
+        if frame["signed"]:
+            cmap = "coolwarm"
+            opacity = _SIGNED_OPACITY
+        else:
+            cmap = "inferno"
+            opacity = _PROB_OPACITY
+
+        self.plotter.add_volume(
+            image,
+            scalars="psi",
+            cmap=cmap,
+            opacity=opacity,
+            clim=frame["clim"],
+            show_scalar_bar=True,
+        )
+        self.plotter.add_text(frame["text"], font_size=16)
+        self.plotter.add_axes()
+
+        # 换了态才重置相机，同一态切换模式保持视角
+        if frame["state"] != self._shown_state:
+            self.plotter.reset_camera()
+        self._shown_state = frame["state"]
+        self.plotter.render()
+
+    def plot(self, n, l, m, mode="psi_prob", res=VOLUME_GRID_RES):
+        for _, _, frame in self.iter_frames(n, l, m, mode=mode, res=res):
+            self.show_frame(frame)
@@ -4,186 +4,639 @@
 - 点位置严格按 |ψ|² r² sinθ 抽样（概率密度）
 - 实部 / 虚部：正红，负蓝，透明度按振幅逐渐过渡（节点自动透明）
 - |ψ|²：纯白色点云
-- 自动径向分壳（基于径向概率最大值）
+- 自动径向分壳（以解析的径向节点为壳界）
 """
 
+import time
+
 import numpy as np
 import pyvista as pv
 
 from math_wave_sample import HydrogenSampler
-from math_wave import psi_real, psi_imag, psi_prob
-from math_radial import radial_wavefunction, radial_with_grid
+from math_wave import psi_components, psi_from_components
+from math_radial import radial_wavefunction, radial_structure
+from math_spherical import has_nonzero_imag_part
+from sampling_pool import get_sampling_pool
+from cache_manager import cache_manager
+from tracing import trace_span, traced
+from config import (
+    SHELL_DISPLAY_FILTER,
+    SAMPLING_SEED,
+    SAMPLING_WORKERS,
+    SAMPLING_POOL_MIN_N,
+    PROGRESSIVE_FRAME_BUDGET,
+    PREFETCH_MEMORY_MB,
+    LOD_ENABLED,
+    LOD_GRID,
+    LOD_INITIAL_FRACTION,
+    LOD_MIN_FRACTION,
+    LOD_MIN_POINTS,
+    LOD_TARGET_FRAME_TIME,
+)
 
 class Wave3DPlotter:
     def __init__(self, plotter: pv.Plotter):
         self.plotter = plotter
-        self._sample_cache = {}
-        self._shell_peak_cache = {}
+        # 受统一字节预算管理；点云条目在 N=2M 时每条上百 MB，超预算按 LRU 淘汰
+        self._sample_cache = cache_manager.cache("wave3d_samples")
+        # 保留模式渲染：唯一的点云 actor 及其当前点集 / 显示的态
+        self._cloud_mesh = None
+        self._cloud_actor = None
+        self._cloud_pts = None
+        self._cloud_owner = None   # 点坐标直接在共享内存里时，持有对应的 SharedCloud
+        self._cloud_scalars = {}
+        self._text_actor = None
+        self._axes_added = False
+        self._shown_state = None
+
+        # 交互 LOD：抽取子集的 actor、比例与缓存
+        self._lod_mesh = None
+        self._lod_actor = None
+        self._lod_built = None
+        self._lod_priority_cache = None
+        self._lod_fraction = LOD_INITIAL_FRACTION
+        self._lod_active = False
+        self._lod_depth_peeling = False
+        self._install_lod()
 
     # ---------------------------------------------------------
-    # 自动分壳：使用径向概率分布 r^2 |R|^2
+    # 自动分壳：径向节点把 r 轴切成 n-l 个壳，每壳一个 r²R² 峰
     # ---------------------------------------------------------
-    def _radial_shell_peaks(self, n, l):
-        key = (n, l)
-        cached = self._shell_peak_cache.get(key)
+    @staticmethod
+    def _radial_nodes(n, l):
+        # 解析节点（Laguerre 根），由 math_radial 按 (n, l) 缓存
+        return radial_structure(n, l)["nodes"]
+
+    def _sampler(self, n, l, m, N, seed):
+        # 每个态用 (seed, n, l, m) 派生自己的种子：同一种子下点云可复现
+        seed_seq = np.random.SeedSequence(seed, spawn_key=(n, l, m + l))
+        sampler = HydrogenSampler(n, l, m, N, seed=seed_seq, workers=SAMPLING_WORKERS)
+        return sampler, seed_seq
+
+    @staticmethod
+    def _cloud_entry(cloud):
+        # 大 N：进程池抽样并顺带求 ψ 分量，结果就在共享内存里，不拷贝
+        return {
+            "r": cloud.r,
+            "th": cloud.th,
+            "ph": cloud.ph,
+            "pts": cloud.pts,
+            "R": cloud.R,
+            "Yr": cloud.Yr,
+            "Yi": cloud.Yi,
+            "shared": cloud,   # 持有共享内存，条目释放时一起回收
+        }
+
+    @staticmethod
+    def _filter_entry(sampler, entry):
+        # 可选的显示过滤：去掉最后一层壳外面稀疏的尾部
+        if SHELL_DISPLAY_FILTER:
+            keep = sampler.display_mask(entry["r"])
+            if not np.all(keep):
+                entry = {k: v[keep] for k, v in entry.items() if k != "shared"}
+        return entry
+
+    def _get_samples(self, n, l, m, N, seed=SAMPLING_SEED):
+        key = (n, l, m, N, seed)
+        cached = self._sample_cache.get(key)
         if cached is not None:
             return cached
 
-        r, R = radial_with_grid(n, l)
-        P = (r * r) * (R * R)
+        sampler, seed_seq = self._sampler(n, l, m, N, seed)
 
-        # 查找粗略峰值位置
-        peaks = []
-        for i in range(1, len(P) - 1):
-            if P[i] > P[i - 1] and P[i] > P[i + 1]:
-                peaks.append(r[i])
+        if N >= SAMPLING_POOL_MIN_N:
+            cloud = get_sampling_pool().sample(n, l, m, N, seed=seed_seq)
+            cached = self._cloud_entry(cloud)
+        else:
+            r, th, ph, x, y, z = sampler.sample(N)
+            cached = {
+                "r": r,
+                "th": th,
+                "ph": ph,
+                "pts": np.column_stack((x, y, z)),
+            }
 
-        if len(peaks) == 0:
-            peaks = [r[np.argmax(P)]]
+        cached = self._filter_entry(sampler, cached)
+        self._sample_cache[key] = cached
+        return cached
 
-        peaks_arr = np.array(peaks)
-        self._shell_peak_cache[key] = peaks_arr
-        return peaks_arr
+    def _get_components(self, n, l, m, N):
+        """
+        取抽样点上的 (R, Re Y, Im Y)，与抽样位置存在同一个缓存条目里。
+        同一 (n, l, m, N) 切换显示模式时只做组合与着色，不再求特殊函数。
+        """
+        sample = self._get_samples(n, l, m, N)
+        if "R" not in sample:
+            R, Yr, Yi = psi_components(n, l, m, sample["r"], sample["th"], sample["ph"])
+            sample["R"] = R
+            sample["Yr"] = Yr
+            sample["Yi"] = Yi
+            # 条目变大了，重新登记字节数
+            self._sample_cache.put((n, l, m, N, SAMPLING_SEED), sample)
+        return sample
 
-    def _get_samples(self, n, l, m, N):
-        key = (n, l, m, N)
+    # ---------------------------------------------------------
+    # 渐进式抽样：分批产出 (已处理点数, 本批数据)
+    # ---------------------------------------------------------
+    def _iter_batches(self, n, l, m, N, seed=SAMPLING_SEED, use_pool=True):
+        """
+        生成器：每次产出 (done, batch)。batch 是与缓存条目同结构的字典
+        （已做显示过滤、带 R/Yr/Yi）；进程池还没有新结果时 batch 为 None。
+        全部完成后把完整结果写入 _sample_cache，与 _get_components 的结果一致，
+        且行顺序就是各批产出的顺序（iter_frames 据此复用已上传的点坐标）。
+        """
+        key = (n, l, m, N, seed)
         cached = self._sample_cache.get(key)
         if cached is not None:
-            return cached
+            if "R" not in cached:
+                cached = self._get_components(n, l, m, N)
+            yield N, cached
+            return
+
+        sampler, seed_seq = self._sampler(n, l, m, N, seed)
+        # spawn 会推进 SeedSequence 的子流计数，进程池要用一份未动过的副本
+        pool_seed = np.random.SeedSequence(seed_seq.entropy, spawn_key=seed_seq.spawn_key)
+        chunks = sampler.iter_chunks(N)
+
+        # 第一块总在本进程里抽：几十毫秒内就有东西可画
+        start, stop, out = next(chunks)
+        raw = self._chunk_raw(n, l, m, out)
+        first = self._filter_entry(sampler, raw)
+        yield stop, first
 
-        sampler = HydrogenSampler(n, l, m, N)
-        r, th, ph, x, y, z = sampler.sample(N)
-        pts = np.column_stack((x, y, z))
+        if use_pool and N >= SAMPLING_POOL_MIN_N:
+            # 其余交给进程池；第 0 块不再让池子重算，直接把本进程抽的写进共享内存，
+            # 这样缓存条目里的第 0 块就是第一帧画出来的那批点
+            chunks.close()
+            pending = get_sampling_pool().submit(n, l, m, N, seed=pool_seed, skip=1)
+            for name, values in raw.items():
+                getattr(pending.cloud, name)[start:stop] = values
+            del raw
+            done = stop
+            arrival = [np.arange(stop)]
+            try:
+                while not pending.done:
+                    with trace_span("wave3d.pool_wait"):
+                        ranges = pending.poll(timeout=0.01)
+                    if not ranges:
+                        yield done, None
+                        continue
+                    cloud = pending.cloud
+                    idx = np.concatenate([np.arange(a, b) for a, b in ranges])
+                    arrival.append(idx)
+                    batch = {
+                        "r": cloud.r[idx],
+                        "th": cloud.th[idx],
+                        "ph": cloud.ph[idx],
+                        "pts": cloud.pts[idx],
+                        "R": cloud.R[idx],
+                        "Yr": cloud.Yr[idx],
+                        "Yi": cloud.Yi[idx],
+                    }
+                    done += len(idx)
+                    yield done, self._filter_entry(sampler, batch)
+            except GeneratorExit:
+                pending.cancel()
+                raise
+            entry = self._cloud_entry(pending.cloud)
+            # 各块完成的先后不定：把共享内存里的行原地重排成到达顺序
+            order = np.concatenate(arrival)
+            for name, values in entry.items():
+                if name != "shared":
+                    values[:] = values[order]
+        else:
+            parts = [first]
+            for start, stop, out in chunks:
+                batch = self._chunk_entry(sampler, n, l, m, out)
+                parts.append(batch)
+                yield stop, batch
+            entry = {k: np.concatenate([p[k] for p in parts]) for k in first}
+
+        if "shared" in entry:
+            entry = self._filter_entry(sampler, entry)
+        self._sample_cache[key] = entry
+
+    # ---------------------------------------------------------
+    # 空闲预取
+    # ---------------------------------------------------------
+    @staticmethod
+    def estimate_entry_bytes(N):
+        # r, θ, φ, x, y, z, R, Re Y, Im Y 各一个 float64
+        return 9 * 8 * N
 
-        cached = {
+    def prefetch_plan(self, candidates):
+        """
+        从候选 (n, l, m, N) 里按顺序挑出要预取的那些：跳过已缓存的，
+        总量不超过 PREFETCH_MEMORY_MB，也不让缓存超出预算（不挤掉已有条目）。
+        """
+        room = min(
+            PREFETCH_MEMORY_MB * 1024 * 1024,
+            cache_manager.budget_bytes - cache_manager.bytes,
+        )
+        plan = []
+        for n, l, m, N in candidates:
+            if (n, l, m, N, SAMPLING_SEED) in self._sample_cache:
+                continue
+            size = self.estimate_entry_bytes(N)
+            if size > room:
+                break
+            room -= size
+            plan.append((n, l, m, N))
+        return plan
+
+    def prefetch(self, n, l, m, N):
+        """
+        生成器：在本进程里逐块抽样并求 ψ 分量，完成后写入点云缓存。
+        不用进程池，这样每一块之间都能被前台请求打断；中途关闭则什么都不留下。
+        """
+        if (n, l, m, N, SAMPLING_SEED) in self._sample_cache:
+            return
+        self._radial_nodes(n, l)
+        for _ in self._iter_batches(n, l, m, N, use_pool=False):
+            yield
+
+    @staticmethod
+    def _chunk_raw(n, l, m, out):
+        # 一块抽样结果 + ψ 分量，尚未做显示过滤
+        r, th, ph, x, y, z = out
+        R, Yr, Yi = psi_components(n, l, m, r, th, ph)
+        return {
             "r": r,
             "th": th,
             "ph": ph,
-            "pts": pts,
+            "pts": np.column_stack((x, y, z)),
+            "R": R,
+            "Yr": Yr,
+            "Yi": Yi,
         }
-        self._sample_cache[key] = cached
-        return cached
+
+    @staticmethod
+    def _chunk_entry(sampler, n, l, m, out):
+        return Wave3DPlotter._filter_entry(sampler, Wave3DPlotter._chunk_raw(n, l, m, out))
+
+    # ---------------------------------------------------------
+    # 着色：红–透明–蓝 / 白色
+    # ---------------------------------------------------------
+    @staticmethod
+    @traced("wave3d.rgba")
+    def _colors(values, shell_index, shell_vmax, signed_mode):
+        colors = np.zeros((len(values), 4), dtype=np.uint8)
+
+        if not signed_mode:
+            # ======== |ψ|² 模式：白色 ========
+            colors[:] = (255, 255, 255, 230)
+            return colors
+
+        # ======== 红–透明–蓝 ========
+        # 透明度：|ψ| / 本壳内 max(|ψ|)
+        absv = np.abs(values)
+        alpha = (absv / shell_vmax[shell_index]).clip(0.0, 1.0)
+        a = np.round(alpha * 255).astype(np.uint8)
+
+        # 正值 → 红
+        pos = values > 0
+        colors[pos, 0] = 255
+        colors[pos, 1] = 51
+        colors[pos, 2] = 51
+        colors[pos, 3] = a[pos]
+
+        # 负值 → 蓝
+        neg = values < 0
+        colors[neg, 0] = 51
+        colors[neg, 1] = 102
+        colors[neg, 2] = 255
+        colors[neg, 3] = a[neg]
+
+        # 节点区（v=0）自动保持 alpha=0（完全透明）
+        return colors
 
     # ---------------------------------------------------------
     # 主绘图函数
     # ---------------------------------------------------------
+    @traced("Wave3DPlotter.plot")
     def plot(self, n, l, m, mode="psi_real", N=200000):
-        self.plotter.clear()
+        for _ in self.plot_progressive(n, l, m, mode=mode, N=N):
+            pass
 
-        # ------- 连续抽样（缓存） -------
-        sample = self._get_samples(n, l, m, N)
-        r = sample["r"]
-        th = sample["th"]
-        ph = sample["ph"]
-        pts = sample["pts"]
+    def plot_progressive(self, n, l, m, mode="psi_real", N=200000):
+        """
+        渐进式绘制（同步版）：生成器，每追加一批点到点云 actor 后产出 (done, N)。
+        提前关闭生成器即取消本次绘制。
+        """
+        for done, total, frame in self.iter_frames(n, l, m, mode=mode, N=N):
+            if frame is not None:
+                self.show_frame(frame)
+            yield done, total
 
-        # ------- 计算波函数值 -------
+    @staticmethod
+    def _mode_info(mode):
         if mode == "psi_real":
-            values = psi_real(n, l, m, r, th, ph)
-            title = "Re(ψ)"
-            signed_mode = True
+            return "Re(ψ)", True
+        if mode == "psi_imag":
+            return "Im(ψ)", True
+        if mode == "psi_prob":
+            return "|ψ|²", False
+        raise ValueError(f"unknown mode: {mode}")
 
-        elif mode == "psi_imag":
-            values = psi_imag(n, l, m, r, th, ph)
-            title = "Im(ψ)"
-            signed_mode = True
+    @staticmethod
+    def _shell_index(r, nodes):
+        # 节点半径升序排列，二分查找即得壳号（无节点时全部归到 0 号壳）
+        return np.searchsorted(nodes, r)
 
-        elif mode == "psi_prob":
-            values = psi_prob(n, l, m, r, th, ph)
-            title = "|ψ|²"
-            signed_mode = False
+    def iter_frames(self, n, l, m, mode="psi_real", N=200000):
+        """
+        渐进式绘制的计算部分：只做抽样、求值和着色，不碰 VTK，
+        因此可以放在后台线程里跑。生成器，产出 (done, N, frame)：
+        frame 为 None 表示只有进度更新；否则交给 show_frame 在主线程里显示。
+        frame["pts"] 是同一个数组对象时，show_frame 只换颜色标量、不重传点坐标。
+        """
+        title, signed_mode = self._mode_info(mode)
+        state = (n, l, m, N)
 
-        else:
-            raise ValueError(f"unknown mode: {mode}")
+        # 若模式下理论上全为 0（如 m=0 的虚部）
+        if mode == "psi_imag" and not has_nonzero_imag_part(l, m):
+            yield N, N, {"state": state, "text": f"{title} = 0", "pts": None}
+            return
 
-        values = np.asarray(values, float)
+        def text(shown):
+            # 显示过滤会去掉壳外稀疏的尾部：N 是抽样数，另外写出实际画出的点数
+            return f"{title}  (n={n}, l={l}, m={m}, N={N}, shown {shown})"
 
-        # 若模式下理论上全为 0（如 m=0 的虚部）
-        if np.allclose(values, 0, atol=1e-14):
+        scalars = f"rgba_{mode}"
+        nodes = self._radial_nodes(n, l)
+
+        # -----------------------------------------------------
+        # 已缓存：颜色也按模式缓存在条目里，切换模式只换标量
+        # -----------------------------------------------------
+        key = (n, l, m, N, SAMPLING_SEED)
+        cached = self._sample_cache.get(key)
+        if cached is not None and "R" in cached:
+            colors = cached.get(scalars)
+            if colors is None:
+                values = psi_from_components(mode, cached["R"], cached["Yr"], cached["Yi"])
+                values = np.asarray(values, float)
+                with trace_span("wave3d.shells", points=len(values)):
+                    shell_index = self._shell_index(cached["r"], nodes)
+                    shell_vmax = np.full(len(nodes) + 1, 1e-300)
+                    if signed_mode and len(values) > 0:
+                        np.maximum.at(shell_vmax, shell_index, np.abs(values))
+                colors = self._colors(values, shell_index, shell_vmax, signed_mode)
+                cached[scalars] = colors
+                self._sample_cache.put(key, cached)
+            yield N, N, {"state": state, "text": text(len(cached["pts"])), "pts": cached["pts"],
+                         "colors": colors, "scalars": scalars, "shared": cached.get("shared")}
+            return
+
+        # -----------------------------------------------------
+        # 壳分层：根据 r 对抽样点按壳分类，每壳单独归一化透明度
+        # -----------------------------------------------------
+        n_shells = len(nodes) + 1
+        shell_vmax = np.full(n_shells, 1e-300)
+
+        # 显示缓冲：点和颜色按到达顺序依次追加
+        pts_buf = np.empty((N, 3))
+        val_buf = np.empty(N)
+        shell_buf = np.empty(N, dtype=np.intp)
+        count = 0
+        batches = 0
+
+        budget = PROGRESSIVE_FRAME_BUDGET
+        t_frame = time.perf_counter()
+        dirty = False
+        last = None
+
+        for done, batch in self._iter_batches(n, l, m, N):
+            if batch is not None:
+                r = batch["r"]
+                k = len(r)
+                values = psi_from_components(mode, batch["R"], batch["Yr"], batch["Yi"])
+                values = np.asarray(values, float)
+                with trace_span("wave3d.shells", points=k):
+                    shell_index = self._shell_index(r, nodes)
+                    if signed_mode and k > 0:
+                        np.maximum.at(shell_vmax, shell_index, np.abs(values))
+
+                pts_buf[count:count + k] = batch["pts"]
+                val_buf[count:count + k] = values
+                shell_buf[count:count + k] = shell_index
+                count += k
+                batches += 1
+                dirty = True
+
+            # 第一批立即出帧；之后按帧预算合并若干批再出一帧
+            frame = None
+            now = time.perf_counter()
+            if dirty and (batches == 1 or now - t_frame >= budget or done >= N):
+                # 每壳最大值会随新批次增大，所以每帧都按当前值重算全部颜色
+                colors = self._colors(val_buf[:count], shell_buf[:count], shell_vmax, signed_mode)
+                # pts_buf 的前 count 行之后不会再被改写，可以直接交出视图
+                frame = {"state": state, "text": text(count), "pts": pts_buf[:count],
+                         "colors": colors, "scalars": scalars}
+                t_frame = now
+                dirty = False
+                last = frame
+            yield done, N, frame
+
+        # 完整点集已由 _iter_batches 写进缓存，行顺序与 pts_buf 相同：
+        # 让条目直接引用最后上传的那个数组并记下本模式的颜色，之后切换模式只换标量
+        cached = self._sample_cache.get(key)
+        if cached is not None and last is not None and len(last["pts"]) == len(cached["pts"]):
+            cached["pts"] = last["pts"]
+            cached[scalars] = last["colors"]
+            self._sample_cache.put(key, cached)
+
+    def show_frame(self, frame):
+        """
+        在主线程里显示 iter_frames 产出的一帧（保留模式）：
+        - 点云始终只有一个 PolyData actor，从不 plotter.clear()
+        - 点集变了才替换点坐标；只有模式变了就只换一组颜色标量
+        - 换了态才重置相机，同一态切换模式保持视角
+        """
+        if not self._axes_added:
             self.plotter.add_axes()
-            self.plotter.add_text(f"{title} = 0", font_size=14)
+            self._axes_added = True
+
+        new_state = frame["state"] != self._shown_state
+        self._shown_state = frame["state"]
+
+        if frame["pts"] is None:
+            if self._cloud_actor is not None:
+                self._cloud_actor.SetVisibility(False)
+            if self._lod_actor is not None:
+                self._lod_actor.SetVisibility(False)
+            self._set_text(frame["text"], font_size=14)
+            self.plotter.render()
+            return
+
+        with trace_span("wave3d.vtk_upload", points=len(frame["pts"])):
+            self._update_cloud(frame["pts"], frame["colors"], frame["scalars"])
+        # 显示期间共享内存不能被释放（缓存条目可能先被淘汰）
+        self._cloud_owner = frame.get("shared")
+
+        # -------------------------------------------------
+        # 文本
+        # -------------------------------------------------
+        self._set_text(frame["text"], font_size=16)
+        if new_state:
             self.plotter.reset_camera()
+        with trace_span("wave3d.render"):
             self.plotter.render()
+
+    def _set_text(self, text, font_size):
+        # 标题只建一个文本 actor（左上角的 CornerAnnotation），之后每帧只改字符串和字号
+        if self._text_actor is None:
+            self._text_actor = self.plotter.add_text(text, font_size=font_size, render=False)
             return
+        self._text_actor.set_text("upper_left", text)
+        self._text_actor.SetLinearFontScaleFactor(font_size // 2)
 
-        # -----------------------------------------------------
-        # 壳分层：根据 r 对抽样点按壳分类
-        # -----------------------------------------------------
-        r_peaks = self._radial_shell_peaks(n, l)
-        n_shells = len(r_peaks)
+    def _update_cloud(self, pts, colors, scalars):
+        """
+        首次创建点云 actor；之后点集不同就把新的点集替换进同一个 PolyData，
+        点集相同则只登记/切换颜色数组（按模式命名，切回来时不用重传）。
+        """
+        if self._cloud_mesh is None:
+            mesh = pv.PolyData(pts)
+            mesh.point_data[scalars] = colors
+            self._cloud_mesh = mesh
+            self._cloud_pts = pts
+            self._cloud_scalars = {scalars: colors}
+            self._cloud_actor = self.plotter.add_points(
+                mesh,
+                scalars=scalars,
+                rgba=True,
+                render_points_as_spheres=True,
+                point_size=3,
+            )
+            return
+
+        mesh = self._cloud_mesh
+        if pts is not self._cloud_pts:
+            new = pv.PolyData(pts)
+            new.point_data[scalars] = colors
+            mesh.copy_from(new, deep=False)
+            self._cloud_pts = pts
+            self._cloud_scalars = {scalars: colors}
+        elif self._cloud_scalars.get(scalars) is not colors:
+            mesh.point_data[scalars] = colors
+            self._cloud_scalars[scalars] = colors
 
-        # 若只有一个壳，则所有点都归一组
-        if n_shells == 1:
-            shell_index = np.zeros(len(r), dtype=int)
+        mesh.set_active_scalars(scalars)
+        self._cloud_actor.mapper.array_name = scalars
+        self._cloud_actor.SetVisibility(not self._lod_active)
+        # 拖动中换了点集或颜色（例如叠加态动画），LOD 子集跟着刷新
+        if self._lod_active and self._lod_stale():
+            self._build_lod_actor()
+
+    # ---------------------------------------------------------
+    # 交互时的细节层次（LOD）
+    # ---------------------------------------------------------
+    def _install_lod(self):
+        """拖动相机时换成分层抽取的子集 + 平面点精灵，松手后恢复完整点云"""
+        iren = getattr(self.plotter, "iren", None)
+        if not LOD_ENABLED or iren is None:
+            return
+        iren.add_observer("StartInteractionEvent", self._on_interaction_start)
+        iren.add_observer("InteractionEvent", self._on_interaction)
+        iren.add_observer("EndInteractionEvent", self._on_interaction_end)
+
+    def _lod_priority(self):
+        """
+        每个点的抽取优先级 ∈ [0, 1)：把包围盒分成 LOD_GRID³ 个体素，
+        点在所在体素里按出现顺序排名，priority = 名次 / 体素内点数。
+        取 priority < f 就是按体素等比例分层抽取的 f 子集；点的顺序本身是随机的，
+        所以结果确定且空间均匀。只依赖点集，缓存到点集变化为止。
+        """
+        if self._lod_priority_cache is not None and self._lod_priority_cache[0] is self._cloud_pts:
+            return self._lod_priority_cache[1]
+
+        pts = self._cloud_pts
+        lo = pts.min(axis=0)
+        span = np.maximum(pts.max(axis=0) - lo, 1e-12)
+        ijk = ((pts - lo) / span * LOD_GRID).astype(np.intp).clip(0, LOD_GRID - 1)
+        cell = (ijk[:, 0] * LOD_GRID + ijk[:, 1]) * LOD_GRID + ijk[:, 2]
+
+        order = np.argsort(cell, kind="stable")
+        sorted_cell = cell[order]
+        starts = np.flatnonzero(np.r_[True, sorted_cell[1:] != sorted_cell[:-1]])
+        counts = np.diff(np.r_[starts, len(cell)])
+        first = np.repeat(starts, counts)
+        rank = np.empty(len(cell))
+        rank[order] = (np.arange(len(cell)) - first) / np.repeat(counts, counts)
+
+        self._lod_priority_cache = (pts, rank)
+        return rank
+
+    def _lod_key(self):
+        # 点集与颜色数组按对象身份区分：动画每帧换一个新的颜色数组
+        scalars = self._cloud_mesh.active_scalars_name
+        return self._cloud_pts, self._cloud_scalars[scalars], scalars, self._lod_fraction
+
+    def _lod_stale(self):
+        if self._lod_built is None:
+            return True
+        pts, colors, scalars, fraction = self._lod_key()
+        built_pts, built_colors, built_scalars, built_fraction = self._lod_built
+        return (pts is not built_pts or colors is not built_colors
+                or scalars != built_scalars or fraction != built_fraction)
+
+    def _build_lod_actor(self):
+        keep = self._lod_priority() < self._lod_fraction
+        key = self._lod_key()
+        pts, colors, scalars, _ = key
+        lod = pv.PolyData(pts[keep])
+        lod.point_data[scalars] = colors[keep]
+
+        if self._lod_actor is None:
+            self._lod_mesh = lod
+            self._lod_actor = self.plotter.add_points(
+                lod,
+                scalars=scalars,
+                rgba=True,
+                render_points_as_spheres=False,
+                point_size=2,
+                reset_camera=False,
+                render=False,
+            )
         else:
-            shell_index = np.zeros(len(r), dtype=int)
-            """for i in range(len(r)):
-                shell_index[i] = int(np.argmin(np.abs(r_peaks - r[i])))"""
-            shell_index = np.argmin(np.abs(r[:,None] - r_peaks[None,:]), axis=1)
+            self._lod_mesh.copy_from(lod, deep=False)
+            self._lod_mesh.set_active_scalars(scalars)
+            self._lod_actor.mapper.array_name = scalars
+        self._lod_built = key
 
-        # -----------------------------------------------------
-        # 绘制每一壳
-        # -----------------------------------------------------
-        for k in range(n_shells):
-            mask = (shell_index == k)
-            if not np.any(mask):
-                continue
+    def _on_interaction_start(self, *args):
+        if (self._cloud_actor is None or not self._cloud_actor.GetVisibility()
+                or self._cloud_mesh.n_points < LOD_MIN_POINTS):
+            return
+        if self._lod_stale():
+            self._build_lod_actor()
 
-            p = pts[mask]
-            v = values[mask]
-
-            if signed_mode:
-                # ======== 红–透明–蓝 ========
-                absv = np.abs(v)
-                vmax = float(absv.max()) if absv.size > 0 else 1e-12
-
-                # 透明度：|ψ| / max(|ψ|)
-                alpha = (absv / vmax).clip(0.0, 1.0)
-
-                # RGBA 数组
-                colors = np.zeros((p.shape[0], 4))
-
-                # 正值 → 红
-                pos = v > 0
-                colors[pos, 0] = 1.0
-                colors[pos, 1] = 0.2
-                colors[pos, 2] = 0.2
-                colors[pos, 3] = alpha[pos]
-
-                # 负值 → 蓝
-                neg = v < 0
-                colors[neg, 0] = 0.2
-                colors[neg, 1] = 0.4
-                colors[neg, 2] = 1.0
-                colors[neg, 3] = alpha[neg]
-
-                # 节点区（v=0）自动保持 alpha=0（完全透明）
-                self.plotter.add_points(
-                    p,
-                    scalars=colors,
-                    rgba=True,
-                    render_points_as_spheres=True,
-                    point_size=3,
-                )
-            else:
-                # ======== |ψ|² 模式：白色 ========
-                white = np.ones((p.shape[0], 3))
-                self.plotter.add_points(
-                    p,
-                    scalars=white,
-                    rgb=True,
-                    render_points_as_spheres=True,
-                    point_size=3,
-                    opacity=0.9,
-                )
+        renderer = self.plotter.renderer
+        self._lod_depth_peeling = bool(renderer.GetUseDepthPeeling())
+        renderer.SetUseDepthPeeling(False)
+        self._cloud_actor.SetVisibility(False)
+        self._lod_actor.SetVisibility(True)
+        self._lod_active = True
 
-        # -----------------------------------------------------
-        # 坐标轴 + 文本
-        # -----------------------------------------------------
-        self.plotter.add_text(
-            f"{title}  (n={n}, l={l}, m={m}, N={N})",
-            font_size=16,
-        )
-        self.plotter.add_axes()
-        self.plotter.reset_camera()
+    def _on_interaction(self, *args):
+        """按上一帧的渲染耗时调节子集比例，逼近 LOD_TARGET_FRAME_TIME"""
+        if not self._lod_active:
+            return
+        last = self.plotter.renderer.GetLastRenderTimeInSeconds()
+        if last <= 0:
+            return
+        ratio = min(2.0, max(0.5, LOD_TARGET_FRAME_TIME / last))
+        fraction = min(1.0, max(LOD_MIN_FRACTION, self._lod_fraction * ratio))
+        # 变化不大时不重建，避免每帧抖动
+        if abs(fraction - self._lod_fraction) > 0.25 * self._lod_fraction:
+            self._lod_fraction = fraction
+            self._build_lod_actor()
+
+    def _on_interaction_end(self, *args):
+        if not self._lod_active:
+            return
+        self._lod_active = False
+        self._lod_actor.SetVisibility(False)
+        self._cloud_actor.SetVisibility(True)
+        self.plotter.renderer.SetUseDepthPeeling(self._lod_depth_peeling)
         self.plotter.render()
@@ -43,6 +43,34 @@ class QuantumControls(QtWidgets.QGroupBox):
     def current_l(self): return self.l_combo.currentData()
     def current_m(self): return self.m_combo.currentData()
 
+    def neighbour_states(self):
+        """
+        预测用户下一步最可能切到的态：m±1、l±1、n±1（按这个顺序）。
+        l / m 越界时按 update_l / update_m 的规则回落，与真实切换结果一致。
+        """
+        n, l, m = self.current_n(), self.current_l(), self.current_m()
+        ns = available_n_values()
+        states = []
+
+        def add(n2, l2, m2):
+            if l2 not in available_l_values(n2):
+                l2 = 0
+            if m2 not in available_m_values(l2):
+                m2 = 0
+            if (n2, l2, m2) != (n, l, m) and (n2, l2, m2) not in states:
+                states.append((n2, l2, m2))
+
+        for m2 in (m + 1, m - 1):
+            if m2 in available_m_values(l):
+                add(n, l, m2)
+        for l2 in (l + 1, l - 1):
+            if l2 in available_l_values(n):
+                add(n, l2, m)
+        for n2 in (n + 1, n - 1):
+            if n2 in ns:
+                add(n2, l, m)
+        return states
+
     def update_l(self):
         n = self.current_n()
         ls = available_l_values(n)
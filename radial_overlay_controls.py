@@ -0,0 +1,84 @@
+﻿# radial_overlay_controls.py
+from PyQt5 import QtWidgets, QtCore
+from math_radial import available_n_values, available_l_values
+
+_L_LETTERS = "spdfghiklmnoqrtuv"
+
+def state_label(n, l):
+    """(n, l) → 光谱记号，如 3d"""
+    return f"{n}{_L_LETTERS[l]}" if l < len(_L_LETTERS) else f"n={n},l={l}"
+
+class RadialOverlayControls(QtWidgets.QGroupBox):
+    """径向对比：勾选要叠加的态与物理量"""
+
+    selection_changed = QtCore.pyqtSignal()
+    preset_requested = QtCore.pyqtSignal(str)
+
+    # 物理量：(键, 显示名)
+    QUANTITIES = [
+        ("R", "R(r)"),
+        ("P", "r²R²"),
+        ("cdf", "累积概率"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__("径向对比", parent)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # ---- 物理量 ----
+        self.quantity_boxes = {}
+        for key, text in self.QUANTITIES:
+            box = QtWidgets.QCheckBox(text)
+            box.setChecked(True)
+            box.toggled.connect(lambda _v: self.selection_changed.emit())
+            self.quantity_boxes[key] = box
+            layout.addWidget(box)
+
+        # ---- 预设 ----
+        presets = QtWidgets.QGridLayout()
+        for i, (kind, text) in enumerate([
+            ("same_n", "本 n 全部 l"),
+            ("same_l", "本 l 全部 n"),
+            ("current", "只看当前"),
+            ("clear", "清空"),
+        ]):
+            btn = QtWidgets.QPushButton(text)
+            btn.clicked.connect(lambda _c, k=kind: self.preset_requested.emit(k))
+            presets.addWidget(btn, i // 2, i % 2)
+        layout.addLayout(presets)
+
+        # ---- 态列表（可任意勾选）----
+        self.state_list = QtWidgets.QListWidget()
+        for n in available_n_values():
+            for l in available_l_values(n):
+                item = QtWidgets.QListWidgetItem(state_label(n, l))
+                item.setData(QtCore.Qt.UserRole, (n, l))
+                item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+                item.setCheckState(QtCore.Qt.Unchecked)
+                self.state_list.addItem(item)
+        self.state_list.itemChanged.connect(lambda _item: self.selection_changed.emit())
+        layout.addWidget(self.state_list, stretch=1)
+
+    # ---- 工具函数 ----
+    def checked_states(self):
+        out = []
+        for i in range(self.state_list.count()):
+            item = self.state_list.item(i)
+            if item.checkState() == QtCore.Qt.Checked:
+                out.append(item.data(QtCore.Qt.UserRole))
+        return out
+
+    def checked_quantities(self):
+        return [key for key, _ in self.QUANTITIES if self.quantity_boxes[key].isChecked()]
+
+    def set_checked_states(self, states):
+        """整体替换勾选的态，只发一次 selection_changed"""
+        states = set(states)
+        self.state_list.blockSignals(True)
+        for i in range(self.state_list.count()):
+            item = self.state_list.item(i)
+            checked = item.data(QtCore.Qt.UserRole) in states
+            item.setCheckState(QtCore.Qt.Checked if checked else QtCore.Qt.Unchecked)
+        self.state_list.blockSignals(False)
+        self.selection_changed.emit()
@@ -75,8 +75,12 @@ class SamplingControls(QtWidgets.QGroupBox):
         # 初始标签同步
         self._apply_value(self.slider.value(), emit_signal=False)
 
+    @staticmethod
+    def max_for_n(n: int):
+        return max(10000, 200_000 + n * 200_000)
+
     def set_max_for_n(self, n: int, emit_signal: bool = True):
-        max_value = max(10000, 200_000 + n * 200_000)
+        max_value = self.max_for_n(n)
         self.slider.setMaximum(max_value)
 
         if self.slider.value() > max_value:
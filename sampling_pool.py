@@ -0,0 +1,252 @@
+﻿# sampling_pool.py
+"""
+多进程点云抽样引擎：
+- 常驻的进程池（spawn 启动方式，与 main.py 中强制的 start method 一致）
+- 结果直接写进 multiprocessing.shared_memory 缓冲区，
+  主进程把同一块内存包装成 numpy 数组，不经过 pickle、也不拷贝
+- 分块与种子派生方式与 HydrogenSampler.sample 完全相同，子进程也跟随主进程所用的
+  Laguerre 表，所以同一种子下进程池与线程池得到的点集逐位一致
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import SAMPLING_PROCESSES
+from math_wave_sample import HydrogenSampler, make_seed_sequence
+from math_wave import psi_components
+from math_radial import laguerre_table_source, use_laguerre_table
+
+# 共享缓冲区布局（float64）：
+#   pts   形状 (N, 3)，可直接交给 VTK 作为点坐标
+#   rows  形状 (6, N)，依次为 r, θ, φ, R, Re(Y), Im(Y)
+_ROW_FIELDS = ("r", "th", "ph", "R", "Yr", "Yi")
+
+def _attach(name):
+    """
+    子进程里按名字打开共享内存。
+    Python >= 3.13 直接关闭跟踪；更早的版本里 spawn 出来的子进程与主进程共用
+    同一个 resource_tracker，重复登记是无害的（集合去重），这里也不能反登记，
+    否则主进程 unlink 时 tracker 会找不到记录。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _layout(buf, N):
+    # 用 frombuffer：视图会一直持有缓冲区的导出，还有视图时 close() 报 BufferError，
+    # 而 np.ndarray(buffer=...) 不持有导出，close() 照样 munmap，留下悬空视图
+    pts = np.frombuffer(buf, dtype=np.float64, count=N * 3).reshape(N, 3)
+    rows = np.frombuffer(buf, dtype=np.float64, count=len(_ROW_FIELDS) * N,
+                         offset=N * 3 * 8).reshape(len(_ROW_FIELDS), N)
+    return pts, rows
+
+# 名字已删除、但还有视图没释放而关不掉的映射
+_DEFERRED_CLOSE = []
+
+def _close_deferred():
+    still = []
+    for shm in _DEFERRED_CLOSE:
+        try:
+            shm.close()
+        except BufferError:
+            still.append(shm)
+    _DEFERRED_CLOSE[:] = still
+
+class SharedCloud:
+    """
+    一次抽样结果：一整块共享内存及其 numpy 视图。
+    属性 r / th / ph / pts / R / Yr / Yi 都直接指向共享内存。
+    """
+    def __init__(self, N):
+        self.N = N
+        size = max(1, N * (3 + len(_ROW_FIELDS)) * 8)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.pts, rows = _layout(self._shm.buf, N)
+        for name, row in zip(_ROW_FIELDS, rows):
+            setattr(self, name, row)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def release(self):
+        """
+        删除共享内存并解除映射。先 unlink：名字总能删掉，/dev/shm 不会残留；
+        别处（LOD 缓存、过滤后的切片等）仍持有视图时 close() 会失败，
+        这时把映射挂到 _DEFERRED_CLOSE 上，等以后的 release 再试着关闭。
+        """
+        _close_deferred()
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        for name in ("pts",) + _ROW_FIELDS:
+            self.__dict__.pop(name, None)
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            shm.close()
+        except BufferError:
+            _DEFERRED_CLOSE.append(shm)
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+# -------------------------------------------------------------------
+# 子进程侧
+# -------------------------------------------------------------------
+def _fill_task(name, N, n, l, m, angular, chunk_size, tasks, table):
+    """
+    填充若干个块：tasks 是 [(start, stop, seed_seq), ...]。
+    径向/角向抽样 + ψ 分量求值都在子进程里完成，结果直接写进共享内存。
+    table 是主进程提交时所用的 Laguerre 表文件（None = 直接递推）：
+    首次启动时表还在后台生成，常驻子进程要跟着主进程一起切换。
+    """
+    use_laguerre_table(table)
+    shm = _attach(name)
+    try:
+        pts, rows = _layout(shm.buf, N)
+        sampler = HydrogenSampler(n, l, m, chunk_size, angular=angular)
+        tmp = np.empty((6, chunk_size))
+        for start, stop, seed_seq in tasks:
+            out = tmp[:, :stop - start]
+            sampler._fill_chunk(out, np.random.default_rng(seed_seq))
+            r, th, ph = out[0], out[1], out[2]
+            rows[0, start:stop] = r
+            rows[1, start:stop] = th
+            rows[2, start:stop] = ph
+            pts[start:stop] = out[3:6].T
+            R, Yr, Yi = psi_components(n, l, m, r, th, ph)
+            rows[3, start:stop] = R
+            rows[4, start:stop] = Yr
+            rows[5, start:stop] = Yi
+        del pts, rows
+    finally:
+        shm.close()
+    return len(tasks)
+
+# -------------------------------------------------------------------
+# 主进程侧
+# -------------------------------------------------------------------
+class PendingCloud:
+    """
+    进行中的进程池抽样。poll() 最多等待 timeout 秒，返回新完成的块区间 [(start, stop), ...]，
+    渐进式绘制据此把已经写好的那部分共享内存追加到画面上。
+    """
+    def __init__(self, cloud, futures, tasks):
+        self.cloud = cloud
+        self._pending = list(zip(futures, tasks))
+
+    @property
+    def done(self):
+        return not self._pending
+
+    def poll(self, timeout=0):
+        if self._pending and timeout:
+            wait([f for f, _ in self._pending], timeout=timeout, return_when=FIRST_COMPLETED)
+        ready = []
+        remaining = []
+        for f, task in self._pending:
+            if not f.done():
+                remaining.append((f, task))
+                continue
+            try:
+                f.result()
+            except BaseException:
+                self.cancel()
+                raise
+            ready.extend((start, stop) for start, stop, _ in task)
+        self._pending = remaining
+        return ready
+
+    def result(self):
+        try:
+            for f, _ in self._pending:
+                f.result()
+        except BaseException:
+            self.cancel()
+            raise
+        self._pending = []
+        return self.cloud
+
+    def cancel(self):
+        for f, _ in self._pending:
+            f.cancel()
+        self._pending = []
+        self.cloud.release()
+
+class SamplingPool:
+    """常驻进程池：第一次使用时才启动，之后一直复用"""
+
+    def __init__(self, processes=SAMPLING_PROCESSES):
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = None
+
+    def _ensure(self):
+        if self._executor is None:
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=ctx,
+            )
+        return self._executor
+
+    def submit(self, n, l, m, N, seed=None, angular="separable", skip=0):
+        """
+        提交抽样任务但不等待，返回 PendingCloud。
+        seed 与 HydrogenSampler 的约定相同；块划分与子流派生也相同。
+        前 skip 个块不提交，由调用方自己写进 cloud（poll 也不会报告它们）。
+        """
+        executor = self._ensure()
+        cloud = SharedCloud(N)
+
+        chunk = HydrogenSampler.CHUNK_SIZE
+        starts = list(range(0, N, chunk))
+        seeds = make_seed_sequence(seed).spawn(len(starts))
+        chunks = [(s, min(s + chunk, N), ss) for s, ss in zip(starts, seeds)][skip:]
+
+        # 块交错分成若干组提交，组数多于进程数以便负载均衡
+        groups = min(len(chunks), self.processes * 4)
+        tasks = [chunks[g::groups] for g in range(groups)]
+        table = laguerre_table_source()
+        try:
+            futures = [
+                executor.submit(_fill_task, cloud.name, N, n, l, m, angular, chunk, t, table)
+                for t in tasks
+            ]
+        except BaseException:
+            cloud.release()
+            raise
+        return PendingCloud(cloud, futures, tasks)
+
+    def sample(self, n, l, m, N, seed=None, angular="separable"):
+        """抽 N 个点并求 ψ 分量，阻塞直到完成，返回 SharedCloud"""
+        return self.submit(n, l, m, N, seed=seed, angular=angular).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+_POOL = None
+
+def get_sampling_pool():
+    global _POOL
+    if _POOL is None:
+        _POOL = SamplingPool()
+    return _POOL
+
+def shutdown_sampling_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
@@ -0,0 +1,160 @@
+﻿# superposition_controls.py
+import cmath
+import math
+
+from PyQt5 import QtWidgets, QtCore
+from config import MAX_N, SUPERPOSITION_MAX_TERMS
+
+# 默认的项：(启用, n, l, m, 振幅, 相位°)；1s + 2p₀ 是最简单的“偶极振荡”
+_DEFAULT_TERMS = [
+    (True, 1, 0, 0, 1.0, 0),
+    (True, 2, 1, 0, 1.0, 0),
+    (False, 2, 1, 1, 1.0, 0),
+]
+
+class _TermRow(QtWidgets.QWidget):
+    """一项：启用、n/l/m、振幅、相位"""
+
+    changed = QtCore.pyqtSignal()
+
+    def __init__(self, enabled, n, l, m, amp, phase, parent=None):
+        super().__init__(parent)
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.enabled = QtWidgets.QCheckBox()
+        self.n = QtWidgets.QSpinBox()
+        self.l = QtWidgets.QSpinBox()
+        self.m = QtWidgets.QSpinBox()
+        self.amp = QtWidgets.QDoubleSpinBox()
+        self.phase = QtWidgets.QSpinBox()
+
+        self.n.setRange(1, MAX_N)
+        self.amp.setRange(0.0, 1.0)
+        self.amp.setSingleStep(0.1)
+        self.phase.setRange(0, 345)
+        self.phase.setSingleStep(15)
+        self.phase.setSuffix("°")
+        self.phase.setWrapping(True)
+
+        # 先填值、再接信号，l / m 的范围随 n / l 收紧
+        self.n.setValue(n)
+        self._update_ranges()
+        self.l.setValue(l)
+        self._update_ranges()
+        self.m.setValue(m)
+        self.amp.setValue(amp)
+        self.phase.setValue(phase)
+        self.enabled.setChecked(enabled)
+
+        for text, w in (("", self.enabled), ("n", self.n), ("l", self.l), ("m", self.m),
+                        ("c", self.amp), ("φ", self.phase)):
+            if text:
+                layout.addWidget(QtWidgets.QLabel(text))
+            layout.addWidget(w)
+
+        self.n.valueChanged.connect(self._on_quantum_changed)
+        self.l.valueChanged.connect(self._on_quantum_changed)
+        self.m.valueChanged.connect(lambda _v: self.changed.emit())
+        self.amp.valueChanged.connect(lambda _v: self.changed.emit())
+        self.phase.valueChanged.connect(lambda _v: self.changed.emit())
+        self.enabled.toggled.connect(lambda _v: self.changed.emit())
+
+    def _update_ranges(self):
+        self.l.setRange(0, self.n.value() - 1)
+        self.m.setRange(-self.l.value(), self.l.value())
+
+    def _on_quantum_changed(self, _v):
+        # 收紧范围时 QSpinBox 会自己夹取数值并再发 valueChanged，这里只发一次
+        for w in (self.l, self.m):
+            w.blockSignals(True)
+        self._update_ranges()
+        for w in (self.l, self.m):
+            w.blockSignals(False)
+        self.changed.emit()
+
+    def term(self):
+        """(n, l, m, c)；未启用或振幅为 0 时返回 None"""
+        if not self.enabled.isChecked() or self.amp.value() == 0.0:
+            return None
+        c = cmath.rect(self.amp.value(), math.radians(self.phase.value()))
+        return self.n.value(), self.l.value(), self.m.value(), c
+
+class SuperpositionControls(QtWidgets.QGroupBox):
+    """叠加态：各项系数、显示量、播放 / 暂停与速度"""
+
+    terms_changed = QtCore.pyqtSignal()
+    mode_changed = QtCore.pyqtSignal(str)
+    playing_changed = QtCore.pyqtSignal(bool)
+    speed_changed = QtCore.pyqtSignal(float)
+
+    # 显示量：(模式, 显示名)
+    MODES = [
+        ("psi_prob", "|Ψ|²"),
+        ("psi_real", "Re Ψ"),
+        ("psi_imag", "Im Ψ"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__("叠加态", parent)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # ---- 各项 ----
+        self.rows = []
+        for spec in _DEFAULT_TERMS[:SUPERPOSITION_MAX_TERMS]:
+            row = _TermRow(*spec)
+            row.changed.connect(self.terms_changed.emit)
+            self.rows.append(row)
+            layout.addWidget(row)
+
+        # ---- 显示量 / 播放 / 速度 ----
+        bottom = QtWidgets.QHBoxLayout()
+
+        self.mode_combo = QtWidgets.QComboBox()
+        for mode, text in self.MODES:
+            self.mode_combo.addItem(text, mode)
+        self.mode_combo.currentIndexChanged.connect(
+            lambda _i: self.mode_changed.emit(self.mode())
+        )
+
+        self.play_button = QtWidgets.QPushButton("暂停")
+        self.play_button.setCheckable(True)
+        self.play_button.setChecked(True)
+        self.play_button.toggled.connect(self._on_play_toggled)
+
+        # 速度倍率：滑块 1..40 对应 0.1x..4x
+        self.speed_slider = QtWidgets.QSlider(QtCore.Qt.Horizontal)
+        self.speed_slider.setRange(1, 40)
+        self.speed_slider.setValue(10)
+        self.speed_label = QtWidgets.QLabel()
+        self.speed_slider.valueChanged.connect(self._on_speed_changed)
+        self._on_speed_changed(self.speed_slider.value(), emit_signal=False)
+
+        bottom.addWidget(self.mode_combo)
+        bottom.addWidget(self.play_button)
+        bottom.addWidget(self.speed_slider, stretch=1)
+        bottom.addWidget(self.speed_label)
+        layout.addLayout(bottom)
+
+    # ---- 工具函数 ----
+    def terms(self):
+        return [t for t in (row.term() for row in self.rows) if t is not None]
+
+    def mode(self):
+        return self.mode_combo.currentData()
+
+    def is_playing(self):
+        return self.play_button.isChecked()
+
+    def speed(self):
+        return self.speed_slider.value() / 10.0
+
+    def _on_play_toggled(self, playing):
+        self.play_button.setText("暂停" if playing else "播放")
+        self.playing_changed.emit(playing)
+
+    def _on_speed_changed(self, _v, emit_signal=True):
+        self.speed_label.setText(f"{self.speed():.1f}×")
+        if emit_signal:
+            self.speed_changed.emit(self.speed())
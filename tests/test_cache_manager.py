@@ -0,0 +1,133 @@
+﻿# tests/test_cache_manager.py
+"""
+CacheManager 的统一预算与淘汰策略（每个测试用自己的小预算管理器，不碰全局单例）：
+- 所有缓存共用一条 LRU：超预算时淘汰全局最久未用的条目，不管它属于哪个缓存
+- get 会刷新使用顺序；`in` 不刷新
+- pinned 缓存只计入字节数、从不被淘汰，但它的插入会让可淘汰条目让出预算
+- set_budget 缩小预算时立即淘汰到预算以内
+"""
+
+import numpy as np
+import pytest
+
+from cache_manager import CacheManager, nbytes_of
+
+# 每个条目 1 KB
+ITEM = 1024
+
+def _item():
+    return np.zeros(ITEM, dtype=np.uint8)
+
+@pytest.fixture
+def manager():
+    return CacheManager(budget_bytes=4 * ITEM)
+
+def test_nbytes_counts_shared_arrays_once():
+    a = _item()
+    assert nbytes_of({"x": a, "y": a, "z": _item()}) == 2 * ITEM
+
+def test_global_lru_across_caches(manager):
+    a = manager.cache("a")
+    b = manager.cache("b")
+    a.put(1, _item())
+    b.put(1, _item())
+    a.put(2, _item())
+    b.put(2, _item())
+    assert manager.bytes == 4 * ITEM
+
+    # 最久未用的是 a[1]，哪怕新条目放进的是 b
+    b.put(3, _item())
+    assert 1 not in a
+    assert a.evictions == 1
+    assert manager.bytes == 4 * ITEM
+
+    # 访问 b[1] 之后，下一个被淘汰的是 a[2]
+    assert b.get(1) is not None
+    a.put(3, _item())
+    assert 2 not in a
+    assert 1 in b
+    assert set(b.keys()) == {1, 2, 3}
+
+def test_contains_does_not_refresh(manager):
+    c = manager.cache("c")
+    for key in range(4):
+        c.put(key, _item())
+    assert 0 in c
+    c.put(4, _item())
+    assert 0 not in c
+
+def test_stats_track_hits_and_misses(manager):
+    c = manager.cache("c")
+    c.put("k", _item())
+    c.get("k")
+    c.get("missing")
+    with pytest.raises(KeyError):
+        c["missing"]
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 2, 1, ITEM)
+
+def test_put_same_key_updates_bytes(manager):
+    c = manager.cache("c")
+    c.put("k", _item())
+    c.put("k", np.zeros(2 * ITEM, dtype=np.uint8))
+    assert c.bytes == manager.bytes == 2 * ITEM
+    c.pop("k")
+    assert c.bytes == manager.bytes == 0
+
+def test_oversized_entry_is_kept(manager):
+    c = manager.cache("c")
+    c.put("small", _item())
+    c.put("big", np.zeros(8 * ITEM, dtype=np.uint8))
+    assert "big" in c
+    assert "small" not in c
+
+def test_pinned_cache_is_never_evicted(manager):
+    pinned = manager.cache("pinned", pinned=True)
+    normal = manager.cache("normal")
+    pinned.put("p", _item())
+    for key in range(6):
+        normal.put(key, _item())
+
+    assert "p" in pinned
+    assert pinned.evictions == 0
+    assert len(normal) == 3
+    assert manager.bytes == 4 * ITEM
+
+def test_pinned_insert_makes_room(manager):
+    pinned = manager.cache("pinned", pinned=True)
+    normal = manager.cache("normal")
+    for key in range(4):
+        normal.put(key, _item())
+    pinned.put("p", _item())
+    pinned.put("q", _item())
+
+    assert set(normal.keys()) == {2, 3}
+    assert manager.bytes == 4 * ITEM
+
+def test_set_budget_shrinks(manager):
+    pinned = manager.cache("pinned", pinned=True)
+    normal = manager.cache("normal")
+    pinned.put("p", _item())
+    for key in range(3):
+        normal.put(key, _item())
+
+    manager.set_budget(2 * ITEM)
+    assert set(normal.keys()) == {2}
+    assert normal.evictions == 2
+    assert manager.bytes == 2 * ITEM
+
+    # 固定条目单独就超预算时，可淘汰条目全部让出，固定条目保留
+    manager.set_budget(0)
+    assert len(normal) == 0
+    assert "p" in pinned
+    assert manager.bytes == ITEM
+
+def test_clear(manager):
+    a = manager.cache("a")
+    b = manager.cache("b", pinned=True)
+    a.put(1, _item())
+    b.put(1, _item())
+    manager.clear()
+    assert len(a) == len(b) == 0
+    assert manager.bytes == 0
+    assert manager.stats()["bytes"] == 0
@@ -0,0 +1,75 @@
+﻿# tests/test_math_radial.py
+"""
+Laguerre 插值表（RadialSpline）与直接 assoc_laguerre 递推的对比：
+- 每个 n <= MAX_N 的 (n, l)，在 ρ 上一直查到采样器用到的 r = 8n²（ρ = 16n）再多 10%，
+  相对峰值的最大误差 <= LAGUERRE_TABLE_RTOL
+- 表的定义域之外走精确递推，结果与直接计算一致，而不是截断到最后一个表值
+- Laguerre 次数低于 LAGUERRE_TABLE_MIN_DEGREE 的态不查表，直接递推
+"""
+
+import numpy as np
+import pytest
+
+import math_radial
+from math_radial import (
+    assoc_laguerre,
+    build_radial_splines,
+    apply_laguerre_table,
+    laguerre_table_max_error,
+    radial_wavefunction,
+    radial_wavefunctions,
+)
+from config import MAX_N, LAGUERRE_TABLE_RTOL, LAGUERRE_TABLE_MIN_DEGREE
+
+STATES = [(n, l) for n in range(1, MAX_N + 1) for l in range(n)]
+
+@pytest.fixture(scope="module")
+def splines():
+    return build_radial_splines(STATES)
+
+def _reduced_exact(n, l, rho):
+    return assoc_laguerre(n - l - 1, 2 * l + 1, rho) * np.exp(-rho / 2) * rho ** l
+
+@pytest.mark.parametrize("n, l", STATES)
+def test_table_matches_recurrence(splines, n, l):
+    assert laguerre_table_max_error(n, l, splines[(n, l)]) <= LAGUERRE_TABLE_RTOL
+
+@pytest.mark.parametrize("n, l", STATES)
+def test_exact_evaluation_past_table_end(splines, n, l):
+    spline = splines[(n, l)]
+    rho_peak = np.linspace(0.0, spline.rho_max, 4096)
+    peak = np.max(np.abs(_reduced_exact(n, l, rho_peak)))
+
+    # 从表的最后一个节点一直到 16n 与 2·rho_max 中较远者
+    rho = np.linspace(spline.rho_max, max(16.0 * n, 2.0 * spline.rho_max), 2001)[1:]
+    exact = _reduced_exact(n, l, rho)
+    np.testing.assert_allclose(spline(rho), exact, rtol=1e-9, atol=1e-14 * peak)
+
+    # 表内外混合的输入：两段各走各的路径，结果按原顺序拼回
+    mixed = np.concatenate([rho[::-1], rho_peak])
+    np.testing.assert_allclose(
+        spline(mixed), _reduced_exact(n, l, mixed), rtol=0.0, atol=LAGUERRE_TABLE_RTOL * peak
+    )
+
+def test_radial_wavefunction_uses_table(splines, monkeypatch):
+    monkeypatch.setattr(math_radial, "_LAGUERRE_READY", False)
+    monkeypatch.setattr(math_radial, "_LAGUERRE_CACHE", math_radial.cache_manager.cache("test_laguerre", pinned=True))
+    apply_laguerre_table(splines)
+
+    for n, l in [(1, 0), (4, 2), (MAX_N, 0), (MAX_N, MAX_N - 1)]:
+        r = np.linspace(0.0, 8.0 * n * n * 1.1, 20_001)
+        direct = radial_wavefunctions([(n, l)], r)[0]
+        tabled = radial_wavefunction(n, l, r)
+        scale = np.max(np.abs(direct))
+        assert np.max(np.abs(tabled - direct)) <= LAGUERRE_TABLE_RTOL * scale
+
+def test_low_degree_states_skip_table(splines, monkeypatch):
+    monkeypatch.setattr(math_radial, "_LAGUERRE_READY", False)
+    monkeypatch.setattr(math_radial, "_LAGUERRE_CACHE", math_radial.cache_manager.cache("test_laguerre", pinned=True))
+    apply_laguerre_table(splines)
+
+    for n, l in STATES:
+        r = np.linspace(0.0, 3.0 * n * n, 4001)
+        direct = radial_wavefunctions([(n, l)], r)[0]
+        same = np.array_equal(radial_wavefunction(n, l, r), direct)
+        assert same == (n - l - 1 < LAGUERRE_TABLE_MIN_DEGREE)
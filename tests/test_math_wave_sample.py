@@ -0,0 +1,55 @@
+﻿# tests/test_math_wave_sample.py
+"""
+HydrogenSampler 的可复现性与分布：
+- 同一种子下 sample() 的结果与线程数（workers）无关
+- iter_chunks() 按块产出的点与 sample() 逐位相同
+- 抽到的 r 的均值符合解析值 ⟨r⟩ = (3n² − l(l+1)) / 2（a0 = 1）
+"""
+
+import numpy as np
+import pytest
+
+from math_wave_sample import HydrogenSampler
+
+# 三个整块加一个不满的尾块
+N = 3 * HydrogenSampler.CHUNK_SIZE + 1234
+SEED = 20240611
+STATES = [(1, 0, 0), (3, 2, 1), (4, 1, -1)]
+
+def _sample(n, l, m, angular="separable", workers=None):
+    sampler = HydrogenSampler(n, l, m, N, angular=angular, seed=SEED, workers=workers)
+    return np.stack(sampler.sample())
+
+@pytest.mark.parametrize("angular", HydrogenSampler.ANGULAR_MODES)
+@pytest.mark.parametrize("n, l, m", STATES)
+def test_sample_independent_of_workers(n, l, m, angular):
+    serial = _sample(n, l, m, angular, workers=1)
+    parallel = _sample(n, l, m, angular, workers=4)
+    assert serial.shape == (6, N)
+    assert np.array_equal(serial, parallel)
+
+@pytest.mark.parametrize("n, l, m", STATES)
+def test_iter_chunks_matches_sample(n, l, m):
+    whole = _sample(n, l, m)
+    sampler = HydrogenSampler(n, l, m, N, seed=SEED)
+    chunks = list(sampler.iter_chunks())
+
+    assert chunks[0][:2] == (0, HydrogenSampler.CHUNK_SIZE)
+    assert chunks[-1][1] == N
+    assert np.array_equal(np.concatenate([out for _, _, out in chunks], axis=1), whole)
+
+def test_repeated_calls_differ_but_reproduce():
+    a = HydrogenSampler(2, 1, 0, N, seed=SEED)
+    b = HydrogenSampler(2, 1, 0, N, seed=SEED)
+    first, second = a.sample()[0], a.sample()[0]
+    assert not np.array_equal(first, second)
+    assert np.array_equal(first, b.sample()[0])
+    assert np.array_equal(second, b.sample()[0])
+
+@pytest.mark.parametrize("n, l, m", STATES)
+def test_mean_radius(n, l, m):
+    r = _sample(n, l, m)[0]
+    mean = (3 * n * n - l * (l + 1)) / 2
+    mean_sq = n * n * (5 * n * n + 1 - 3 * l * (l + 1)) / 2
+    sigma = np.sqrt((mean_sq - mean * mean) / N)
+    assert abs(r.mean() - mean) < 5 * sigma
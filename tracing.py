@@ -0,0 +1,251 @@
+﻿# tracing.py
+"""
+分阶段计时（trace span），用来看一次重绘的时间花在哪：
+- with trace_span("wave3d.rgba", points=N): ...   或者给函数加 @traced("Wave3DPlotter.plot")
+  关闭时 trace_span 返回同一个空对象、traced 直接调用原函数，几乎零开销
+- 打开后每个 span 记成一个 Chrome trace 的 "X"（complete）事件：ts / dur 为微秒，
+  pid / tid 区分进程和线程，args 里是调用方给的参数；
+  可选用 tracemalloc 记录本阶段的峰值内存增量（args["mem_peak_mb"]，整个进程的分配都算在内）
+- 事件逐行写进 JSONL 文件（每个进程一个文件，抽样进程池的子进程也各写各的）；
+  python tracing.py out.json trace-*.jsonl 把它们合成 chrome://tracing / Perfetto 能直接打开的 JSON
+- mark() / summary()：按阶段名汇总上一次 mark 之后的事件，供窗口里的叠加层显示
+"""
+
+import atexit
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from config import TRACE_ENABLED, TRACE_MEMORY, TRACE_DIR
+
+# 叠加层最多保留多少个最近事件
+_RECENT_EVENTS = 20_000
+
+class _NullSpan:
+    """关闭时的 span：什么都不做"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "start", "mem_start", "mem_peak")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def set(self, **args):
+        """补充参数（例如算完才知道的点数）"""
+        self.args.update(args)
+
+    def __enter__(self):
+        tracer._enter(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        tracer._exit(self, time.perf_counter_ns())
+        return False
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.path = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = []
+        self._recent = collections.deque(maxlen=_RECENT_EVENTS)
+        self._file = None
+        self._named_threads = set()
+        self._started_tracemalloc = False
+
+    # ---------------------------------------------------------
+    # 开关
+    # ---------------------------------------------------------
+    def enable(self, memory=TRACE_MEMORY, path=None):
+        """打开追踪；path 为 None 时在 TRACE_DIR 下按时间和进程号起名"""
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(TRACE_DIR, f"trace-{stamp}-{os.getpid()}.jsonl")
+        with self._lock:
+            if self._file is not None and path != self.path:
+                self._file.close()
+                self._file = None
+            self.path = path
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.memory = bool(memory)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.memory = False
+
+    # ---------------------------------------------------------
+    # span 进出（由 _Span 调用）
+    # ---------------------------------------------------------
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, span):
+        stack = self._stack()
+        if self.memory and tracemalloc.is_tracing():
+            # 嵌套时先把到目前为止的峰值记到外层，再清零峰值，本层从当前用量开始量
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, peak)
+            tracemalloc.reset_peak()
+            span.mem_start = span.mem_peak = current
+        else:
+            span.mem_start = None
+        stack.append(span)
+
+    def _exit(self, span, end):
+        stack = self._stack()
+        stack.pop()
+
+        args = span.args
+        if span.mem_start is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            span.mem_peak = max(span.mem_peak, peak)
+            args["mem_peak_mb"] = round((span.mem_peak - span.mem_start) / 2**20, 3)
+            if stack and stack[-1].mem_start is not None:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, span.mem_peak)
+
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": span.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": span.start / 1000.0,
+            "dur": (end - span.start) / 1000.0,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            if thread.ident not in self._named_threads:
+                self._named_threads.add(thread.ident)
+                self._pending.append({
+                    "name": "thread_name", "ph": "M", "pid": event["pid"],
+                    "tid": thread.ident, "args": {"name": thread.name},
+                })
+            self._pending.append(event)
+            self._recent.append(event)
+
+        # 本线程最外层的 span 结束时写盘（内层只进缓冲）
+        if not stack:
+            self.flush()
+
+    # ---------------------------------------------------------
+    # 输出
+    # ---------------------------------------------------------
+    def flush(self):
+        with self._lock:
+            events, self._pending = self._pending, []
+            if not events or self.path is None:
+                return
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events))
+                self._file.flush()
+            except OSError as exc:
+                # 写不了文件就只保留叠加层，不影响绘图
+                print(f"trace file disabled: {exc}", file=sys.stderr)
+                self.path = None
+                self._file = None
+
+    def mark(self):
+        """开始新的一轮统计（UI 每次 update_plot 时调用）"""
+        with self._lock:
+            self._recent.clear()
+
+    def summary(self):
+        """
+        上一次 mark 之后各阶段的汇总，按首次出现的先后排序：
+        [(阶段名, 次数, 总耗时 ms, 最大峰值内存 MB 或 None), ...]
+        """
+        with self._lock:
+            events = sorted(self._recent, key=lambda e: e["ts"])
+        rows = {}
+        for e in events:
+            row = rows.setdefault(e["name"], [0, 0.0, None])
+            row[0] += 1
+            row[1] += e["dur"] / 1000.0
+            mem = e["args"].get("mem_peak_mb")
+            if mem is not None:
+                row[2] = mem if row[2] is None else max(row[2], mem)
+        return [(name, count, total, mem) for name, (count, total, mem) in rows.items()]
+
+# 单例
+tracer = Tracer()
+
+def trace_span(name, **args):
+    """计时一个阶段：with trace_span("stage", key=value): ..."""
+    if not tracer.enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(name):
+    """装饰器：整个函数调用作为一个 span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def jsonl_to_chrome(sources, destination):
+    """把一个或多个 JSONL 追踪文件合成 Chrome trace 的 JSON 对象格式"""
+    events = []
+    for path in sources:
+        with open(path, encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    with open(destination, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return len(events)
+
+# 环境变量打开时（含抽样进程池的子进程）导入即开始记录
+if TRACE_ENABLED:
+    tracer.enable()
+
+atexit.register(tracer.flush)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python tracing.py out.json trace1.jsonl [trace2.jsonl ...]")
+        sys.exit(2)
+    count = jsonl_to_chrome(sys.argv[2:], sys.argv[1])
+    print(f"wrote {count} events to {sys.argv[1]}")
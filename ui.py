@@ -2,26 +2,43 @@
 import sys
 import multiprocessing
 import queue as _queue  # 标准库 Queue 的 Empty 用
-from math_radial import laguerre_precompute_worker, apply_laguerre_table
-from PyQt5 import QtWidgets, QtCore
+from math_radial import (
+    laguerre_precompute_worker,
+    apply_laguerre_table,
+    load_laguerre_table,
+)
+from PyQt5 import QtWidgets, QtCore, QtGui
 import pyvista as pv
 from pyvistaqt import QtInteractor
 from config import (
     MAX_N,
+    PREFETCH_ENABLED,
     DEFAULT_N,
     DEFAULT_L,
     DEFAULT_M,
+    SUPERPOSITION_FPS,
+    TRACE_OVERLAY,
 )
 
 # 拆分后的 UI 控件模块
 from quantum_controls import QuantumControls
 from mode_controls import ModeControls
 from sampling_controls import SamplingControls
+from enclosure_controls import EnclosureControls
+from superposition_controls import SuperpositionControls
 
 # 绘图器
 from plot_radial import Radial2DCanvas
+from plot_radial_overlay import RadialOverlayCanvas
 from plot_spherical import SphericalDualPlotter
 from plot_wave3d import Wave3DPlotter
+from plot_volume import VolumePlotter
+from plot_isosurface import IsosurfacePlotter
+from plot_superposition import SuperpositionAnimator
+from sampling_pool import shutdown_sampling_pool
+from compute_worker import ComputeWorker
+from cache_manager import cache_manager
+from tracing import tracer, trace_span, traced
 
 class WaveFunctionWindow(QtWidgets.QMainWindow):
     def __init__(self, parent=None):
@@ -52,10 +69,31 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         self.s_controls = SamplingControls()
         controls_layout.addWidget(self.s_controls, stretch=1)
 
+        # 等概率面包含的概率
+        self.e_controls = EnclosureControls()
+        controls_layout.addWidget(self.e_controls, stretch=1)
+
+        # 叠加态：各项系数与播放控制（只在叠加态动画模式下显示）
+        self.sp_controls = SuperpositionControls()
+        controls_layout.addWidget(self.sp_controls, stretch=2)
+
         # 模式选择
         self.m_controls = ModeControls()
         controls_layout.addWidget(self.m_controls, stretch=2)
 
+        # ================= 分阶段计时叠加层（F10 开关） =================
+        self._trace_label = QtWidgets.QLabel()
+        self._trace_label.setWordWrap(True)
+        self._trace_label.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+        self._trace_label.setStyleSheet(
+            "font-family: monospace; background: rgba(0, 0, 0, 160); color: #9f9; padding: 4px;"
+        )
+        main_layout.addWidget(self._trace_label)
+
+        self._trace_timer = QtCore.QTimer(self)
+        self._trace_timer.setInterval(250)
+        self._trace_timer.timeout.connect(self._refresh_trace_overlay)
+
         # ================= 绘图区域（堆叠） =================
         self.stack = QtWidgets.QStackedLayout()
         main_layout.addLayout(self.stack, stretch=1)
@@ -72,14 +110,59 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         self.sph_container = QtWidgets.QWidget(self)
         self.stack.addWidget(self.sph_container)
 
+        # 体渲染视图占位
+        self._volume_container = QtWidgets.QWidget(self)
+        self.stack.addWidget(self._volume_container)
+
+        # 径向多态对比（2D，主进程立即加载）
+        self.radial_overlay = RadialOverlayCanvas(self)
+        self.stack.addWidget(self.radial_overlay)
+
         # 3D 对象延迟初始化
         self.pv_single = None
         self.pv_left = None
         self.pv_right = None
+        self.pv_volume = None
         self.sph_plotter = None
         self.wave3d_plotter = None
+        self.volume_plotter = None
+        self.iso_plotter = None
+        self.superposition_animator = None
         self._3d_initialized = False
 
+        # ================= 进度条（状态栏） =================
+        self._progress_bar = QtWidgets.QProgressBar()
+        self._progress_bar.setMaximumWidth(240)
+        self._progress_bar.setFormat("%v / %m")
+        self._progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self._progress_bar)
+
+        # ================= 后台计算线程 =================
+        self._worker = ComputeWorker(self)
+        self._worker.frame_ready.connect(self._on_frame_ready)
+        self._worker.failed.connect(self._on_compute_failed)
+        self._worker.start()
+
+        self._pending_frame = None
+        self._frame_sink = None
+        self._frame_timer = QtCore.QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._show_pending_frame)
+
+        # 叠加态动画：点集建好后按固定帧率只换颜色
+        self._anim_timer = QtCore.QTimer(self)
+        self._anim_timer.setInterval(int(1000 / SUPERPOSITION_FPS))
+        self._anim_timer.timeout.connect(self._on_anim_tick)
+
+        # 缓存统计：F9 打印到终端，并在状态栏显示总量
+        self._stats_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("F9"), self)
+        self._stats_shortcut.activated.connect(self._show_cache_stats)
+
+        # 分阶段计时：F10 开关（环境变量 WAVEFUNCTION_TRACE=1 时启动即打开）
+        self._trace_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("F10"), self)
+        self._trace_shortcut.activated.connect(self._toggle_tracing)
+        self._update_trace_overlay()
+
         # 初始化量子数组件
         self._init_quantum_controls()
         self._update_sampling_max()
@@ -107,6 +190,19 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
             lambda _v: self.update_plot(show_dialog=True)
         )
 
+        # 等概率面比例变化（仅在该模式下重绘）
+        self.e_controls.fraction_changed.connect(
+            lambda _v: self._on_fraction_changed()
+        )
+
+        # 叠加态：改项要重建点集；显示量 / 速度 / 播放只影响后续帧
+        self.sp_controls.terms_changed.connect(
+            lambda: self.update_plot(show_dialog=True)
+        )
+        self.sp_controls.mode_changed.connect(self._on_superposition_mode_changed)
+        self.sp_controls.speed_changed.connect(self._on_superposition_speed_changed)
+        self.sp_controls.playing_changed.connect(self._on_superposition_playing_changed)
+
         # 初始化采样控件是否启用
         self._update_sampling_enabled()
 
@@ -116,7 +212,14 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         # 异步（事件循环开始后）初始化 3D 控件：只创建组件，不画图
         QtCore.QTimer.singleShot(0, self._init_3d_views)
 
-        # Laguerre 多项式后台预计算（多进程）
+        # Laguerre 多项式表：优先 memmap 打开磁盘缓存，命中时不再起子进程
+        self._laguerre_queue = None
+        self._laguerre_proc = None
+        if not load_laguerre_table():
+            self._start_laguerre_precompute()
+
+    def _start_laguerre_precompute(self):
+        # Laguerre 多项式后台预计算（多进程），算完写入磁盘缓存
         self._laguerre_queue = multiprocessing.Queue()
         self._laguerre_proc = multiprocessing.Process(
             target=laguerre_precompute_worker,
@@ -134,12 +237,15 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         if self._laguerre_queue is None:
             return
         try:
-            rho_grid, cache = self._laguerre_queue.get_nowait()
+            result = self._laguerre_queue.get_nowait()
         except _queue.Empty:
             return
 
-        # 应用预计算表
-        apply_laguerre_table(rho_grid, cache)
+        # 应用预计算表：正常情况下子进程只传回磁盘缓存的路径
+        if isinstance(result, str):
+            load_laguerre_table(result)
+        else:
+            apply_laguerre_table(result)
 
         # 清理定时器和队列
         self._laguerre_timer.stop()
@@ -171,6 +277,10 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         self._update_sampling_max()
         self.update_plot(show_dialog=True)
 
+    def _on_fraction_changed(self):
+        if self.m_controls.radio_iso.isChecked():
+            self.update_plot(show_dialog=False)
+
     def _on_l_changed(self):
         self.q_controls.update_m()
         self.update_plot(show_dialog=True)
@@ -190,11 +300,21 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         is_dense = (
             self.m_controls.radio_psire.isChecked() or
             self.m_controls.radio_psiim.isChecked() or
-            self.m_controls.radio_prob.isChecked()
+            self.m_controls.radio_prob.isChecked() or
+            self.m_controls.radio_superposition.isChecked()
         )
         self.s_controls.slider.setEnabled(is_dense)
         self.s_controls.label.setEnabled(is_dense)
 
+        is_iso = self.m_controls.radio_iso.isChecked()
+        self.e_controls.slider.setEnabled(is_iso)
+        self.e_controls.label.setEnabled(is_iso)
+
+        # 叠加态模式下量子数由各项给出，换成叠加态控件
+        is_superposition = self.m_controls.radio_superposition.isChecked()
+        self.sp_controls.setVisible(is_superposition)
+        self.q_controls.setVisible(not is_superposition)
+
     def _update_sampling_max(self):
         # 调整最大值时不需要重新触发采样更新，避免重复绘图
         self.s_controls.set_max_for_n(self.current_n(), emit_signal=False)
@@ -207,6 +327,10 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
 
         if self.m_controls.radio_radial.isChecked():
             return f"R{n}{l}(r)"
+        if self.m_controls.radio_radial_overlay.isChecked():
+            return "径向对比：R(r) / r²R² / 累积概率"
+        if self.m_controls.radio_superposition.isChecked():
+            return "叠加态 Ψ(t) = Σ cₖ ψₖ e^(-iEₖt)"
         if self.m_controls.radio_ylm_real.isChecked():
             return f"Y_{l}^{m}（实部）"
         if self.m_controls.radio_ylm_imag.isChecked():
@@ -217,22 +341,41 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
             return f"R{n}{l}·Im(Y_{l}^{m})"
         if self.m_controls.radio_prob.isChecked():
             return f"|ψ_{{{n}{l}{m}}}|²"
+        if self.m_controls.radio_vol_prob.isChecked():
+            return f"|ψ_{{{n}{l}{m}}}|²（体渲染）"
+        if self.m_controls.radio_vol_re.isChecked():
+            return f"Re ψ_{{{n}{l}{m}}}（体渲染）"
+        if self.m_controls.radio_vol_im.isChecked():
+            return f"Im ψ_{{{n}{l}{m}}}（体渲染）"
+        if self.m_controls.radio_iso.isChecked():
+            return f"|ψ_{{{n}{l}{m}}}|² 等概率面（{self.e_controls.fraction():.0%}）"
 
     # ================================================================
     # 核心：更新图像
     # ================================================================
+    @traced("update_plot")
     def update_plot(self, show_dialog=True):
+        # 叠加层只汇总这一次请求（含后台线程里随后完成的各阶段）
+        tracer.mark()
         n, l, m = self.current_n(), self.current_l(), self.current_m()
         N = self.current_N()
 
         self.func_label.setText(self._function_label())
 
+        # 切换参数时先停掉上一次还没画完的点云
+        self._stop_progressive()
+
         # ---------------- 径向 ----------------
         if self.m_controls.radio_radial.isChecked():
             self.stack.setCurrentIndex(0)
             self.canvas_2d.plot_radial(n, l)
             return
 
+        if self.m_controls.radio_radial_overlay.isChecked():
+            self.stack.setCurrentIndex(4)
+            self.radial_overlay.plot_overlay(n, l)
+            return
+
         # ---------------- 球谐：双视图 ----------------
         if self.m_controls.radio_ylm_real.isChecked():
             self.stack.setCurrentIndex(2)
@@ -244,47 +387,209 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
             self.sph_plotter.plot(l, m, component="imag")
             return
 
+        # 以下都需要 3D 视图：还没初始化则立即初始化一次
+        if not self._3d_initialized:
+            self._init_3d_views()
+
+        # ---------------- 体渲染：解析网格 ----------------
+        volume_modes = {
+            "psi_prob": self.m_controls.radio_vol_prob,
+            "psi_real": self.m_controls.radio_vol_re,
+            "psi_imag": self.m_controls.radio_vol_im,
+        }
+        for mode, radio in volume_modes.items():
+            if radio.isChecked():
+                self.stack.setCurrentIndex(3)
+                plotter = self.volume_plotter
+                self._frame_sink = plotter.show_frame
+                self._worker.submit(lambda: plotter.iter_frames(n, l, m, mode=mode))
+                self._progress_bar.setRange(0, 0)
+                self._progress_bar.setVisible(show_dialog)
+                return
+
+        # ---------------- 等概率面：与体渲染共用视图 ----------------
+        if self.m_controls.radio_iso.isChecked():
+            self.stack.setCurrentIndex(3)
+            plotter = self.iso_plotter
+            fraction = self.e_controls.fraction()
+            self._frame_sink = plotter.show_frame
+            self._worker.submit(lambda: plotter.iter_frames(n, l, m, fraction))
+            self._progress_bar.setRange(0, 0)
+            self._progress_bar.setVisible(show_dialog)
+            return
+
+        # ---------------- 叠加态：与点云共用视图和 actor ----------------
+        if self.m_controls.radio_superposition.isChecked():
+            self.stack.setCurrentIndex(1)
+            terms = self.sp_controls.terms()
+            if not terms:
+                self.statusBar().showMessage("叠加态至少要启用一个振幅不为 0 的项", 5000)
+                return
+            animator = self.superposition_animator
+            animator.mode = self.sp_controls.mode()
+            animator.speed = self.sp_controls.speed()
+            self._frame_sink = self._show_superposition_frame
+            self._worker.submit(lambda: animator.iter_frames(terms, N))
+            self._progress_bar.setRange(0, 0)
+            self._progress_bar.setVisible(show_dialog)
+            return
+
         # ---------------- RY/ψ²：3D 点密度 ----------------
         self.stack.setCurrentIndex(1)
 
-        # 如果当前模式需要 3D，而 3D 还没初始化，则立即初始化一次
-        need_3d = (
-            self.m_controls.radio_ylm_real.isChecked() or
-            self.m_controls.radio_ylm_imag.isChecked() or
-            self.m_controls.radio_psire.isChecked() or
-            self.m_controls.radio_psiim.isChecked() or
-            self.m_controls.radio_prob.isChecked()
-        )
-        if need_3d and not self._3d_initialized:
-            self._init_3d_views()
-
-        dlg = None
-        if show_dialog:
-            dlg = QtWidgets.QProgressDialog(
-                "Loading", None, 0, 0, self
-            )
-            dlg.setWindowFlags(
-                QtCore.Qt.Dialog |
-                QtCore.Qt.CustomizeWindowHint |
-                QtCore.Qt.WindowTitleHint
-            )
-            dlg.setWindowModality(QtCore.Qt.WindowModal)
-            dlg.setMinimumDuration(0)
-            dlg.show()
-            QtWidgets.QApplication.processEvents()
-
-        # 绘制
+        # 绘制：渐进式，先画第一批点，其余逐批追加
         if self.m_controls.radio_psire.isChecked():
-            self.wave3d_plotter.plot(n, l, m, mode="psi_real", N=N)
-
+            mode = "psi_real"
         elif self.m_controls.radio_psiim.isChecked():
-            self.wave3d_plotter.plot(n, l, m, mode="psi_imag", N=N)
+            mode = "psi_imag"
+        else:
+            mode = "psi_prob"
+
+        # 计算放到后台线程：只有最新一次请求的帧会送到绘图器
+        plotter = self.wave3d_plotter
+        self._frame_sink = plotter.show_frame
+        self._worker.submit(lambda: plotter.iter_frames(n, l, m, mode=mode, N=N))
+        self._progress_bar.setRange(0, N)
+        self._progress_bar.setValue(0)
+        self._progress_bar.setVisible(show_dialog)
 
-        elif self.m_controls.radio_prob.isChecked():
-            self.wave3d_plotter.plot(n, l, m, mode="psi_prob", N=N)
+    # ================================================================
+    # 后台计算结果 → 主线程显示
+    # ================================================================
+    def _on_frame_ready(self, generation, item):
+        if not self._worker.is_current(generation):
+            return
+        done, total, frame = item
+        if self._progress_bar.maximum() > 0:
+            self._progress_bar.setValue(done)
+        if frame is not None:
+            # 主线程来不及画时只保留最新一帧
+            self._pending_frame = frame
+            if not self._frame_timer.isActive():
+                self._frame_timer.start(0)
+        if done >= total:
+            self._progress_bar.setVisible(False)
+            self._start_prefetch()
+
+    def _show_pending_frame(self):
+        frame, self._pending_frame = self._pending_frame, None
+        if frame is not None:
+            with trace_span("show_frame"):
+                self._frame_sink(frame)
+
+    def _on_compute_failed(self, generation, message):
+        if not self._worker.is_current(generation):
+            return
+        self._progress_bar.setVisible(False)
+        self.statusBar().showMessage(message.strip().splitlines()[-1])
+        print(message, file=sys.stderr)
+
+    def _start_prefetch(self):
+        # 当前图算完后，后台空闲时预取相邻态（同一 N；ψ 分量与模式无关，一并缓存）
+        if not PREFETCH_ENABLED:
+            return
 
-        if dlg is not None:
-            dlg.close()
+        if self.m_controls.radio_iso.isChecked():
+            # 等概率面：预取相邻两档比例的曲面，拖动滑块时直接命中
+            n, l, m = self.current_n(), self.current_l(), self.current_m()
+            plotter = self.iso_plotter
+            self._worker.set_idle_tasks([
+                lambda f=f: plotter.prefetch(n, l, m, f)
+                for f in self.e_controls.neighbour_fractions()
+            ])
+            return
+
+        if self.stack.currentIndex() != 1 or self.m_controls.radio_superposition.isChecked():
+            return
+        N = self.current_N()
+        # 切到别的 n 时滑块上限会变，N 可能被截断
+        candidates = [
+            (n, l, m, min(N, self.s_controls.max_for_n(n)))
+            for n, l, m in self.q_controls.neighbour_states()
+        ]
+        plotter = self.wave3d_plotter
+        self._worker.set_idle_tasks([
+            lambda s=s: plotter.prefetch(*s)
+            for s in plotter.prefetch_plan(candidates)
+        ])
+
+    # ================================================================
+    # 叠加态动画
+    # ================================================================
+    def _show_superposition_frame(self, frame):
+        self.superposition_animator.show_frame(frame)
+        if self.sp_controls.is_playing():
+            self._anim_timer.start()
+
+    def _on_anim_tick(self):
+        self.superposition_animator.tick()
+
+    def _on_superposition_mode_changed(self, mode):
+        if self.superposition_animator is None:
+            return
+        self.superposition_animator.mode = mode
+        # 暂停时也立即按新的显示量重画当前时刻
+        if self.m_controls.radio_superposition.isChecked():
+            self.superposition_animator.redraw()
+
+    def _on_superposition_speed_changed(self, speed):
+        if self.superposition_animator is not None:
+            self.superposition_animator.speed = speed
+
+    def _on_superposition_playing_changed(self, playing):
+        if self.superposition_animator is None:
+            return
+        if playing and self.m_controls.radio_superposition.isChecked():
+            self._anim_timer.start()
+        else:
+            self._anim_timer.stop()
+            self.superposition_animator.pause()
+
+    # ================================================================
+    # 分阶段计时
+    # ================================================================
+    def _toggle_tracing(self):
+        if tracer.enabled:
+            tracer.disable()
+            self.statusBar().showMessage("tracing off", 5000)
+        else:
+            tracer.enable()
+            self.statusBar().showMessage(f"tracing → {tracer.path}", 5000)
+        self._update_trace_overlay()
+
+    def _update_trace_overlay(self):
+        visible = tracer.enabled and TRACE_OVERLAY
+        self._trace_label.setVisible(visible)
+        if visible:
+            self._refresh_trace_overlay()
+            self._trace_timer.start()
+        else:
+            self._trace_timer.stop()
+
+    def _refresh_trace_overlay(self):
+        parts = []
+        for name, count, total_ms, mem_mb in tracer.summary():
+            text = f"{name} {total_ms:.1f} ms"
+            if count > 1:
+                text += f" ×{count}"
+            if mem_mb is not None:
+                text += f" ({mem_mb:.1f} MB)"
+            parts.append(text)
+        self._trace_label.setText("   ".join(parts) or "tracing: 等待下一次绘制…")
+
+    def _show_cache_stats(self):
+        text = cache_manager.format_stats()
+        print(text)
+        self.statusBar().showMessage(text.splitlines()[0], 5000)
+
+    def _stop_progressive(self):
+        # 作废正在进行的 3D 计算和预取，丢掉还没画的帧
+        self._worker.cancel()
+        self._worker.set_idle_tasks([])
+        self._frame_timer.stop()
+        self._anim_timer.stop()
+        self._pending_frame = None
+        self._progress_bar.setVisible(False)
 
     def _init_3d_views(self):
         if self._3d_initialized:
@@ -310,9 +615,19 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
         hl.addWidget(self.pv_left)
         hl.addWidget(self.pv_right)
 
+        # 体渲染视图
+        layout_volume = QtWidgets.QVBoxLayout(self._volume_container)
+        layout_volume.setContentsMargins(0, 0, 0, 0)
+
+        self.pv_volume = QtInteractor(self._volume_container)
+        layout_volume.addWidget(self.pv_volume)
+
         # 绘图器对象
         self.sph_plotter = SphericalDualPlotter(self.pv_left, self.pv_right)
         self.wave3d_plotter = Wave3DPlotter(self.pv_single)
+        self.volume_plotter = VolumePlotter(self.pv_volume)
+        self.iso_plotter = IsosurfacePlotter(self.pv_volume)
+        self.superposition_animator = SuperpositionAnimator(self.wave3d_plotter)
 
         self._3d_initialized = True
 
@@ -325,9 +640,12 @@ class WaveFunctionWindow(QtWidgets.QMainWindow):
             self.pv_left.close()
             self.pv_right.close()
             self.pv_single.close()
+            self.pv_volume.close()
             self.canvas_2d.plotter.close()
         except:
             pass
+        self._worker.stop()
+        shutdown_sampling_pool()
         event.accept()
 
 # ===================================================================